@@ -0,0 +1,191 @@
+# adaptive.py
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from question_bank import ALL
+
+# Starting ratings for the difficulty labels, on the same logit scale as player ability
+DIFFICULTY_PRIORS = {"Easy": -1.0, "Medium": 0.0, "Hard": 1.0}
+
+
+def success_probability(ability, difficulty):
+    """Rasch model: chance that a player of this ability answers correctly."""
+    return 1.0 / (1.0 + math.exp(difficulty - ability))
+
+
+def ability_step(answered):
+    # Large steps while little is known about the player, smaller ones later
+    return max(0.3, 1.2 / math.sqrt(1 + answered))
+
+
+def update_ability(ability, difficulty, correct, answered):
+    """Returns the player's new ability estimate after one answer."""
+    return ability + ability_step(answered) * (float(correct) - success_probability(ability, difficulty))
+
+
+class ItemCalibration:
+    """Elo-calibrated question difficulties with a bucketed index for selection.
+
+    Questions are kept in buckets of bucket_width logits per category, each
+    bucket parallel arrays of ratings and ids sorted by (rating, id), so
+    the unseen question whose
+    difficulty is closest to the player's ability is found by bisecting
+    the player's bucket and walking outward to neighbouring buckets only
+    while they could hold a closer one, instead of scanning the bank.
+    Updating a rating moves the question within or between buckets with
+    one bisect each way. One instance is shared by all sessions.
+    """
+
+    def __init__(self, bank, bucket_width=0.25, item_step=0.4, min_item_step=0.05):
+        self.bank = bank
+        self.bucket_width = bucket_width
+        self.item_step = item_step
+        self.min_item_step = min_item_step
+        self.category_names = bank.category_names
+        category_codes, difficulty_codes = bank.codes(np.arange(len(bank)))
+        priors = np.array([DIFFICULTY_PRIORS.get(name, 0.0) for name in bank.difficulty_names])
+        self.ratings = priors[difficulty_codes] if len(bank) else np.zeros(0)
+        self.attempts = np.zeros(len(bank), dtype=np.int32)
+        self._category_codes = category_codes
+        self._buckets = {}
+        self._bucket_of = np.zeros(len(bank), dtype=np.int32)
+        # Only questions a live bank still lists can be chosen; the sorted buckets are built in one pass
+        ids = np.asarray(bank.filter(), dtype=np.int64)
+        ratings = self.ratings[ids]
+        buckets = np.floor(ratings / bucket_width).astype(np.int64)
+        categories = category_codes[ids].astype(np.int64)
+        order = np.lexsort((ids, ratings, buckets, categories))
+        ids, buckets, categories = ids[order], buckets[order], categories[order]
+        self._bucket_of[ids] = buckets
+        starts = np.flatnonzero((np.diff(buckets) != 0) | (np.diff(categories) != 0)) + 1
+        for first, last in zip(np.r_[0, starts], np.r_[starts, len(ids)]):
+            if last > first:
+                self._buckets.setdefault(int(categories[first]), {})[int(buckets[first])] = (
+                    array("d", ratings[order[first:last]].tobytes()), array("q", ids[first:last].tobytes())
+                )
+        self._lock = threading.Lock()
+
+    def _bucket(self, rating):
+        return int(math.floor(rating / self.bucket_width))
+
+    @staticmethod
+    def _position(ratings, ids, rating, question_id):
+        # Ties in rating are ordered by id, so every question has one position in its bucket
+        low = bisect_left(ratings, rating)
+        return bisect_left(ids, question_id, low, bisect_right(ratings, rating, low))
+
+    def _place(self, question_id):
+        rating = float(self.ratings[question_id])
+        bucket = self._bucket(rating)
+        self._bucket_of[question_id] = bucket
+        category_buckets = self._buckets.setdefault(int(self._category_codes[question_id]), {})
+        ratings, ids = category_buckets.setdefault(bucket, (array("d"), array("q")))
+        position = self._position(ratings, ids, rating, question_id)
+        ratings.insert(position, rating)
+        ids.insert(position, question_id)
+
+    def _remove(self, question_id):
+        # Uses the rating the question was placed with; does nothing if it is not placed
+        bucket = self._buckets.get(int(self._category_codes[question_id]), {}).get(int(self._bucket_of[question_id]))
+        if bucket is None:
+            return
+        ratings, ids = bucket
+        position = self._position(ratings, ids, float(self.ratings[question_id]), question_id)
+        if position < len(ids) and ids[position] == question_id:
+            del ratings[position]
+            del ids[position]
+
+    def _move(self, question_id, rating):
+        self._remove(question_id)
+        self.ratings[question_id] = rating
+        self._place(question_id)
+
+    def set_rating(self, question_id, rating):
+        with self._lock:
+            self._move(question_id, rating)
+
+    def update(self, question_ids):
+        """Re-reads changed questions from a live bank: new ones start at their difficulty
+        prior, edited ones keep their calibrated rating and removed ones stop being chosen."""
+        bank = self.bank.current
+        with self._lock:
+            first_new = len(self.ratings)
+            grow = len(bank) - first_new
+            if grow > 0:
+                self.ratings = np.concatenate([self.ratings, np.zeros(grow)])
+                self.attempts = np.concatenate([self.attempts, np.zeros(grow, dtype=np.int32)])
+                self._bucket_of = np.concatenate([self._bucket_of, np.zeros(grow, dtype=np.int32)])
+                self._category_codes = np.concatenate([self._category_codes, np.zeros(grow, dtype=np.uint16)])
+            self.category_names = bank.category_names
+            for question_id in question_ids:
+                # Take the question out of the bucket it was placed in, if any
+                self._remove(question_id)
+                if not bank.is_live(question_id):
+                    continue
+                (category,), (difficulty,) = bank.codes([question_id])
+                self._category_codes[question_id] = category
+                if question_id >= first_new:
+                    self.ratings[question_id] = DIFFICULTY_PRIORS.get(bank.difficulty_names[difficulty], 0.0)
+                self._place(question_id)
+
+    def record(self, question_id, ability, correct):
+        """Updates the question's difficulty after a player of this ability answered it."""
+        with self._lock:
+            rating = self.ratings[question_id]
+            step = max(self.min_item_step, self.item_step / math.sqrt(1 + self.attempts[question_id]))
+            self.attempts[question_id] += 1
+            self._move(question_id, rating - step * (float(correct) - success_probability(ability, rating)))
+
+    def next_question(self, ability, seen, category=ALL, max_id=None):
+        """Returns the unseen question whose difficulty is closest to ability, or None.
+
+        max_id excludes questions added to a live bank after the quiz began.
+        """
+        if category == ALL:
+            groups = list(self._buckets.values())
+        elif category in self.category_names:
+            groups = [self._buckets.get(self.category_names.index(category), {})]
+        else:
+            return None
+        with self._lock:
+            keys = [key for buckets in groups for key in buckets]
+            if not keys:
+                return None
+            center = self._bucket(ability)
+            low, high = min(keys), max(keys)
+            best = None
+            for distance in range(max(center - low, high - center) + 1):
+                # Every question distance buckets away is at least distance - 1 bucket widths off
+                if best is not None and best[0] <= (distance - 1) * self.bucket_width:
+                    break
+                for bucket in {center - distance, center + distance}:
+                    for buckets in groups:
+                        found = self._closest(buckets.get(bucket), ability, seen, max_id)
+                        if found is not None and (best is None or found < best):
+                            best = found
+        return None if best is None else best[1]
+
+    @staticmethod
+    def _closest(bucket, ability, seen, max_id):
+        # Caller holds the lock. Walks outward from ability in one sorted bucket; returns (gap, id) or None
+        if bucket is None:
+            return None
+        ratings, ids = bucket
+        right = bisect_left(ratings, ability)
+        left = right - 1
+        while left >= 0 or right < len(ids):
+            left_gap = ability - ratings[left] if left >= 0 else math.inf
+            right_gap = ratings[right] - ability if right < len(ids) else math.inf
+            if left_gap <= right_gap:
+                question_id, gap = ids[left], left_gap
+                left -= 1
+            else:
+                question_id, gap = ids[right], right_gap
+                right += 1
+            if question_id not in seen and (max_id is None or question_id < max_id):
+                return gap, question_id
+        return None
@@ -0,0 +1,146 @@
+# analytics.py
+import numpy as np
+
+from question_bank import difficulty_sort_key
+
+PERCENTILES = (50, 90, 99)
+
+
+class QuizResults:
+    """Breakdowns of one quiz computed from integer-coded label arrays.
+
+    totals and hits are (category x difficulty) count matrices; every
+    other breakdown is a reduction of them.
+    """
+
+    def __init__(self, category_names, difficulty_names, totals, hits, latency_percentiles, latency_overall=None):
+        self.category_names = category_names
+        self.difficulty_names = difficulty_names
+        self.totals = totals
+        self.hits = hits
+        self.latency_percentiles = latency_percentiles
+        self.latency_overall = latency_overall
+
+    @property
+    def total(self):
+        return int(self.totals.sum())
+
+    @property
+    def correct(self):
+        return int(self.hits.sum())
+
+    @staticmethod
+    def _percentages(hits, totals):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(totals > 0, hits * 100.0 / totals, np.nan)
+
+    def _present_categories(self):
+        codes = np.flatnonzero(self.totals.sum(axis=1))
+        return sorted(codes, key=lambda c: self.category_names[c])
+
+    def _present_difficulties(self):
+        codes = np.flatnonzero(self.totals.sum(axis=0))
+        return sorted(codes, key=lambda d: difficulty_sort_key(self.difficulty_names[d]))
+
+    def by_category(self):
+        """Returns {category: percentage correct} for the categories asked."""
+        percentages = self._percentages(self.hits.sum(axis=1), self.totals.sum(axis=1))
+        return {self.category_names[c]: float(percentages[c]) for c in self._present_categories()}
+
+    def by_difficulty(self):
+        """Returns {difficulty: percentage correct} for the difficulties asked."""
+        percentages = self._percentages(self.hits.sum(axis=0), self.totals.sum(axis=0))
+        return {self.difficulty_names[d]: float(percentages[d]) for d in self._present_difficulties()}
+
+    def by_category_and_difficulty(self):
+        """Returns {category: {difficulty: percentage or None}} over the labels asked."""
+        percentages = self._percentages(self.hits, self.totals)
+        difficulties = self._present_difficulties()
+        return {
+            self.category_names[c]: {
+                self.difficulty_names[d]: None if np.isnan(percentages[c, d]) else float(percentages[c, d])
+                for d in difficulties
+            }
+            for c in self._present_categories()
+        }
+
+    def latency_summary(self):
+        """Returns {"mean": ..., "p50": ..., "p90": ..., "p99": ...} over the whole quiz."""
+        return dict(self.latency_overall) if self.latency_overall is not None else {}
+
+    def latency_by_category(self):
+        """Returns {category: {"p50": ..., "p90": ..., "p99": ...}} in the latency unit given."""
+        if self.latency_percentiles is None:
+            return {}
+        return {
+            self.category_names[c]: {f"p{p}": float(v) for p, v in zip(PERCENTILES, self.latency_percentiles[c])}
+            for c in self._present_categories()
+        }
+
+
+def _interpolate(ordered, starts, counts, fraction):
+    # Fractional rank of each percentile inside each sorted run of ordered
+    rank = (counts[:, None] - 1) * fraction[None, :]
+    low = np.floor(rank).astype(np.intp)
+    high = np.minimum(low + 1, counts[:, None] - 1)
+    weight = rank - low
+    return ordered[starts[:, None] + low] * (1 - weight) + ordered[starts[:, None] + high] * weight
+
+
+def sorted_percentiles(values, groups, n_groups, percentiles=PERCENTILES):
+    """Linear-interpolated percentiles of all values and of the values within each group.
+
+    Returns (overall, grouped): a len(percentiles) array and an
+    (n_groups x len(percentiles)) array in which empty groups are NaN.
+    One sort serves both: the values are sorted once, giving the overall
+    percentiles, then stably regrouped by a radix sort on the small group
+    codes so each group's run stays in value order.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups, dtype=np.int16 if n_groups <= np.iinfo(np.int16).max else np.intp)
+    fraction = np.asarray(percentiles, dtype=np.float64) / 100.0
+    grouped = np.full((n_groups, len(percentiles)), np.nan)
+    if not len(values):
+        return np.full(len(percentiles), np.nan), grouped
+    order = np.argsort(values)
+    ordered = values[order]
+    overall = _interpolate(ordered, np.zeros(1, dtype=np.intp), np.array([len(values)]), fraction)[0]
+    ordered = ordered[np.argsort(groups[order], kind="stable")]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+    grouped[present] = _interpolate(ordered, starts[present], counts[present], fraction)
+    return overall, grouped
+
+
+def grouped_percentiles(values, groups, n_groups, percentiles=PERCENTILES):
+    """Linear-interpolated percentiles of values within each group, without a Python loop.
+
+    Returns an (n_groups x len(percentiles)) array; empty groups are NaN.
+    """
+    return sorted_percentiles(values, groups, n_groups, percentiles)[1]
+
+
+def summarize(correct, category_codes, difficulty_codes, category_names, difficulty_names, latencies=None):
+    """Computes every breakdown of a quiz with one bincount over pair codes."""
+    n_categories, n_difficulties = len(category_names), len(difficulty_names)
+    category_codes = np.asarray(category_codes, dtype=np.intp)
+    pairs = category_codes * n_difficulties + np.asarray(difficulty_codes, dtype=np.intp)
+    size = n_categories * n_difficulties
+    totals = np.bincount(pairs, minlength=size).reshape(n_categories, n_difficulties)
+    hits = np.bincount(pairs, weights=np.asarray(correct, dtype=np.float64), minlength=size)
+    hits = hits.astype(np.int64).reshape(n_categories, n_difficulties)
+    latency_percentiles = latency_overall = None
+    if latencies is not None and len(latencies) == len(category_codes) and len(latencies):
+        overall, latency_percentiles = sorted_percentiles(latencies, category_codes, n_categories)
+        latency_overall = {"mean": float(np.mean(latencies))}
+        latency_overall.update((f"p{p}", float(v)) for p, v in zip(PERCENTILES, overall))
+    return QuizResults(category_names, difficulty_names, totals, hits, latency_percentiles, latency_overall)
+
+
+def summarize_quiz(bank, question_ids, answers, latencies=None):
+    """Summarizes a quiz given the bank, the ids asked and the chosen options."""
+    correct = np.asarray(answers) == bank.answer_key(question_ids)
+    category_codes, difficulty_codes = bank.codes(question_ids)
+    return summarize(correct, category_codes, difficulty_codes,
+                     bank.category_names, bank.difficulty_names, latencies)
@@ -1,13 +1,23 @@
 # app.py
 import streamlit as st
-import random
+import os
+import threading
 import time
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-from PIL import Image
-import base64
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from styles import get_styles  # Import CSS from styles.py
+from question_bank import ALL
+from bank_format import open_bank
+from attempt_log import AttemptLog
+from leaderboard import Leaderboard
+from adaptive import ItemCalibration
+from quiz_engine import QuizEngine
+from question_render import RenderCache, render_header
+from metrics import Metrics, timed
+from search_index import SearchIndex
+from session_store import open_session_store
+from spaced_repetition import ReviewScheduler
+from live_bank import LiveBank
 
 # Set page configuration
 st.set_page_config(
@@ -17,51 +27,75 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Apply custom CSS
-st.markdown(get_styles(), unsafe_allow_html=True)
+# Quiz length choices offered below the pool size
+QUIZ_LENGTHS = [5, 10, 20, 50]
+
+# Most questions one review session asks
+REVIEW_LIMIT = 50
 
-class Question:
-    def __init__(self, prompt, options, correct_answer, explanation, category, difficulty):
-        self.prompt = prompt
-        self.options = options
-        self.correct_answer = correct_answer
-        self.explanation = explanation
-        self.category = category
-        self.difficulty = difficulty
+# Feedback under the final score, highest threshold first; built once per process
+SCORE_MESSAGES = [
+    (80, """
+    <div style="margin: 20px 0;">
+        <h3 style="color: #28a745;">Excellent job! 🏆</h3>
+        <p>You're a Python master! Your knowledge is impressive.</p>
+    </div>
+    """),
+    (60, """
+    <div style="margin: 20px 0;">
+        <h3 style="color: #ffc107;">Good work! 👍</h3>
+        <p>You have a solid understanding of Python.</p>
+    </div>
+    """),
+    (0, """
+    <div style="margin: 20px 0;">
+        <h3 style="color: #dc3545;">Keep practicing! 💪</h3>
+        <p>With more study, you'll improve your Python knowledge.</p>
+    </div>
+    """),
+]
+
+# Apply custom CSS; fragment reruns skip this, full runs reuse the cached string
+st.markdown(get_styles(), unsafe_allow_html=True)
 
 class QuizGame:
-    def __init__(self, questions):
-        self.questions = questions
-        self.total_questions = len(questions)
+    """Streamlit rendering over a QuizEngine; quiz progress lives in st.session_state.quiz.
+
+    With a session store, progress is also saved under the ?session= key in
+    the page URL after every change, so reopening that URL on any worker
+    resumes the quiz.
+    """
+    
+    def __init__(self, engine, render_cache, metrics=None, sessions=None):
+        self.engine = engine
+        self.render_cache = render_cache
+        self.metrics = metrics
+        self.sessions = sessions
+        self.total_questions = len(engine.bank)
+        # Set once this run has reported, so a full rerun that also ran the question fragment reports once
+        self.metrics_reported = False
         
         # Initialize session state variables if they don't exist
-        if 'score' not in st.session_state:
-            st.session_state.score = 0
-        if 'current_question' not in st.session_state:
-            st.session_state.current_question = 0
-        if 'answered' not in st.session_state:
-            st.session_state.answered = False
-        if 'selected_option' not in st.session_state:
-            st.session_state.selected_option = None
+        if 'quiz' not in st.session_state:
+            st.session_state.quiz = None
         if 'quiz_started' not in st.session_state:
             st.session_state.quiz_started = False
-        if 'quiz_completed' not in st.session_state:
-            st.session_state.quiz_completed = False
-        if 'correct_answers' not in st.session_state:
-            st.session_state.correct_answers = []
-        if 'time_taken' not in st.session_state:
-            st.session_state.time_taken = []
-        if 'start_time' not in st.session_state:
-            st.session_state.start_time = None
         if 'selected_category' not in st.session_state:
-            st.session_state.selected_category = "All"
+            st.session_state.selected_category = ALL
         if 'selected_difficulty' not in st.session_state:
-            st.session_state.selected_difficulty = "All"
+            st.session_state.selected_difficulty = ALL
         if 'username' not in st.session_state:
             st.session_state.username = ""
-        if 'filtered_questions' not in st.session_state:
-            st.session_state.filtered_questions = questions
+        if 'selected_length' not in st.session_state:
+            st.session_state.selected_length = ALL
+        if 'adaptive_mode' not in st.session_state:
+            st.session_state.adaptive_mode = False
+        if 'review_mode' not in st.session_state:
+            st.session_state.review_mode = False
+        if self.sessions is not None and 'session_key' not in st.session_state:
+            self.restore_quiz()
             
+    @timed("display_welcome")
     def display_welcome(self):
         col1, col2 = st.columns([2, 1])
         
@@ -74,39 +108,76 @@ class QuizGame:
             if username:
                 st.session_state.username = username
             
-            # Get all available categories and difficulties
-            categories = ["All"] + list(set(q.category for q in self.questions))
-            difficulties = ["All"] + list(set(q.difficulty for q in self.questions))
+            # Review mode asks a named player's questions that are due again, most overdue first
+            review = False
+            if self.engine.scheduler is not None and st.session_state.username:
+                review = st.checkbox(
+                    "Review mode",
+                    value=st.session_state.review_mode,
+                    disabled=st.session_state.adaptive_mode,
+                    help="Questions you have answered come back on a spaced-repetition schedule."
+                )
+                st.session_state.review_mode = review
+            
+            # Adaptive mode picks each question's difficulty from the player's answers
+            adaptive = False
+            if self.engine.adaptive_available:
+                adaptive = st.checkbox(
+                    "Adaptive mode",
+                    value=st.session_state.adaptive_mode,
+                    disabled=review,
+                    help="Each question is chosen to match your estimated skill."
+                )
+                st.session_state.adaptive_mode = adaptive
+                if adaptive:
+                    st.session_state.selected_difficulty = ALL
+            
+            # Get all available categories and difficulties from the bank indexes
+            categories = [ALL] + self.engine.categories()
+            difficulties = [ALL] + self.engine.difficulties()
+            # A bank reload can empty the category or difficulty that was selected
+            if st.session_state.selected_category not in categories:
+                st.session_state.selected_category = ALL
+            if st.session_state.selected_difficulty not in difficulties:
+                st.session_state.selected_difficulty = ALL
             
             col_cat, col_diff = st.columns(2)
             with col_cat:
-                category = st.selectbox("Select Category:", categories, index=categories.index(st.session_state.selected_category))
+                category = st.selectbox("Select Category:", categories, index=categories.index(st.session_state.selected_category), disabled=review)
                 st.session_state.selected_category = category
             
             with col_diff:
-                difficulty = st.selectbox("Select Difficulty:", difficulties, index=difficulties.index(st.session_state.selected_difficulty))
+                difficulty = st.selectbox("Select Difficulty:", difficulties, index=difficulties.index(st.session_state.selected_difficulty), disabled=adaptive or review)
                 st.session_state.selected_difficulty = difficulty
             
-            # Filter questions based on selection
-            filtered_questions = self.questions
-            if category != "All":
-                filtered_questions = [q for q in filtered_questions if q.category == category]
-            if difficulty != "All":
-                filtered_questions = [q for q in filtered_questions if q.difficulty == difficulty]
+            # Count questions matching the selection, or due for review
+            if review:
+                pool_size = self.engine.due_reviews(st.session_state.username, REVIEW_LIMIT)
+                if pool_size == 0:
+                    st.info("Nothing is due for review yet. Play a quiz and your answers will come back here when due.")
+                    return
+                st.caption(f"{pool_size}{'+' if pool_size == REVIEW_LIMIT else ''} questions due for review")
+            else:
+                pool_size = self.engine.pool_size(category, difficulty)
             
             # Ensure we have questions left after filtering
-            if not filtered_questions:
+            if pool_size == 0:
                 st.warning("No questions match your selected filters. Please try a different combination.")
                 return
             
-            st.session_state.filtered_questions = filtered_questions
+            # Questions are drawn lazily from the pool, so any length is cheap
+            lengths = [n for n in QUIZ_LENGTHS if n < pool_size] + [ALL]
+            if st.session_state.selected_length not in lengths:
+                st.session_state.selected_length = ALL
+            length = st.selectbox("Number of Questions:", lengths, index=lengths.index(st.session_state.selected_length))
+            st.session_state.selected_length = length
                 
             # Start button
             if not st.session_state.quiz_started:
                 if st.button("Start Quiz", use_container_width=True):
                     self.reset_quiz()
                     st.session_state.quiz_started = True
-                    st.session_state.start_time = time.time()
+                    self.save_quiz()
             
         with col2:
             st.markdown("""
@@ -119,9 +190,9 @@ class QuizGame:
                 </ul>
             </div>
             """.format(
-                len(st.session_state.filtered_questions),
-                len(set(q.category for q in self.questions))-1,
-                len(set(q.difficulty for q in self.questions))
+                pool_size,
+                len(categories) - 1,
+                len(difficulties) - 1
             ), unsafe_allow_html=True)
             
             st.markdown("""
@@ -138,131 +209,115 @@ class QuizGame:
             """, unsafe_allow_html=True)
     
     def reset_quiz(self):
-        st.session_state.score = 0
-        st.session_state.current_question = 0
-        st.session_state.answered = False
-        st.session_state.selected_option = None
-        st.session_state.quiz_completed = False
-        st.session_state.correct_answers = []
-        st.session_state.time_taken = []
-        random.shuffle(st.session_state.filtered_questions)
+        # A quiz is fully described by its filters, length and seed; ?seed=N replays one
+        seed = st.query_params.get("seed", "")
+        if st.session_state.review_mode and st.session_state.username:
+            st.session_state.quiz = self.engine.start_review(
+                st.session_state.username, st.session_state.selected_length, REVIEW_LIMIT
+            )
+            return
+        st.session_state.quiz = self.engine.start(
+            st.session_state.selected_category,
+            st.session_state.selected_difficulty,
+            st.session_state.selected_length,
+            seed=int(seed) if seed.isdigit() else None,
+            adaptive=st.session_state.adaptive_mode
+        )
+    
+    def restore_quiz(self):
+        # The key lives in the URL, so a reload routed to another worker finds the same record
+        session_key = st.query_params.get("session") or uuid.uuid4().hex
+        st.query_params["session"] = session_key
+        st.session_state.session_key = session_key
+        record = self.sessions.load(session_key)
+        if record is None:
+            return
+        quiz, username = record
+        # A quiz on a bank generation that has since been dropped would be graded against another pool
+        if not self.engine.resumable(quiz):
+            self.sessions.delete(session_key)
+            st.toast("The question bank has changed too much since this quiz was saved. Please start a new one.")
+            return
+        st.session_state.quiz = quiz
+        st.session_state.quiz_started = True
+        st.session_state.username = username or st.session_state.username
     
+    def save_quiz(self):
+        # One small upsert per change: start, first showing of a question, answer and advance
+        if self.sessions is not None:
+            self.sessions.save(st.session_state.session_key, st.session_state.quiz, st.session_state.username)
+    
+    @st.fragment
+    @timed("display_question")
     def display_question(self):
-        if st.session_state.current_question < len(st.session_state.filtered_questions):
-            question = st.session_state.filtered_questions[st.session_state.current_question]
-            
-            # Display question number and progress
-            progress = (st.session_state.current_question) / len(st.session_state.filtered_questions)
-            st.markdown(f"""
-            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
-                <span class="badge" style="background-color: #6c757d;">Question {st.session_state.current_question + 1}/{len(st.session_state.filtered_questions)}</span>
-                <span class="badge" style="background-color: {self.get_difficulty_color(question.difficulty)};">{question.difficulty}</span>
-                <span class="badge">{question.category}</span>
-            </div>
-            <div class="progress-bar-bg">
-                <div class="progress-bar-fill" style="width: {progress * 100}%;"></div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Display question
-            st.markdown(f"""
-            <div class="question-card">
-                <h2 style="color: #2C3E50; margin-bottom: 20px;">{question.prompt}</h2>
-            </div>
-            """, unsafe_allow_html=True)
+        # Clicks rerun only this fragment; the page chrome and CSS are left in place
+        quiz = st.session_state.quiz
+        if quiz.completed:
+            # The last Next click finished the quiz, so the whole page changes
+            st.rerun()
+        
+        # Decode only the question being displayed, from the bank version the quiz started on
+        question_id = self.engine.question_id(quiz)
+        bank = self.engine.snapshot(quiz)
+        question = bank[question_id]
+        
+        # Display question number and progress
+        st.markdown(render_header(question, quiz.cursor, quiz.length), unsafe_allow_html=True)
+        
+        # Display question; the card and feedback HTML come from the shared render cache
+        st.markdown(self.render_cache.card(question_id, bank), unsafe_allow_html=True)
+        
+        # If not answered yet, display option buttons
+        if not quiz.answered:
+            # Latency is measured server-side from the first time this question is shown
+            if not quiz.shown_at_ns:
+                self.engine.show(quiz)
+                self.save_quiz()
             
-            # If not answered yet, display option buttons
-            if not st.session_state.answered:
-                question_start_time = time.time()
-                
-                # Display options as buttons
-                for i, option in enumerate(question.options, 1):
-                    if st.button(f"{i}. {option}", key=f"option_{i}", use_container_width=True):
-                        st.session_state.selected_option = i
-                        st.session_state.answered = True
-                        
-                        # Calculate time taken
-                        time_taken = time.time() - question_start_time
-                        st.session_state.time_taken.append(time_taken)
-                        
-                        # Check if answer is correct
-                        is_correct = (i == question.correct_answer)
-                        st.session_state.correct_answers.append(is_correct)
-                        
-                        if is_correct:
-                            st.session_state.score += 1
-                        
-                        # Force a rerun to show feedback
-                        st.rerun()
+            # Grade in the click callback, so the fragment's own rerun already shows feedback
+            for i, option in enumerate(question.options, 1):
+                st.button(
+                    f"{i}. {option}", key=f"option_{i}", use_container_width=True,
+                    on_click=self.choose_option, args=(quiz, i)
+                )
+        
+        # If answered, display the options coloured by the answer and the feedback
+        else:
+            st.markdown(self.render_cache.feedback(question_id, quiz.selected_option, bank), unsafe_allow_html=True)
             
-            # If answered, display feedback
-            else:
-                selected_option = st.session_state.selected_option
-                is_correct = (selected_option == question.correct_answer)
-                
-                # Display selected option with styling
-                for i, option in enumerate(question.options, 1):
-                    button_style = ""
-                    if i == selected_option:
-                        if is_correct:
-                            button_style = "background-color: #d4edda; border-color: #c3e6cb;"
-                        else:
-                            button_style = "background-color: #f8d7da; border-color: #f5c6cb;"
-                    elif i == question.correct_answer and not is_correct:
-                        button_style = "background-color: #d4edda; border-color: #c3e6cb;"
-                    
-                    st.markdown(f"""
-                    <div class="option-button" style="{button_style}">
-                        {i}. {option}
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                # Display feedback message
-                if is_correct:
-                    st.markdown(f"""
-                    <div class="feedback-correct">
-                        <strong>✓ Correct!</strong> Well done!
-                        <p>{question.explanation}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div class="feedback-incorrect">
-                        <strong>✗ Incorrect.</strong> The correct answer was: {question.correct_answer}. {question.options[question.correct_answer-1]}
-                        <p>{question.explanation}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                # Next question button
-                if st.button("Next Question", use_container_width=True):
-                    st.session_state.current_question += 1
-                    st.session_state.answered = False
-                    st.session_state.selected_option = None
-                    
-                    # Check if the quiz is complete
-                    if st.session_state.current_question >= len(st.session_state.filtered_questions):
-                        st.session_state.quiz_completed = True
-                    
-                    # Force a rerun to display next question
-                    st.rerun()
+            # Next question button
+            st.button("Next Question", use_container_width=True, on_click=self.next_question, args=(quiz,))
+        
+        # Fragment reruns skip main(), so they report their own metrics
+        self.report_metrics()
+    
+    def choose_option(self, quiz, choice):
+        # Ignore a stale click from a quiz that has since been replaced or answered
+        if quiz is not st.session_state.quiz or quiz.completed or quiz.answered:
+            return
+        self.engine.answer(quiz, choice, user=st.session_state.username or "Player")
+        self.save_quiz()
     
-    def get_difficulty_color(self, difficulty):
-        colors = {
-            "Easy": "#28a745",
-            "Medium": "#ffc107",
-            "Hard": "#dc3545"
-        }
-        return colors.get(difficulty, "#6c757d")
+    def next_question(self, quiz):
+        if quiz is st.session_state.quiz and not quiz.completed:
+            self.engine.advance(quiz)
+            self.save_quiz()
     
+    @timed("display_final_result")
     def display_final_result(self):
-        # Calculate total time
-        total_time = time.time() - st.session_state.start_time
-        average_time = sum(st.session_state.time_taken) / len(st.session_state.time_taken) if st.session_state.time_taken else 0
+        quiz = st.session_state.quiz
+        
+        # Compute every breakdown in one vectorized pass over the quiz
+        results = self.engine.results(quiz)
+        
+        # Calculate total time and the per-question latency distribution in seconds
+        total_time = time.time() - quiz.started_at
+        latency = {name: value / 1000 for name, value in results.latency_summary().items()}
         
         # Calculate score
-        score = st.session_state.score
-        total = len(st.session_state.filtered_questions)
-        percentage = (score / total) * 100
+        score = quiz.score
+        total = quiz.length
+        percentage = (score / total) * 100 if total else 0.0
         
         # Display result header
         st.markdown(f"""
@@ -278,27 +333,23 @@ class QuizGame:
         """, unsafe_allow_html=True)
         
         # Add feedback based on score
-        if percentage >= 80:
-            st.markdown("""
-            <div style="margin: 20px 0;">
-                <h3 style="color: #28a745;">Excellent job! 🏆</h3>
-                <p>You're a Python master! Your knowledge is impressive.</p>
-            </div>
-            """, unsafe_allow_html=True)
-        elif percentage >= 60:
-            st.markdown("""
-            <div style="margin: 20px 0;">
-                <h3 style="color: #ffc107;">Good work! 👍</h3>
-                <p>You have a solid understanding of Python.</p>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown("""
-            <div style="margin: 20px 0;">
-                <h3 style="color: #dc3545;">Keep practicing! 💪</h3>
-                <p>With more study, you'll improve your Python knowledge.</p>
-            </div>
-            """, unsafe_allow_html=True)
+        st.markdown(next(html for threshold, html in SCORE_MESSAGES if percentage >= threshold), unsafe_allow_html=True)
+        
+        # Submit the result once and rank it against everyone who took this selection; reviews are not ranked
+        leaderboard = None if quiz.review else self.engine.leaderboard
+        if leaderboard is not None:
+            # The rank is saved with the quiz, so reopening its results page never submits it again
+            if quiz.rank is None:
+                self.engine.submit_result(quiz, st.session_state.username or "Player")
+                self.save_quiz()
+            players = leaderboard.players(quiz.category, quiz.difficulty)
+            if players > 1:
+                st.markdown(f"""
+                <div style="margin: 20px 0;">
+                    <h4>You beat {quiz.rank * 100:.0f}% of players</h4>
+                    <p>{players} quizzes completed for {quiz.category} / {quiz.difficulty}</p>
+                </div>
+                """, unsafe_allow_html=True)
         
         # Display time statistics
         st.markdown(f"""
@@ -309,217 +360,325 @@ class QuizGame:
                 </div>
                 <div style="text-align: center; padding: 10px; background-color: #f8f9fa; border-radius: 5px; min-width: 150px;">
                     <h4>Avg. Time per Question</h4>
-                    <p>{average_time:.1f} sec</p>
+                    <p>{latency.get("mean", 0):.1f} sec</p>
+                </div>
+                <div style="text-align: center; padding: 10px; background-color: #f8f9fa; border-radius: 5px; min-width: 150px;">
+                    <h4>p50 / p90 / p99</h4>
+                    <p>{latency.get("p50", 0):.1f} / {latency.get("p90", 0):.1f} / {latency.get("p99", 0):.1f} sec</p>
                 </div>
             </div>
         </div>
         """, unsafe_allow_html=True)
         
+        # Charts and tables of the breakdowns
+        self.display_charts(results)
+        
+        # Display the leaderboard for this selection
+        if leaderboard is not None:
+            top = leaderboard.top(quiz.category, quiz.difficulty)
+            if top:
+                st.markdown("""
+                <div class="stats-card">
+                    <h3 style="text-align: center; color: #2C3E50;">Leaderboard</h3>
+                </div>
+                """, unsafe_allow_html=True)
+                
+                import pandas as pd
+                df = pd.DataFrame(top, columns=["Player", "Score", "Percentage"])
+                df.index = range(1, len(df) + 1)
+                st.dataframe(df.style.format({"Percentage": "{:.1f}%"}), use_container_width=True)
+        
+        # Seed for reproducing this exact quiz, or the final estimate in adaptive mode
+        if quiz.adaptive:
+            st.caption(f"Estimated ability: {quiz.ability:+.2f} (0 is an average player)")
+        elif quiz.review:
+            st.caption("Each question you reviewed comes back when it is next due.")
+        else:
+            st.caption(f"Quiz seed: {quiz.seed} (open the app with ?seed={quiz.seed} to replay it)")
+        
+        # Play again button
+        if st.button("Play Again", use_container_width=True):
+            self.reset_quiz()
+            st.session_state.quiz_started = False
+            if self.sessions is not None:
+                self.sessions.delete(st.session_state.session_key)
+            st.rerun()
+    
+    @timed("charts")
+    def display_charts(self, results):
+        # pandas is the slowest import in the app, so only the results screen loads it
+        import pandas as pd
+        
+        by_category = results.by_category()
+        by_difficulty = results.by_difficulty()
+        
         # Create columns for statistics charts
         col1, col2 = st.columns(2)
         
         with col1:
             # Create performance by category
-            if len(set(q.category for q in st.session_state.filtered_questions)) > 1:
+            if len(by_category) > 1:
                 st.markdown("""
                 <div class="stats-card">
                     <h3 style="text-align: center; color: #2C3E50;">Performance by Category</h3>
                 </div>
                 """, unsafe_allow_html=True)
                 
-                # Create dataframe for category performance
-                categories = {}
-                for i, q in enumerate(st.session_state.filtered_questions):
-                    if q.category not in categories:
-                        categories[q.category] = {"correct": 0, "total": 0}
-                    categories[q.category]["total"] += 1
-                    if st.session_state.correct_answers[i]:
-                        categories[q.category]["correct"] += 1
-                
-                # Calculate percentages and create dataframe
-                category_data = {
-                    "Category": [],
-                    "Percentage": []
-                }
-                for cat, data in categories.items():
-                    category_data["Category"].append(cat)
-                    category_data["Percentage"].append((data["correct"] / data["total"]) * 100)
-                
-                df = pd.DataFrame(category_data)
+                df = pd.DataFrame({"Category": list(by_category), "Percentage": list(by_category.values())})
                 st.bar_chart(df.set_index("Category"))
         
         with col2:
             # Create performance by difficulty
-            if len(set(q.difficulty for q in st.session_state.filtered_questions)) > 1:
+            if len(by_difficulty) > 1:
                 st.markdown("""
                 <div class="stats-card">
                     <h3 style="text-align: center; color: #2C3E50;">Performance by Difficulty</h3>
                 </div>
                 """, unsafe_allow_html=True)
                 
-                # Create dataframe for difficulty performance
-                difficulties = {}
-                for i, q in enumerate(st.session_state.filtered_questions):
-                    if q.difficulty not in difficulties:
-                        difficulties[q.difficulty] = {"correct": 0, "total": 0}
-                    difficulties[q.difficulty]["total"] += 1
-                    if st.session_state.correct_answers[i]:
-                        difficulties[q.difficulty]["correct"] += 1
-                
-                # Calculate percentages and create dataframe
-                difficulty_data = {
-                    "Difficulty": [],
-                    "Percentage": []
-                }
-                for diff, data in difficulties.items():
-                    difficulty_data["Difficulty"].append(diff)
-                    difficulty_data["Percentage"].append((data["correct"] / data["total"]) * 100)
-                
-                df = pd.DataFrame(difficulty_data)
+                df = pd.DataFrame({"Difficulty": list(by_difficulty), "Percentage": list(by_difficulty.values())})
                 st.bar_chart(df.set_index("Difficulty"))
         
-        # Play again button
-        if st.button("Play Again", use_container_width=True):
-            self.reset_quiz()
-            st.session_state.quiz_started = False
-            st.session_state.quiz_completed = False
-            st.rerun()
+        col3, col4 = st.columns(2)
+        
+        with col3:
+            # Create accuracy by category and difficulty
+            if len(by_category) > 1 or len(by_difficulty) > 1:
+                st.markdown("""
+                <div class="stats-card">
+                    <h3 style="text-align: center; color: #2C3E50;">Accuracy by Category and Difficulty (%)</h3>
+                </div>
+                """, unsafe_allow_html=True)
+                
+                df = pd.DataFrame(results.by_category_and_difficulty()).T
+                st.dataframe(df.style.format("{:.0f}", na_rep="–"), use_container_width=True)
+        
+        with col4:
+            # Create time per question percentiles by category
+            category_latency = results.latency_by_category()
+            if category_latency:
+                st.markdown("""
+                <div class="stats-card">
+                    <h3 style="text-align: center; color: #2C3E50;">Time per Question by Category (sec)</h3>
+                </div>
+                """, unsafe_allow_html=True)
+                
+                df = pd.DataFrame(category_latency).T / 1000
+                st.dataframe(df.style.format("{:.1f}"), use_container_width=True)
+    
+    def report_metrics(self):
+        # Count this session as active and write the metrics file if it is due
+        if self.metrics is None:
+            return
+        if "metrics_session" not in st.session_state:
+            st.session_state.metrics_session = uuid.uuid4().hex[:12]
+        self.metrics.observe_session(st.session_state.metrics_session, st.session_state)
+        self.metrics.write()
+        self.metrics_reported = True
     
+    @timed("run")
     def run(self):
         if not st.session_state.quiz_started:
             self.display_welcome()
-        elif st.session_state.quiz_completed:
+        elif st.session_state.quiz.completed:
             self.display_final_result()
         else:
             self.display_question()
 
-# Create expanded questions with categories and difficulty levels
-questions = [
-    Question(
-        "What is the correct way to create a function in Python?",
-        ["function myFunc():", "def myFunc():", "create myFunc():", "func myFunc():"],
-        2,
-        "In Python, functions are defined using the 'def' keyword followed by the function name and parentheses.",
-        "Basics",
-        "Easy"
-    ),
-    Question(
-        "Which of the following is NOT a valid variable name in Python?",
-        ["my_var", "myVar", "2myVar", "_myVar"],
-        3,
-        "Variable names cannot start with a number in Python.",
-        "Basics",
-        "Easy"
-    ),
-    Question(
-        "What does the 'len()' function do in Python?",
-        ["Calculates the length of a string", "Returns the largest item in a list", "Counts the number of items in a list, tuple, or string", "None of the above"],
-        3,
-        "The len() function returns the number of items in an object like strings, lists, tuples, etc.",
-        "Basics",
-        "Easy"
-    ),
-    Question(
-        "What is the output of: print(2 ** 3)?",
-        ["6", "8", "5", "Error"],
-        2,
-        "The ** operator in Python represents exponentiation. 2 raised to the power of 3 equals 8.",
-        "Operators",
-        "Easy"
-    ),
-    Question(
-        "Which data type is mutable in Python?",
-        ["String", "Tuple", "List", "Integer"],
-        3,
-        "Lists are mutable, meaning they can be changed after creation. Strings, tuples, and integers are immutable.",
-        "Data Types",
-        "Medium"
-    ),
-    Question(
-        "What is the correct way to import a module named 'mymodule' in Python?",
-        ["import mymodule", "include mymodule", "using mymodule", "#include <mymodule>"],
-        1,
-        "In Python, modules are imported using the 'import' keyword followed by the module name.",
-        "Modules",
-        "Easy"
-    ),
-    Question(
-        "Which of the following is a correct way to create a list comprehension in Python?",
-        ["[x * 2 for x in range(10)]", "list(x * 2 for x in range(10))", "array[x * 2 for x in range(10)]", "All of the above"],
-        1,
-        "List comprehensions use square brackets and follow the pattern [expression for item in iterable].",
-        "Data Structures",
-        "Medium"
-    ),
-    Question(
-        "What is the purpose of the '__init__' method in Python classes?",
-        ["To initialize class attributes", "To create new instances", "To define class methods", "To delete objects"],
-        1,
-        "The '__init__' method is called when an object is created and is used to initialize attributes of the class.",
-        "OOP",
-        "Medium"
-    ),
-    Question(
-        "What is the correct way to catch all exceptions in Python?",
-        ["catch(Exception e) { }", "except Exception as e:", "try(Exception e) { }", "catch Exception as e:"],
-        2,
-        "In Python, 'except Exception as e:' is used to catch all exceptions and store the exception object in variable e.",
-        "Error Handling",
-        "Medium"
-    ),
-    Question(
-        "What is a decorator in Python?",
-        ["A function that takes a function and returns a function", "A class inheritance mechanism", "A type of loop", "A way to format output"],
-        1,
-        "A decorator is a function that takes another function as an argument, extends its behavior, and returns it.",
-        "Advanced",
-        "Hard"
-    ),
-    Question(
-        "What is the purpose of 'self' in Python class methods?",
-        ["To reference the class itself", "To reference the current instance of the class", "To make the method private", "To reference the parent class"],
-        2,
-        "In Python class methods, 'self' is a reference to the instance of the class. It's used to access variables and methods belonging to the instance.",
-        "OOP",
-        "Medium"
-    ),
-    Question(
-        "What is the difference between '==' and 'is' in Python?",
-        ["'==' checks for equality of value, 'is' checks for identity", "They are identical in functionality", "'==' is for numbers, 'is' is for strings", "'is' checks for equality of value, '==' checks for identity"],
-        1,
-        "'==' checks if two objects have the same value, while 'is' checks if two references refer to the same object in memory.",
-        "Operators",
-        "Medium"
-    ),
-    Question(
-        "What is a generator in Python?",
-        ["A function that returns a list", "A function that yields values one at a time", "A class that generates random numbers", "A tool for generating Python code"],
-        2,
-        "A generator is a function that returns an iterator that yields items one at a time, rather than returning them all at once.",
-        "Advanced",
-        "Hard"
-    ),
-    Question(
-        "Which of the following is a valid way to create a set in Python?",
-        ["{1, 2, 3}", "set([1, 2, 3])", "Both A and B", "Neither A nor B"],
-        3,
-        "In Python, sets can be created using curly braces {1, 2, 3} or the set() constructor with an iterable.",
-        "Data Structures",
-        "Medium"
-    ),
-    Question(
-        "What does the 'yield' keyword do in Python?",
-        ["Returns a value from a function", "Pauses a function and returns a value", "Ends a function execution", "Creates a new object"],
-        2,
-        "The 'yield' keyword pauses a function's execution and returns a value, allowing the function to resume from where it left off when called again.",
-        "Advanced",
-        "Hard"
-    )
-]
+@st.cache_resource
+def start_bank_load():
+    # Load the bank once per process on a worker thread, so a cold start can paint before it is ready.
+    # A compiled bank is memory-mapped so server processes share one copy; a directory of question
+    # files is watched and reloaded in place; otherwise build the indexes over the built-in questions
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bank-loader")
+    future = executor.submit(open_bank, os.environ.get("QUIZ_BANK_PATH"))
+    executor.shutdown(wait=False)
+    return future
+
+@st.cache_resource
+def load_question_bank():
+    try:
+        return start_bank_load().result()
+    except Exception:
+        # Forget the failed load, so the next run starts another instead of raising this error forever
+        start_bank_load.clear()
+        raise
+
+@st.cache_resource
+def load_attempt_log():
+    # One background writer per process; set QUIZ_ATTEMPT_LOG to "" to disable logging
+    path = os.environ.get("QUIZ_ATTEMPT_LOG", "attempts.db")
+    return AttemptLog(path) if path else None
+
+@st.cache_resource
+def load_scheduler():
+    # Spaced-repetition schedules of named players; set QUIZ_REVIEW_DB to "" to keep them in memory only
+    path = os.environ.get("QUIZ_REVIEW_DB", "reviews.db")
+    return ReviewScheduler(path or None)
+
+@st.cache_resource
+def load_leaderboard():
+    # Shared by every session in this process
+    return Leaderboard()
+
+@st.cache_resource
+def load_calibration(_bank):
+    # Question difficulties are calibrated from every session's answers. Built by the first adaptive
+    # quiz, since it holds an entry per question that players who never use adaptive mode don't need
+    if not isinstance(_bank, LiveBank):
+        return ItemCalibration(_bank)
+    reloads = _bank.reloads
+    calibration = ItemCalibration(_bank)
+    _bank.subscribe(lambda generation, changed, seconds: calibration.update(changed))
+    if _bank.reloads != reloads:
+        # A reload landed while it was being built
+        calibration.update(range(len(_bank)))
+    return calibration
+
+@st.cache_resource
+def load_render_cache(_bank):
+    # Set QUIZ_PRERENDER=1 to render every question card and feedback panel at startup
+    render_cache = RenderCache(_bank)
+    if os.environ.get("QUIZ_PRERENDER") == "1":
+        render_cache.prerender()
+    return render_cache
+
+def build_search_index(bank):
+    if not isinstance(bank, LiveBank):
+        return SearchIndex.build(bank)
+    # Reloads wait for the build, then re-index what changed since the generation it read
+    lock = threading.Lock()
+    with lock:
+        indexed = [None]
+
+        def reindex(generation, changed, seconds):
+            with lock:
+                if generation.serial > indexed[0].serial:
+                    index.update(indexed[0], generation, changed)
+                    indexed[0] = generation
+
+        bank.subscribe(reindex)
+        generation = indexed[0] = bank.current
+        index = SearchIndex.build(generation)
+        # Iteration covers the questions a live bank has removed, which are not searchable
+        for question_id in range(len(generation)):
+            if not generation.is_live(question_id):
+                index.remove(question_id, generation[question_id])
+    return index
+
+@st.cache_resource
+def start_index_build(_bank):
+    # Index the bank on a worker thread; the admin view waits for it the first time it searches
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-index")
+    future = executor.submit(build_search_index, _bank)
+    executor.shutdown(wait=False)
+    return future
+
+@st.cache_resource
+def load_search_index(_bank):
+    return start_index_build(_bank).result()
+
+@st.cache_resource
+def load_session_store():
+    # QUIZ_SESSION_STORE is a SQLite path shared by every worker on the host, or "memory"; unset keeps
+    # progress only in this process's session_state
+    return open_session_store(os.environ.get("QUIZ_SESSION_STORE", ""))
+
+@st.cache_resource
+def load_engine():
+    bank = load_question_bank()
+    return QuizEngine(bank, lambda: load_calibration(bank), load_attempt_log(), load_leaderboard(), load_scheduler())
+
+@st.cache_resource
+def load_metrics():
+    # Opt-in: QUIZ_METRICS_FILE writes Prometheus text there, QUIZ_METRICS_PORT serves it on localhost
+    path = os.environ.get("QUIZ_METRICS_FILE")
+    port = os.environ.get("QUIZ_METRICS_PORT")
+    if not path and not port:
+        return None
+    metrics = Metrics(path, profile_dir=os.environ.get("QUIZ_PROFILE_DIR", "profiles"))
+    if port:
+        metrics.serve(int(port))
+    
+    render_cache = load_render_cache(load_question_bank())
+    metrics.register("quiz_render_cache_hits_total", "counter", "Question HTML served from the render cache.", lambda: render_cache.hits)
+    metrics.register("quiz_render_cache_misses_total", "counter", "Question HTML rendered on a cache miss.", lambda: render_cache.misses)
+    metrics.register("quiz_render_cache_entries", "gauge", "Rendered HTML fragments held in the cache.", lambda: len(render_cache))
+    attempt_log = load_attempt_log()
+    if attempt_log is not None:
+        metrics.register("quiz_attempt_log_pending", "gauge", "Answers queued for the attempt log writer.", lambda: attempt_log.pending)
+        metrics.register("quiz_attempt_log_dropped_total", "counter", "Answers dropped because the log queue was full.", lambda: attempt_log.dropped)
+    bank = load_question_bank()
+    if isinstance(bank, LiveBank):
+        # Reload latency, from seeing a changed file to publishing the new generation, is the bank_reload phase
+        bank.subscribe(lambda generation, changed, seconds: metrics.observe("bank_reload", seconds))
+        metrics.register("quiz_bank_version", "gauge", "Generation of the live question bank being served.", lambda: bank.version)
+        metrics.register("quiz_bank_questions", "gauge", "Questions listed in the live bank.", lambda: bank.count())
+        metrics.register("quiz_bank_reloads_total", "counter", "Changes applied to the live bank.", lambda: bank.reloads)
+        metrics.register("quiz_bank_last_reload_seconds", "gauge", "Time the last bank reload took.", lambda: bank.last_reload_seconds)
+        if bank.watcher is not None:
+            watcher = bank.watcher
+            metrics.register("quiz_bank_rejected_total", "counter", "Invalid rows skipped in watched question files.", lambda: watcher.rejected)
+            metrics.register("quiz_bank_read_errors_total", "counter", "Watched question files that could not be read.", lambda: watcher.errors)
+    return metrics
+
+def display_admin(bank):
+    """Full-text search over the bank for whoever maintains the questions."""
+    st.markdown("<h1 style='color: #2C3E50;'>Question Bank Admin</h1>", unsafe_allow_html=True)
+    query = st.text_input("Search questions:", placeholder="e.g. generator yield")
+    limit = st.selectbox("Results:", [10, 25, 50, 100])
+    if not query:
+        st.caption(f"{len(bank):,} questions in the bank.")
+        return
+    
+    index_build = start_index_build(bank)
+    if not index_build.done():
+        with st.spinner("Indexing questions..."):
+            index_build.result()
+    
+    started = time.perf_counter()
+    hits = load_search_index(bank).search(query, limit)
+    elapsed = time.perf_counter() - started
+    st.caption(f"{len(hits)} results in {elapsed * 1000:.1f} ms")
+    if hits:
+        rows = []
+        for question_id, score in hits:
+            question = bank[question_id]
+            rows.append({
+                "id": question_id,
+                "score": round(score, 2),
+                "category": question.category,
+                "difficulty": question.difficulty,
+                "prompt": question.prompt
+            })
+        st.dataframe(rows, hide_index=True, use_container_width=True)
 
 def main():
-    game = QuizGame(questions)
-    game.run()
+    # Only the first session of a process can find the bank still loading
+    bank_load = start_bank_load()
+    if not bank_load.done():
+        with st.spinner("Loading questions..."):
+            load_question_bank()
+    
+    # QUIZ_ADMIN=1 indexes the bank at startup and enables the ?view=admin search page
+    if os.environ.get("QUIZ_ADMIN") == "1":
+        start_index_build(load_question_bank())
+        if st.query_params.get("view") == "admin":
+            display_admin(load_question_bank())
+            return
+    
+    metrics = load_metrics()
+    game = QuizGame(load_engine(), load_render_cache(load_question_bank()), metrics, load_session_store())
+    
+    # With QUIZ_PROFILE=1, ?profile=1 runs this one rerun under cProfile and saves the stats
+    if metrics is not None and os.environ.get("QUIZ_PROFILE") == "1" and st.query_params.get("profile") == "1":
+        del st.query_params["profile"]
+        _, path = metrics.profile(game.run)
+        st.caption(f"Profile of this rerun written to {path}")
+    else:
+        game.run()
+    if not game.metrics_reported:
+        game.report_metrics()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,176 @@
+# attempt_log.py
+"""Durable, append-only log of every answer.
+
+Answers are queued in memory and written by one background thread in
+batched SQLite transactions, so recording never waits on disk I/O. The
+database runs in WAL mode: a crash loses at most the rows still queued
+(bounded by flush_interval), and SQLite replays the WAL on the next open.
+A database that fails its integrity check is moved aside and a fresh one
+is started instead of taking the app down.
+"""
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    question_id INTEGER NOT NULL,
+    choice INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    latency_ms INTEGER NOT NULL,
+    answered_at REAL NOT NULL
+)
+"""
+INSERT = "INSERT INTO attempts (user, question_id, choice, correct, latency_ms, answered_at) VALUES (?, ?, ?, ?, ?, ?)"
+
+_STOP = object()
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def open_database(path, schema):
+    """Opens (and if needed recovers) a WAL-mode SQLite database with the given schema."""
+    try:
+        connection = connect(path)
+        if connection.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+            raise sqlite3.DatabaseError("integrity check failed")
+    except sqlite3.DatabaseError as e:
+        # Keep the damaged file for inspection and start a new one
+        aside = f"{path}.corrupt-{int(time.time())}"
+        logger.error("Database %s is unreadable (%s); moving it to %s", path, e, aside)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.replace(path + suffix, aside + suffix)
+        connection = connect(path)
+    connection.executescript(schema)
+    return connection
+
+
+class AttemptLog:
+    """Append-only answer log written by a batching background thread.
+
+    record() never touches the disk: it enqueues the row and returns. When
+    the queue is full it waits up to put_timeout for the writer to catch up
+    and otherwise drops the row and counts it in dropped. A batch that still
+    fails after max_retries attempts (disk full, read-only file) is dropped
+    and counted too, so the writer keeps draining the queue.
+    """
+
+    def __init__(self, path, flush_interval=1.0, batch_size=500, max_queue=10000, put_timeout=0.05,
+                 max_retries=3, close_timeout=5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.close_timeout = close_timeout
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._connection = open_database(path, SCHEMA)
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="attempt-log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def record(self, user, question_id, choice, correct, latency_ms, answered_at=None):
+        """Queues one answer; returns False if it had to be dropped."""
+        row = (user, int(question_id), int(choice), int(bool(correct)), int(latency_ms),
+               time.time() if answered_at is None else answered_at)
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def _write(self, batch):
+        # A locked database is transient, so retry a few times; anything else drops the batch
+        delay = 0.05
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                with self._connection:
+                    self._connection.executemany(INSERT, batch)
+                self.written += len(batch)
+                return
+            except sqlite3.OperationalError as e:
+                if attempt == self.max_retries:
+                    error = e
+                    break
+                logger.warning("Attempt log write failed (%s); retrying", e)
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+            except sqlite3.Error as e:
+                error = e
+                break
+        self.dropped += len(batch)
+        logger.error("Dropping %d attempts that could not be written to %s: %s", len(batch), self.path, error)
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            if batch and (stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                for _ in batch:
+                    self._queue.task_done()
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        self._queue.task_done()
+
+    def flush(self):
+        """Blocks until every queued row has been committed."""
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        # Never block shutdown on a writer that cannot keep up or has died
+        try:
+            self._queue.put(_STOP, timeout=self.close_timeout)
+        except queue.Full:
+            logger.error("Attempt log queue still full on close; %d queued attempts are lost", self.pending)
+            return
+        self._writer.join(self.close_timeout)
+        if not self._writer.is_alive():
+            self._connection.close()
+
+    def attempts(self, user=None, limit=100):
+        """Returns the most recent committed attempts, newest first."""
+        reader = sqlite3.connect(self.path, timeout=30)
+        try:
+            if user is None:
+                rows = reader.execute("SELECT * FROM attempts ORDER BY id DESC LIMIT ?", (limit,))
+            else:
+                rows = reader.execute("SELECT * FROM attempts WHERE user = ? ORDER BY id DESC LIMIT ?", (user, limit))
+            return rows.fetchall()
+        finally:
+            reader.close()
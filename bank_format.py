@@ -0,0 +1,286 @@
+# bank_format.py
+"""Compiled, memory-mapped question bank files.
+
+Layout (little-endian, every section aligned to 8 bytes):
+
+    header    magic, version, counts and section offsets (HEADER)
+    labels    category then difficulty names as u16 length + UTF-8 bytes
+    records   one RECORD_DTYPE row per question
+    options   one OPTION_DTYPE row per answer option
+    index     pair starts/order and difficulty starts/order (see CodedBank)
+    heap      UTF-8 text referenced by records and options
+"""
+import argparse
+import mmap
+import os
+import shutil
+import struct
+from array import array
+
+import numpy as np
+
+from columnar_bank import CodedBank, QuestionView, group_by_code, pair_codes
+from question_bank import QuestionBank, intern_label
+
+MAGIC = b"PQBK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIII6Q")
+
+RECORD_DTYPE = np.dtype([
+    ("category", "<u2"),
+    ("difficulty", "u1"),
+    ("correct_answer", "i1"),
+    ("option_count", "<u4"),
+    ("option_start", "<u8"),
+    ("prompt_offset", "<u8"),
+    ("prompt_length", "<u4"),
+    ("explanation_length", "<u4"),
+    ("explanation_offset", "<u8"),
+])
+OPTION_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("length", "<u4"),
+])
+# Row packers matching the dtypes above, used when streaming records out
+RECORD = struct.Struct("<HBbIQQIIQ")
+OPTION = struct.Struct("<QI")
+
+
+def _padding(size):
+    return b"\0" * (-size % 8)
+
+
+class BankWriter:
+    """Streams questions into a compiled bank file.
+
+    Records, options and text are spooled to temporary files as questions
+    are added, so only the per-question label codes are held in memory.
+    The finished file is moved into place atomically on close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.category_names = []
+        self.difficulty_names = []
+        self._category_lookup = {}
+        self._difficulty_lookup = {}
+        self._category_codes = array("H")
+        self._difficulty_codes = array("B")
+        self._records = open(path + ".records.tmp", "wb")
+        self._options = open(path + ".options.tmp", "wb")
+        self._heap = open(path + ".heap.tmp", "wb")
+        self._heap_size = 0
+        self._option_count = 0
+
+    def __len__(self):
+        return len(self._category_codes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _write_text(self, text):
+        data = text.encode("utf-8")
+        offset = self._heap_size
+        self._heap.write(data)
+        self._heap_size += len(data)
+        return offset, len(data)
+
+    def add(self, question):
+        """Appends one question; returns its id in the compiled bank."""
+        category = intern_label(self._category_lookup, self.category_names, question.category)
+        difficulty = intern_label(self._difficulty_lookup, self.difficulty_names, question.difficulty)
+        prompt_offset, prompt_length = self._write_text(question.prompt)
+        explanation_offset, explanation_length = self._write_text(question.explanation)
+
+        for option in question.options:
+            self._options.write(OPTION.pack(*self._write_text(option)))
+        self._records.write(RECORD.pack(category, difficulty, question.correct_answer, len(question.options),
+                                        self._option_count, prompt_offset, prompt_length,
+                                        explanation_length, explanation_offset))
+        self._option_count += len(question.options)
+        self._category_codes.append(category)
+        self._difficulty_codes.append(difficulty)
+        return len(self._category_codes) - 1
+
+    def _close_spools(self):
+        for spool in (self._records, self._options, self._heap):
+            spool.close()
+
+    def _remove_spools(self):
+        for spool in (self._records, self._options, self._heap):
+            if os.path.exists(spool.name):
+                os.remove(spool.name)
+
+    def abort(self):
+        self._close_spools()
+        self._remove_spools()
+
+    def close(self):
+        self._close_spools()
+        labels = b""
+        for name in self.category_names + self.difficulty_names:
+            data = name.encode("utf-8")
+            labels += struct.pack("<H", len(data)) + data
+        labels += _padding(len(labels))
+
+        # Precompute the facet indexes so opening the bank never scans it
+        category_codes = np.frombuffer(self._category_codes, dtype=np.uint16)
+        difficulty_codes = np.frombuffer(self._difficulty_codes, dtype=np.uint8)
+        n_difficulties = len(self.difficulty_names)
+        pair_order, pair_starts = group_by_code(
+            pair_codes(category_codes, difficulty_codes, n_difficulties),
+            len(self.category_names) * n_difficulties
+        )
+        difficulty_order, difficulty_starts = group_by_code(difficulty_codes, n_difficulties)
+        index = b"".join(a.astype(dtype).tobytes() for a, dtype in (
+            (pair_starts, "<u8"), (pair_order, "<u4"), (difficulty_starts, "<u8"), (difficulty_order, "<u4")))
+        index += _padding(len(index))
+
+        n = len(self)
+        labels_offset = HEADER.size + len(_padding(HEADER.size))
+        records_offset = labels_offset + len(labels)
+        records_size = n * RECORD_DTYPE.itemsize
+        options_offset = records_offset + records_size + len(_padding(records_size))
+        options_size = self._option_count * OPTION_DTYPE.itemsize
+        index_offset = options_offset + options_size + len(_padding(options_size))
+        heap_offset = index_offset + len(index)
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(HEADER.pack(MAGIC, VERSION, 0, n, len(self.category_names), n_difficulties,
+                                  labels_offset, records_offset, options_offset, index_offset,
+                                  heap_offset, self._heap_size))
+            out.write(_padding(HEADER.size))
+            out.write(labels)
+            for spool, size in ((self._records, records_size), (self._options, options_size)):
+                with open(spool.name, "rb") as src:
+                    shutil.copyfileobj(src, out)
+                out.write(_padding(size))
+            out.write(index)
+            with open(self._heap.name, "rb") as src:
+                shutil.copyfileobj(src, out)
+        os.replace(tmp_path, self.path)
+        self._remove_spools()
+
+
+def write_bank(questions, path):
+    """Compiles an iterable of Question objects into a bank file; returns the count."""
+    with BankWriter(path) as writer:
+        for question in questions:
+            writer.add(question)
+    return len(writer)
+
+
+class MappedBank(CodedBank):
+    """Read-only question bank backed by a memory-mapped compiled file.
+
+    Opening only parses the header and label names; record and index arrays
+    are zero-copy views into the mapping and text is decoded per question.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, n, n_categories, n_difficulties, labels_offset, records_offset,
+         options_offset, index_offset, heap_offset, heap_size) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled question bank")
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported bank version {version}")
+
+        names = []
+        position = labels_offset
+        for _ in range(n_categories + n_difficulties):
+            (length,) = struct.unpack_from("<H", self._mmap, position)
+            names.append(self._mmap[position + 2:position + 2 + length].decode("utf-8"))
+            position += 2 + length
+        self.category_names = names[:n_categories]
+        self.difficulty_names = names[n_categories:]
+        self._category_lookup = {name: code for code, name in enumerate(self.category_names)}
+        self._difficulty_lookup = {name: code for code, name in enumerate(self.difficulty_names)}
+
+        self.records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE, count=n, offset=records_offset)
+        n_options = (index_offset - options_offset) // OPTION_DTYPE.itemsize
+        self.options = np.frombuffer(self._mmap, dtype=OPTION_DTYPE, count=n_options, offset=options_offset)
+
+        position = index_offset
+        sections = []
+        for dtype, count in (("<u8", n_categories * n_difficulties + 1), ("<u4", n),
+                             ("<u8", n_difficulties + 1), ("<u4", n)):
+            sections.append(np.frombuffer(self._mmap, dtype=dtype, count=count, offset=position))
+            position += sections[-1].nbytes
+        self._pair_starts, self._pair_order, self._difficulty_starts, self._difficulty_order = sections
+        self._heap_offset = heap_offset
+        self._heap_size = heap_size
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def category_codes(self):
+        return self.records["category"]
+
+    @property
+    def difficulty_codes(self):
+        return self.records["difficulty"]
+
+    @property
+    def correct_answers(self):
+        return self.records["correct_answer"]
+
+    def _text(self, offset, length):
+        start = self._heap_offset + int(offset)
+        return self._mmap[start:start + int(length)].decode("utf-8")
+
+    def __getitem__(self, question_id):
+        record = self.records[question_id]
+        start = int(record["option_start"])
+        options = self.options[start:start + int(record["option_count"])]
+        return QuestionView(
+            self._text(record["prompt_offset"], record["prompt_length"]),
+            [self._text(offset, length) for offset, length in options.tolist()],
+            int(record["correct_answer"]),
+            self._text(record["explanation_offset"], record["explanation_length"]),
+            self.category_names[record["category"]],
+            self.difficulty_names[record["difficulty"]]
+        )
+
+    def close(self):
+        # Drop the array views first; mmap refuses to close while they exist
+        self.records = self.options = None
+        self._pair_starts = self._pair_order = self._difficulty_starts = self._difficulty_order = None
+        self._all_ids = None
+        self._mmap.close()
+
+
+def open_bank(path=None):
+    """Maps the compiled bank at path, follows the directory of question files at path, or
+    indexes the built-in questions when path is empty."""
+    if path and os.path.isdir(path):
+        from live_bank import watch_directory
+        return watch_directory(path)
+    if path:
+        return MappedBank(path)
+    from question_data import questions
+    return QuestionBank(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the built-in questions into a bank file.")
+    parser.add_argument("output", help="path of the compiled bank to write")
+    args = parser.parse_args()
+
+    from question_data import questions
+    count = write_bank(questions, args.output)
+    print(f"Wrote {count} questions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
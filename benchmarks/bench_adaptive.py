@@ -0,0 +1,73 @@
+# benchmarks/bench_adaptive.py
+"""Simulates players to compare adaptive selection with a random shuffle.
+
+Each simulated player has a true ability and answers according to the
+Rasch model against each question's true difficulty. Both policies use
+the same Elo ability estimate; only the choice of question differs. The
+report shows the RMSE of the estimate after k questions and the first k
+at which it drops below the target.
+
+Run from the repository root:  python -m benchmarks.bench_adaptive
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import synthetic_questions
+from adaptive import ItemCalibration, success_probability, update_ability
+from question_bank import QuestionBank
+
+LENGTHS = (5, 10, 15, 20, 30, 40)
+TARGET_RMSE = 0.5
+
+
+def simulate(calibration, true_difficulty, players, adaptive, rng):
+    errors = np.zeros((len(players), max(LENGTHS)))
+    n = len(true_difficulty)
+    for p, true_ability in enumerate(players):
+        ability = 0.0
+        seen = set()
+        for k in range(max(LENGTHS)):
+            if adaptive:
+                question_id = calibration.next_question(ability, seen)
+            else:
+                question_id = rng.randrange(n)
+                while question_id in seen:
+                    question_id = rng.randrange(n)
+            seen.add(question_id)
+            correct = rng.random() < success_probability(true_ability, true_difficulty[question_id])
+            ability = update_ability(ability, calibration.ratings[question_id], correct, k)
+            errors[p, k] = ability - true_ability
+    return np.sqrt((errors ** 2).mean(axis=0))
+
+
+def main(n_questions=20000, n_players=500):
+    rng = random.Random(0)
+    questions = list(synthetic_questions(n_questions))
+    bank = QuestionBank(questions)
+    calibration = ItemCalibration(bank)
+    # True difficulties scatter around the label priors; assume they are already calibrated
+    true_difficulty = calibration.ratings + np.random.default_rng(0).normal(0, 0.8, n_questions)
+    for question_id, rating in enumerate(true_difficulty):
+        calibration.set_rating(question_id, rating)
+    players = [rng.gauss(0, 1.2) for _ in range(n_players)]
+
+    results = {}
+    for name, adaptive in (("random", False), ("adaptive", True)):
+        started = time.perf_counter()
+        results[name] = simulate(calibration, true_difficulty, players, adaptive, random.Random(1))
+        print(f"{name:>9}: {time.perf_counter() - started:.2f}s for {n_players} players")
+
+    print("\n questions   random RMSE   adaptive RMSE")
+    for k in LENGTHS:
+        print(f"{k:>10}   {results['random'][k - 1]:>11.3f}   {results['adaptive'][k - 1]:>13.3f}")
+    for name, rmse in results.items():
+        reached = np.flatnonzero(rmse < TARGET_RMSE)
+        first = reached[0] + 1 if len(reached) else f">{max(LENGTHS)}"
+        print(f"{name} reaches RMSE < {TARGET_RMSE} after {first} questions")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
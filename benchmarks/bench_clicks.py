@@ -0,0 +1,157 @@
+# benchmarks/bench_clicks.py
+"""Server CPU per quiz click, fragment-scoped versus full-script reruns.
+
+Starts the app with `streamlit run` and plays quizzes from several
+concurrent simulated browsers over the app's websocket. Each option and
+Next Question click is sent either as a rerun of the question fragment
+(what the browser sends for a widget inside st.fragment) or as a rerun of
+the whole script. The full-script figure is a lower bound for the old
+handlers, which also called st.rerun() and so ran the script twice per
+click. Server CPU time is read from /proc, so this runs on Linux only.
+
+Run from the repository root:  python -m benchmarks.bench_clicks [sessions] [quizzes per session]
+"""
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.asyncio.client import connect
+
+from benchmarks.common import ROOT
+
+APP = os.path.join(ROOT, "app.py")
+
+# Script runs that end a click's response; an early finish is followed by another run
+FINISHED = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+            ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def cpu_seconds(pid):
+    """User plus system CPU time of a process, from /proc/<pid>/stat."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime are fields 14 and 15; the split starts at field 3
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def start_server(port, timeout=60):
+    # Run from the repository root so .streamlit/config.toml applies; attempts are not logged
+    env = dict(os.environ, QUIZ_ATTEMPT_LOG="", QUIZ_REVIEW_DB="")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("The Streamlit server did not start")
+
+
+class Browser:
+    """One simulated browser tab: sends reruns and tracks the buttons on screen."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        # label -> (widget id, fragment id)
+        self.buttons = {}
+
+    async def rerun(self, widget_id=None, fragment_id=""):
+        message = BackMsg()
+        message.rerun_script.fragment_id = fragment_id
+        if widget_id is not None:
+            state = message.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            state.trigger_value = True
+        await self.ws.send(message.SerializeToString())
+
+        buttons = {}
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                buttons = {}
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                if element.WhichOneof("type") == "button":
+                    buttons[element.button.label] = (element.button.id, forward.delta.fragment_id)
+            elif kind == "script_finished" and forward.script_finished in FINISHED:
+                break
+        if forward.script_finished == ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY:
+            # A fragment run only replaces the fragment's own elements
+            self.buttons = {label: ids for label, ids in self.buttons.items() if ids[1] != fragment_id}
+            self.buttons.update(buttons)
+        else:
+            self.buttons = buttons
+
+    async def click(self, label, fragment_scoped=True):
+        widget_id, fragment_id = self.buttons[label]
+        await self.rerun(widget_id, fragment_id if fragment_scoped else "")
+
+
+async def play(port, quizzes, fragment_scoped, clicks, seed):
+    rng = random.Random(seed)
+    async with connect(f"ws://localhost:{port}/_stcore/stream", max_size=None) as ws:
+        browser = Browser(ws)
+        await browser.rerun()
+        for _ in range(quizzes):
+            await browser.click("Start Quiz")
+            # The question screen appears on the run after Start Quiz
+            await browser.rerun()
+            while "Play Again" not in browser.buttons:
+                options = [label for label in browser.buttons if label[:1].isdigit()]
+                await browser.click(rng.choice(options) if options else "Next Question", fragment_scoped)
+                clicks.append(1)
+            await browser.click("Play Again")
+
+
+def measure(server, port, sessions, quizzes, fragment_scoped):
+    clicks = []
+    cpu_before, started = cpu_seconds(server.pid), time.perf_counter()
+
+    async def load():
+        await asyncio.gather(*(play(port, quizzes, fragment_scoped, clicks, seed) for seed in range(sessions)))
+
+    asyncio.run(load())
+    elapsed = time.perf_counter() - started
+    cpu = cpu_seconds(server.pid) - cpu_before
+    return len(clicks), cpu * 1000 / len(clicks), len(clicks) / elapsed
+
+
+def main(sessions=8, quizzes=3):
+    port = free_port()
+    server = start_server(port)
+    try:
+        # Warm the cached bank, engine and imports before measuring
+        measure(server, port, 1, 1, True)
+        print(f"{sessions} concurrent sessions x {quizzes} quizzes")
+        print(f"{'rerun scope':<12} {'clicks':>7} {'CPU ms/click':>13} {'clicks/s':>9}")
+        for name, fragment_scoped in (("full script", False), ("fragment", True)):
+            clicks, cpu_ms, rate = measure(server, port, sessions, quizzes, fragment_scoped)
+            print(f"{name:<12} {clicks:>7} {cpu_ms:>13.2f} {rate:>9.0f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,76 @@
+# benchmarks/bench_duplicates.py
+"""Near-duplicate detection: batch report and streaming ingest across bank sizes.
+
+Each bank is the Zipf synthetic bank with 1% of its questions copied back
+in lightly edited: one prompt word replaced and the options shuffled. Recall
+is the share of those planted pairs the report finds; "other pairs" counts
+reported pairs that were not planted, which on random text should be few.
+Ingest adds every question to a DuplicateIndex one at a time, as an import
+does.
+
+Run from the repository root:  python -m benchmarks.bench_duplicates [max bank size]
+"""
+import random
+import sys
+import time
+
+from benchmarks.common import zipf_questions
+from duplicates import DuplicateIndex, find_duplicates
+from question_bank import Question
+
+BANK_SIZES = (1000, 10000, 100000, 1000000)
+PLANTED_SHARE = 0.01
+
+
+def planted_bank(size, seed=0):
+    """Returns (questions, planted pairs) with PLANTED_SHARE of size added as edited copies."""
+    rng = random.Random(seed)
+    questions = list(zipf_questions(size - int(size * PLANTED_SHARE), seed))
+    planted = set()
+    for original in rng.sample(range(len(questions)), int(size * PLANTED_SHARE)):
+        question = questions[original]
+        words = question.prompt.split()
+        words[rng.randrange(len(words))] = f"edited{rng.randrange(1000)}"
+        options = question.options[:]
+        rng.shuffle(options)
+        planted.add((original, len(questions)))
+        questions.append(Question(" ".join(words), options, 1, question.explanation, question.category,
+                                  question.difficulty))
+    return questions, planted
+
+
+def bench_bank(size):
+    questions, planted = planted_bank(size)
+    started = time.perf_counter()
+    pairs = find_duplicates(questions)
+    batch = time.perf_counter() - started
+    found = {(first, second) for first, second, _ in pairs}
+
+    ingest = None
+    if size <= 100000:
+        started = time.perf_counter()
+        index = DuplicateIndex()
+        for question in questions:
+            index.add(question)
+        ingest = time.perf_counter() - started
+    return {
+        "bank": size,
+        "batch_s": batch,
+        "ingest_per_s": size / ingest if ingest else None,
+        "recall": len(found & planted) / len(planted) if planted else 1.0,
+        "other": len(found - planted),
+    }
+
+
+def main(max_size=max(BANK_SIZES)):
+    print(f"{'bank':>9} {'batch s':>8} {'ingest q/s':>11} {'recall':>7} {'other pairs':>12}")
+    for size in BANK_SIZES:
+        if size > max_size:
+            break
+        row = bench_bank(size)
+        ingest = f"{row['ingest_per_s']:>11,.0f}" if row["ingest_per_s"] else f"{'-':>11}"
+        print(f"{row['bank']:>9,} {row['batch_s']:>8.2f} {ingest} {row['recall']:>7.1%} {row['other']:>12,}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
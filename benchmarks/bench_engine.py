@@ -0,0 +1,70 @@
+# benchmarks/bench_engine.py
+"""Throughput of the headless QuizEngine across bank sizes.
+
+For each bank size this reports questions served per second (looking up
+and decoding the current question), answers graded per second and the
+latency of aggregating results for quizzes of 20 and 1,000 questions
+(or the whole bank when it is smaller).
+
+Run from the repository root:  python -m benchmarks.bench_engine [max bank size]
+"""
+import sys
+import time
+
+from benchmarks.common import best_time, synthetic_questions
+from columnar_bank import ColumnarBank
+from question_bank import ALL
+from quiz_engine import QuizEngine
+
+BANK_SIZES = (15, 1000, 10000, 100000, 1000000)
+
+
+def finished_quiz(engine, length):
+    state = engine.start(ALL, ALL, length, seed=1)
+    while not state.completed:
+        engine.answer(state, 1, 5000)
+        engine.advance(state)
+    return state
+
+
+def bench_bank(size):
+    started = time.perf_counter()
+    engine = QuizEngine(ColumnarBank(synthetic_questions(size)))
+    build = time.perf_counter() - started
+
+    state = engine.start(ALL, ALL, ALL, seed=1)
+    positions = iter(range(10 ** 9))
+
+    def serve():
+        state.cursor = next(positions) % state.length
+        engine.question(state)
+
+    def grade():
+        state.cursor = next(positions) % state.length
+        state.answers[state.cursor] = 0
+        engine.answer(state, 1, 5000)
+
+    row = {
+        "bank": size,
+        "build_s": build,
+        "served_per_s": 1 / best_time(serve),
+        "graded_per_s": 1 / best_time(grade),
+    }
+    for length in (20, 1000):
+        quiz = finished_quiz(engine, min(length, size))
+        row[f"results_{length}_ms"] = best_time(lambda: engine.results(quiz)) * 1000
+    return row
+
+
+def main(max_size=max(BANK_SIZES)):
+    print(f"{'bank':>9} {'build s':>8} {'served/s':>10} {'graded/s':>10} {'results@20':>11} {'results@1k':>11}")
+    for size in BANK_SIZES:
+        if size > max_size:
+            break
+        row = bench_bank(size)
+        print(f"{row['bank']:>9} {row['build_s']:>8.2f} {row['served_per_s']:>10,.0f} {row['graded_per_s']:>10,.0f}"
+              f" {row['results_20_ms']:>9.3f}ms {row['results_1000_ms']:>9.3f}ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,43 @@
+# benchmarks/bench_memory.py
+"""Compares the heap cost of a list of Question objects with a ColumnarBank.
+
+Run from the repository root:  python -m benchmarks.bench_memory 100000
+"""
+import gc
+import sys
+import tracemalloc
+
+from benchmarks.common import format_bytes, synthetic_questions
+from columnar_bank import ColumnarBank
+from question_bank import Question
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def fresh_questions(n):
+    # Copy every string so the list does not share the generator's interned literals
+    for q in synthetic_questions(n):
+        yield Question("".join(q.prompt), ["".join(o) for o in q.options], q.correct_answer,
+                       "".join(q.explanation), "".join(q.category), "".join(q.difficulty))
+
+
+def main(n):
+    objects, objects_bytes, _ = measure(lambda: list(fresh_questions(n)))
+    del objects
+    bank, bank_bytes, bank_peak = measure(lambda: ColumnarBank(synthetic_questions(n)))
+    print(f"questions:            {n}")
+    print(f"list[Question]:       {format_bytes(objects_bytes)} ({objects_bytes / n:.0f} B/question)")
+    print(f"ColumnarBank:         {format_bytes(bank_bytes)} ({bank_bytes / n:.0f} B/question)")
+    print(f"ColumnarBank (peak):  {format_bytes(bank_peak)}")
+    print(f"ratio:                {objects_bytes / bank_bytes:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,114 @@
+# benchmarks/bench_reload.py
+"""Applying an edit to a watched bank directory, against rebuilding the bank.
+
+The bank is spread over 100 JSONL files. After the initial load, one file
+is rewritten with a few questions edited, one removed, one added and one
+moved to another category. For each bank size this reports:
+
+- the reload latency BankWatcher.poll() sees, from noticing the change to
+  publishing the new generation;
+- the apply() step alone for an edit, a removal and an addition;
+- the baseline: reading every file again and building a QuestionBank;
+- the memory that generation adds while the previous one stays alive
+  for quizzes in progress: the chunks and facet arrays it had to copy.
+
+Run from the repository root:  python -m benchmarks.bench_reload [max questions]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import CATEGORIES, format_bytes, synthetic_questions
+from importer import read_records, validate_record
+from live_bank import BankWatcher
+from question_bank import QuestionBank
+
+BANK_SIZES = (10000, 100000, 500000)
+FILES = 100
+
+
+def record(key, question):
+    return {"id": key, "prompt": question.prompt, "options": question.options,
+            "correct_answer": question.correct_answer, "explanation": question.explanation,
+            "category": question.category, "difficulty": question.difficulty}
+
+
+def write_file(path, records):
+    temporary = os.path.join(os.path.dirname(path), "." + os.path.basename(path))
+    with open(temporary, "w", encoding="utf-8") as f:
+        for row in records:
+            f.write(json.dumps(row) + "\n")
+    os.replace(temporary, path)
+
+
+def rebuild(directory):
+    """The baseline: read every file again and index all of it."""
+    bank = QuestionBank()
+    for name in sorted(os.listdir(directory)):
+        for _, row in read_records(os.path.join(directory, name)):
+            bank.add(validate_record(row))
+    return bank
+
+
+def bench_size(n, directory):
+    files = [[] for _ in range(FILES)]
+    for i, question in enumerate(synthetic_questions(n)):
+        files[i % FILES].append(record(f"q{i}", question))
+    for k, rows in enumerate(files):
+        write_file(os.path.join(directory, f"part{k:03}.jsonl"), rows)
+
+    watcher = BankWatcher(directory, categories=CATEGORIES)
+    started = time.perf_counter()
+    watcher.poll()
+    initial = time.perf_counter() - started
+
+    # Five edits, one removal, one addition and one category change in one file
+    rows = files[0]
+    for row in rows[:5]:
+        row["prompt"] += " (edited)"
+    del rows[5]
+    rows.append(record("added", next(synthetic_questions(1, seed=1))))
+    rows[6]["category"] = "Advanced" if rows[6]["category"] != "Advanced" else "Basics"
+    write_file(os.path.join(directory, "part000.jsonl"), rows)
+    watcher.poll()
+    reload = watcher.bank.last_reload_seconds
+
+    # An edit, a removal and an addition applied directly, timed and then measured
+    generation = watcher.bank.current
+    delta = ([generation[1]], {0: generation[0]}, [2])
+    started = time.perf_counter()
+    generation.apply(*delta)
+    apply = time.perf_counter() - started
+    tracemalloc.start()
+    kept = generation.apply(*delta)
+    generation_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    started = time.perf_counter()
+    rebuild(directory)
+    full = time.perf_counter() - started
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    return {"n": n, "initial": initial, "reload": reload, "apply": apply, "rebuild": full,
+            "generation_bytes": generation_bytes}
+
+
+def main(max_size=BANK_SIZES[-1]):
+    print(f"{'questions':>10} {'initial s':>10} {'reload ms':>10} {'apply ms':>9} {'rebuild ms':>11} "
+          f"{'speedup':>8} {'new generation':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        for n in BANK_SIZES:
+            if n > max_size:
+                break
+            row = bench_size(n, directory)
+            print(f"{row['n']:>10,} {row['initial']:>10.2f} {row['reload'] * 1000:>10.1f} "
+                  f"{row['apply'] * 1000:>9.2f} {row['rebuild'] * 1000:>11.0f} "
+                  f"{row['rebuild'] / row['reload']:>7.0f}x {format_bytes(row['generation_bytes']):>15}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
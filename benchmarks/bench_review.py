@@ -0,0 +1,85 @@
+# benchmarks/bench_review.py
+"""Review session construction for users with large spaced-repetition decks.
+
+Each deck is built by answering its cards at random times over the past
+120 days, so some are long overdue and others not yet due. For each deck
+size this reports:
+
+- building a 20-question review session from the due heap, against a
+  scan of every card's due time;
+- one review(), which updates the deck and queues the SQLite write;
+- loading the deck from the database cold, as a worker does the first
+  time a user appears.
+
+Run from the repository root:  python -m benchmarks.bench_review [max cards]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import best_time
+from spaced_repetition import DAY, ReviewScheduler
+
+DECK_SIZES = (1000, 10000, 100000)
+SESSION_LENGTH = 20
+
+
+def scan_due(scheduler, user, limit, now):
+    """The baseline: every card's due time, then the limit most overdue."""
+    deck = scheduler._decks[user]
+    due = np.frombuffer(deck.due, dtype=np.float64)
+    overdue = np.flatnonzero(due <= now)
+    top = overdue[np.argsort(due[overdue], kind="stable")[:limit]]
+    return [deck.question_ids[row] for row in top]
+
+
+def bench_deck(size, directory, seed=0):
+    rng = random.Random(seed)
+    path = os.path.join(directory, f"reviews-{size}.db")
+    # Room for every card, so none is dropped while the writer catches up
+    scheduler = ReviewScheduler(path, max_queue=size + 1000)
+    now = time.time()
+    started = time.perf_counter()
+    for question_id in range(size):
+        scheduler.review("player", question_id, rng.choice((1, 3, 4, 5, 5)), now=now - rng.uniform(0, 120) * DAY)
+    build = time.perf_counter() - started
+    due = len(scheduler.due("player", size, now))
+    question_ids = iter(range(10 ** 9))
+
+    row = {
+        "cards": size,
+        "due": due,
+        "review_us": build / size * 1e6,
+        "session_us": best_time(lambda: scheduler.due("player", SESSION_LENGTH, now)) * 1e6,
+        "scan_us": best_time(lambda: scan_due(scheduler, "player", SESSION_LENGTH, now)) * 1e6,
+    }
+    assert scheduler.due("player", SESSION_LENGTH, now) == scan_due(scheduler, "player", SESSION_LENGTH, now)
+    # Reviews after the deck is built also pay for stale heap entries and the occasional rebuild
+    row["rereview_us"] = best_time(lambda: scheduler.review("player", next(question_ids) % size, 4, now=now)) * 1e6
+    scheduler.close()
+
+    started = time.perf_counter()
+    cold = ReviewScheduler(path)
+    cold.due("player", SESSION_LENGTH, now)
+    row["load_ms"] = (time.perf_counter() - started) * 1000
+    cold.close()
+    return row
+
+
+def main(max_size=max(DECK_SIZES)):
+    print(f"{'cards':>8} {'due':>8} {'session us':>11} {'scan us':>9} {'review us':>10} {'re-review us':>13} {'load ms':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in DECK_SIZES:
+            if size > max_size:
+                break
+            row = bench_deck(size, directory)
+            print(f"{row['cards']:>8,} {row['due']:>8,} {row['session_us']:>11.1f} {row['scan_us']:>9.1f} "
+                  f"{row['review_us']:>10.1f} {row['rereview_us']:>13.1f} {row['load_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
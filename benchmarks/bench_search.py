@@ -0,0 +1,59 @@
+# benchmarks/bench_search.py
+"""Build time and query latency of the BM25 search index across bank sizes.
+
+Two banks are measured. "zipf" draws question text from a 50,000-word
+vocabulary with Zipfian word frequencies, as natural text has, with the
+query words placed from fairly common to rare. "uniform" is the shared
+synthetic bank, whose 17-word vocabulary makes every query term match
+most of the bank: the worst case for a multi-term query.
+
+Run from the repository root:  python -m benchmarks.bench_search [max bank size]
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import synthetic_questions, zipf_questions
+from search_index import SearchIndex
+
+BANK_SIZES = (1000, 10000, 100000, 1000000)
+QUERIES = ("generator", "generator yield", "closure decorator lambda", "dict comprehension", "missing term")
+
+
+def bench_bank(questions, size, repeat=20):
+    started = time.perf_counter()
+    index = SearchIndex.build(questions)
+    build = time.perf_counter() - started
+
+    row = {"bank": size, "build_s": build}
+    for query in QUERIES:
+        # The first search computes and caches the terms' impacts; it is reported separately
+        started = time.perf_counter()
+        index.search(query)
+        row[query, "cold"] = (time.perf_counter() - started) * 1000
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            index.search(query)
+            timings.append(time.perf_counter() - started)
+        row[query] = (np.percentile(timings, 50) * 1000, np.percentile(timings, 99) * 1000)
+    return row
+
+
+def main(max_size=max(BANK_SIZES)):
+    banks = (("zipf", zipf_questions), ("uniform", synthetic_questions))
+    for name, make in banks:
+        print(f"\n{name} bank: query latency p50 / p99 (cold) in ms")
+        print(f"{'bank':>9} {'build s':>8} " + " ".join(f"{query[:24]:>28}" for query in QUERIES))
+        for size in BANK_SIZES:
+            if size > max_size:
+                break
+            row = bench_bank(make(size), size)
+            cells = " ".join(f"{row[query][0]:>6.2f} / {row[query][1]:>6.2f} ({row[query, 'cold']:>8.2f})"
+                             for query in QUERIES)
+            print(f"{row['bank']:>9,} {row['build_s']:>8.2f} {cells}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,121 @@
+# benchmarks/bench_sessions.py
+"""Cost per rerun of keeping quiz progress in an external session store.
+
+For quizzes of several lengths, half answered, this reports the encoded
+record size next to a pickle of the same QuizState, the time to encode
+and decode it, and a save plus load through the memory and SQLite stores.
+A rerun that changes the quiz pays one save; a worker resuming a session
+pays one load. The contention run has several processes save and load
+their own sessions in one SQLite database at once, as workers behind a
+load balancer would, and reports the per-operation latency they see.
+
+Run from the repository root:  python -m benchmarks.bench_sessions [workers]
+"""
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import best_time
+from question_bank import ALL, QuestionBank
+from question_data import questions
+from quiz_engine import QuizEngine
+from session_store import MemorySessionStore, SQLiteSessionStore, decode_state, encode_state
+
+QUIZ_LENGTHS = (10, 50, 1000)
+CONTENTION_SECONDS = 3.0
+
+
+def half_answered(length):
+    """A quiz of length questions over a bank repeated to fit, answered half way."""
+    engine = QuizEngine(QuestionBank(questions * (length // len(questions) + 1)))
+    state = engine.start(ALL, ALL, length, seed=1)
+    for _ in range(length // 2):
+        engine.answer(state, 1, 5000)
+        engine.advance(state)
+    engine.show(state)
+    return state
+
+
+def bench_length(length, path):
+    state = half_answered(length)
+    data = encode_state(state)
+    pickled = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    memory = MemorySessionStore()
+    sqlite = SQLiteSessionStore(path)
+
+    def round_trip(store):
+        store.save("bench", state, "player")
+        store.load("bench")
+
+    row = {
+        "length": length,
+        "bytes": len(data),
+        "pickle_bytes": len(pickled),
+        "encode_us": best_time(lambda: encode_state(state)) * 1e6,
+        "decode_us": best_time(lambda: decode_state(data)) * 1e6,
+        "pickle_us": best_time(lambda: pickle.loads(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))) * 1e6,
+        "memory_us": best_time(lambda: round_trip(memory)) * 1e6,
+        "sqlite_us": best_time(lambda: round_trip(sqlite)) * 1e6,
+    }
+    sqlite.close()
+    return row
+
+
+def contention_worker(path, worker, deadline, results):
+    store = SQLiteSessionStore(path)
+    state = half_answered(10)
+    timings = []
+    started_at = time.time()
+    while time.time() < deadline:
+        started = time.perf_counter()
+        store.save(f"worker-{worker}", state, "player")
+        store.load(f"worker-{worker}")
+        timings.append(time.perf_counter() - started)
+    store.close()
+    results.put((timings, time.time() - started_at))
+
+
+def bench_contention(path, workers):
+    results = multiprocessing.Queue()
+    # Room for the workers to start, so they overlap for the whole run
+    deadline = time.time() + 1.0 + CONTENTION_SECONDS
+    processes = [multiprocessing.Process(target=contention_worker, args=(path, worker, deadline, results))
+                 for worker in range(workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    timings = np.concatenate([timings for timings, _ in reports]) * 1e6
+    return {
+        "round_trips_per_s": sum(len(timings) / elapsed for timings, elapsed in reports),
+        "p50_us": float(np.percentile(timings, 50)),
+        "p99_us": float(np.percentile(timings, 99)),
+    }
+
+
+def main(workers=4):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sessions.db")
+        print("per rerun; a round trip is one save and one load")
+        print(f"{'quiz':>6} {'bytes':>7} {'pickled':>8} {'encode us':>10} {'decode us':>10} {'pickle us':>10} "
+              f"{'memory us':>10} {'sqlite us':>10}")
+        for length in QUIZ_LENGTHS:
+            row = bench_length(length, path)
+            print(f"{row['length']:>6} {row['bytes']:>7} {row['pickle_bytes']:>8} {row['encode_us']:>10.1f} "
+                  f"{row['decode_us']:>10.1f} {row['pickle_us']:>10.1f} {row['memory_us']:>10.1f} "
+                  f"{row['sqlite_us']:>10.1f}")
+
+        contention = bench_contention(path, workers)
+        print(f"\n{workers} processes sharing {os.path.basename(path)}: "
+              f"{contention['round_trips_per_s']:,.0f} round trips/s, "
+              f"p50 {contention['p50_us']:.0f} us, p99 {contention['p99_us']:.0f} us")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
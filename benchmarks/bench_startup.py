@@ -0,0 +1,119 @@
+# benchmarks/bench_startup.py
+"""Cold-start cost of the app: module import time and time to first paint.
+
+Each trial runs in a fresh process, so nothing is cached by the
+interpreter. The import trial times `import app` alone and lists the
+slowest top-level imports from -X importtime. The paint trial starts
+`streamlit run`, waits until the server answers its health check, then
+opens a session and records when the first element and the finished
+welcome screen arrive over the websocket. Medians over the trials are
+reported; --out writes them as JSON so they can be tracked per commit.
+
+Run from the repository root:  python -m benchmarks.bench_startup [--trials 5] [--out startup.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.asyncio.client import connect
+
+from benchmarks.bench_clicks import FINISHED, free_port, start_server
+from benchmarks.common import ROOT, git_revision
+
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import app; print(time.perf_counter() - started)"
+
+
+def import_trial():
+    """Seconds to import app.py in a fresh interpreter, and the -X importtime log."""
+    env = dict(os.environ, QUIZ_ATTEMPT_LOG="", QUIZ_REVIEW_DB="")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", IMPORT_SNIPPET], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_imports(importtime_log, count=5):
+    """Top-level packages by cumulative import time in microseconds."""
+    totals = {}
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (field.strip() for field in line[len("import time:"):].split("|"))
+        # Only packages imported directly, not their submodules' nested imports
+        if cumulative.isdigit() and not name.startswith(" ") and "." not in name:
+            totals[name] = max(totals.get(name, 0), int(cumulative))
+    return sorted(totals.items(), key=lambda item: -item[1])[:count]
+
+
+async def first_paint(port):
+    """Seconds from opening a session to its first element and to the finished welcome screen."""
+    started = time.perf_counter()
+    first_element = None
+    async with connect(f"ws://localhost:{port}/_stcore/stream", max_size=None) as ws:
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        await ws.send(message.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and first_element is None:
+                first_element = time.perf_counter() - started
+            elif kind == "script_finished" and forward.script_finished in FINISHED:
+                return first_element, time.perf_counter() - started
+
+
+def paint_trial():
+    port = free_port()
+    started = time.perf_counter()
+    server = start_server(port)
+    try:
+        ready = time.perf_counter() - started
+        first_element, welcome = asyncio.run(first_paint(port))
+        # A second session shows what every later visitor waits for
+        _, warm_welcome = asyncio.run(first_paint(port))
+    finally:
+        server.terminate()
+        server.wait()
+    return {"server_ready_s": ready, "first_element_s": first_element, "welcome_s": welcome,
+            "warm_welcome_s": warm_welcome}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import time and time to first paint.")
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--out", help="write the medians as JSON here")
+    args = parser.parse_args()
+
+    imports = [import_trial() for _ in range(args.trials)]
+    paints = [paint_trial() for _ in range(args.trials)]
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": git_revision(),
+        "trials": args.trials,
+        "import_app_s": statistics.median(seconds for seconds, _ in imports),
+        "slowest_imports_ms": {name: micros / 1000 for name, micros in slowest_imports(imports[-1][1])},
+    }
+    for key in paints[0]:
+        report[key] = statistics.median(paint[key] for paint in paints)
+
+    print(f"median of {args.trials} cold starts")
+    print(f"import app:             {report['import_app_s'] * 1000:8.0f} ms")
+    print(f"server ready:           {report['server_ready_s'] * 1000:8.0f} ms")
+    print(f"first element painted:  {report['first_element_s'] * 1000:8.0f} ms after connecting")
+    print(f"welcome screen ready:   {report['welcome_s'] * 1000:8.0f} ms after connecting")
+    print(f"next session's welcome: {report['warm_welcome_s'] * 1000:8.0f} ms after connecting")
+    print("slowest imports: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in report["slowest_imports_ms"].items()))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_verifier.py
+"""Verifying the answer key of a bank of code-output questions.
+
+The bank is generated: small arithmetic, string and list snippets, one in
+fifty raising an error. This reports:
+
+- a subprocess per snippet (python -I -c), the obvious baseline, on a sample;
+- a cold run through the SandboxPool with one worker and with one per core,
+  each worker forking a child per snippet;
+- re-verifying after 1% of the questions were edited, with the cache
+  holding every other result.
+
+Run from the repository root:  python -m benchmarks.bench_verifier [questions]
+"""
+import os
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks.common import CATEGORIES, DIFFICULTIES
+from code_verifier import ResultCache, SandboxPool, verify_bank
+from question_bank import Question
+
+BASELINE_SAMPLE = 100
+PROMPT = "What is the output of: "
+
+
+def code_questions(n, seed=0):
+    """n "What is the output of" questions, keyed with the option the code prints."""
+    rng = random.Random(seed)
+    questions = []
+    for i in range(n):
+        a, b = rng.randint(2, 99), rng.randint(2, 9)
+        shape = i % 4
+        if i % 50 == 49:
+            code, output = f"{a} + 'x{i}'", "TypeError"
+        elif shape == 0:
+            code, output = f"{a} ** {b} % {a + b}", str(a ** b % (a + b))
+        elif shape == 1:
+            code, output = f"len('{'ab' * b}{i}')", str(2 * b + len(str(i)))
+        elif shape == 2:
+            code, output = f"sorted([{a}, {b}, {i}])[1]", str(sorted([a, b, i])[1])
+        else:
+            code, output = f"print('{i}' * {b % 3 + 1})", str(i) * (b % 3 + 1)
+        options = [output, "ValueError", "None", f"x{i}"] if output == "TypeError" else \
+            [output, f"{output}0", f"-{output}", "None"]
+        rng.shuffle(options)
+        questions.append(Question(
+            f"{PROMPT}{code}?", options, options.index(output) + 1, "",
+            rng.choice(CATEGORIES), rng.choice(DIFFICULTIES)
+        ))
+    return questions
+
+
+def edited(questions, fraction, seed=1):
+    """A copy with fraction of the questions given a different (parenthesised) snippet."""
+    rng = random.Random(seed)
+    questions = list(questions)
+    for i in rng.sample(range(len(questions)), max(1, int(len(questions) * fraction))):
+        question = questions[i]
+        code = question.prompt[len(PROMPT):-1]
+        questions[i] = Question(f"{PROMPT}({code})?", question.options, question.correct_answer,
+                                question.explanation, question.category, question.difficulty)
+    return questions
+
+
+def bench_baseline(questions):
+    started = time.perf_counter()
+    for question in questions[:BASELINE_SAMPLE]:
+        code = question.prompt[len(PROMPT):-1]
+        subprocess.run([sys.executable, "-I", "-c", code if code.startswith("print") else f"print({code})"],
+                       capture_output=True, timeout=10)
+    return BASELINE_SAMPLE / (time.perf_counter() - started)
+
+
+def bench_pool(questions, workers, cache):
+    with SandboxPool(workers) as pool:
+        report = verify_bank(questions, pool, cache)
+    return report
+
+
+def main(n=5000):
+    questions = code_questions(n)
+    cores = os.cpu_count() or 1
+    print(f"{n:,} code-output questions, {cores} cores")
+    print(f"subprocess per snippet: {bench_baseline(questions):,.0f} snippets/s")
+
+    for workers in sorted({1, cores}):
+        report = bench_pool(questions, workers, ResultCache())
+        print(f"pool, {workers} worker{'s' if workers > 1 else ''}: {report.executed / report.elapsed:,.0f} snippets/s, "
+              f"{report.elapsed:.2f}s for the bank; {len(report.problems)} problems")
+
+    cache = ResultCache()
+    bench_pool(questions, cores, cache)
+    report = bench_pool(edited(questions, 0.01), cores, cache)
+    print(f"re-verify after editing 1%: {report.executed} run, {report.cached:,} cached, "
+          f"{report.elapsed * 1000:.0f} ms; {len(report.problems)} problems")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,86 @@
+# benchmarks/common.py
+import os
+import random
+import subprocess
+import sys
+import timeit
+
+import numpy as np
+
+# Benchmarks import the app modules from the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from question_bank import Question  # noqa: E402
+
+CATEGORIES = ["Basics", "Operators", "Data Types", "Data Structures", "Modules", "OOP", "Error Handling", "Advanced"]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+WORDS = ["list", "dict", "tuple", "generator", "yield", "class", "decorator", "lambda", "import",
+         "exception", "iterator", "set", "string", "slice", "comprehension", "closure", "module"]
+
+
+def synthetic_questions(n, seed=0):
+    """Yields n random questions shaped like the built-in bank."""
+    rng = random.Random(seed)
+    for i in range(n):
+        words = " ".join(rng.choice(WORDS) for _ in range(8))
+        yield Question(
+            f"Question {i}: what happens with {words}?",
+            [f"Option {j} about {rng.choice(WORDS)} and {rng.choice(WORDS)}" for j in range(1, 5)],
+            rng.randint(1, 4),
+            f"Explanation {i}: the {rng.choice(WORDS)} behaves like a {rng.choice(WORDS)} here.",
+            rng.choice(CATEGORIES),
+            rng.choice(DIFFICULTIES)
+        )
+
+
+ZIPF_VOCABULARY = 50000
+
+
+def zipf_questions(n, seed=0, words_per_question=30):
+    """Yields n questions whose words follow a Zipf distribution over ZIPF_VOCABULARY words.
+
+    The WORDS take ranks 20, 30, 45, ... so they range from common to rare.
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = [f"w{rank}" for rank in range(ZIPF_VOCABULARY)]
+    for k, word in enumerate(WORDS):
+        vocabulary[int(20 * 1.5 ** k)] = word
+    weights = 1 / np.arange(1, ZIPF_VOCABULARY + 1)
+    draws = rng.choice(ZIPF_VOCABULARY, size=(n, words_per_question), p=weights / weights.sum())
+    for i, row in enumerate(draws):
+        words = [vocabulary[rank] for rank in row]
+        yield Question(
+            " ".join(words[:12]),
+            [" ".join(words[12 + 3 * j:15 + 3 * j]) for j in range(4)],
+            1,
+            " ".join(words[24:]),
+            CATEGORIES[i % len(CATEGORIES)],
+            DIFFICULTIES[i % len(DIFFICULTIES)]
+        )
+
+
+def format_bytes(n):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+def best_time(func, repeat=5, min_time=0.1):
+    """Returns the best seconds per call of func over repeat timed runs of at least min_time each."""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = int(number * min_time / max(elapsed, 1e-9)) + 1
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def git_revision():
+    """The commit being measured, for comparing saved results; None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,248 @@
+# benchmarks/load_test.py
+"""Load test: simulated players walking through the app in one worker process.
+
+Each simulated player is a thread driving its own AppTest session through
+the welcome screen, every question and the results, pausing for a random
+think time (exponential, --think mean seconds) between clicks. Filters
+are drawn per quiz from --category/--difficulty, or at random from the
+bank when set to "random". AppTest swaps process-wide runtime state on
+every run, so reruns are serialised through one lock, like script runs
+contending for the GIL in a single Streamlit worker; a rerun's latency
+includes its wait for that lock.
+
+The report gives rerun latency percentiles per screen, reruns and quizzes
+per second, and resident memory at the start, peak and end. --out writes
+the same numbers as JSON so runs can be compared over time.
+
+Run from the repository root:  python -m benchmarks.load_test --users 20 --duration 60 --out load.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.common import ROOT, format_bytes, git_revision
+
+APP = os.path.join(ROOT, "app.py")
+PERCENTILES = (50, 90, 99)
+
+
+def rss_bytes():
+    """Current resident set size, or the peak where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == "Darwin" else peak * 1024
+
+
+class MemorySampler:
+    """Samples the process RSS from a background thread."""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.start = self.peak = self.end = rss_bytes()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.end = rss_bytes()
+        self.peak = max(self.peak, self.end)
+
+
+class Player:
+    """One simulated player with its own AppTest session."""
+
+    def __init__(self, number, args, lock, deadline):
+        from streamlit.testing.v1 import AppTest
+
+        self.rng = random.Random(args.seed + number)
+        self.args = args
+        self.lock = lock
+        self.deadline = deadline
+        # Rerun latencies in seconds, keyed by the screen the rerun rendered
+        self.latencies = {}
+        self.quizzes = 0
+        self.app = AppTest.from_file(APP, default_timeout=args.timeout)
+
+    def screen(self):
+        labels = {button.label for button in self.app.button}
+        if "Play Again" in labels:
+            return "results"
+        if "Next Question" in labels or any(label[:1].isdigit() for label in labels):
+            return "question"
+        return "welcome"
+
+    def rerun(self, action=None):
+        started = time.perf_counter()
+        with self.lock:
+            if action is None:
+                self.app.run()
+            else:
+                action()
+        elapsed = time.perf_counter() - started
+        if self.app.exception:
+            raise RuntimeError(f"App raised: {self.app.exception[0].value}")
+        self.latencies.setdefault(self.screen(), []).append(elapsed)
+
+    def think(self):
+        if self.args.think > 0:
+            time.sleep(self.rng.expovariate(1 / self.args.think))
+
+    def button(self, label):
+        return next(button for button in self.app.button if button.label == label)
+
+    def choose(self, index, choice):
+        selectbox = self.app.selectbox[index]
+        if choice == "random":
+            choice = self.rng.choice(selectbox.options)
+        if choice in selectbox.options and choice != selectbox.value:
+            self.rerun(lambda: selectbox.set_value(choice).run())
+
+    def play(self):
+        self.rerun()
+        while time.monotonic() < self.deadline:
+            # Welcome: filters and length, then start
+            self.think()
+            self.choose(0, self.args.category)
+            if not self.app.selectbox[1].disabled:
+                self.choose(1, self.args.difficulty)
+            if len(self.app.selectbox) > 2:
+                self.choose(2, self.args.length if not self.args.length.isdigit() else int(self.args.length))
+            if not any(button.label == "Start Quiz" for button in self.app.button):
+                if "random" not in (self.args.category, self.args.difficulty):
+                    raise ValueError("No questions match the chosen category and difficulty")
+                # This random selection has no questions; draw another
+                continue
+            self.rerun(lambda: self.button("Start Quiz").click().run())
+            self.rerun()
+
+            # Questions until the results screen
+            while self.screen() == "question":
+                self.think()
+                options = [button for button in self.app.button if button.label[:1].isdigit()]
+                if options:
+                    self.rerun(lambda: self.rng.choice(options).click().run())
+                else:
+                    self.rerun(lambda: self.button("Next Question").click().run())
+            self.quizzes += 1
+
+            self.think()
+            self.rerun(lambda: self.button("Play Again").click().run())
+
+
+def summarize_latencies(values):
+    values = np.asarray(values) * 1000
+    summary = {"reruns": int(len(values)), "mean_ms": float(values.mean()) if len(values) else None}
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = float(np.percentile(values, p)) if len(values) else None
+    return summary
+
+
+def run(args):
+    # Attempts are not logged and review schedules stay in memory, so a load test leaves no database behind
+    os.environ.setdefault("QUIZ_ATTEMPT_LOG", "")
+    os.environ.setdefault("QUIZ_REVIEW_DB", "")
+    lock = threading.Lock()
+    latencies = {}
+    errors = []
+    # Import the app and fill its caches first, so memory growth reflects the sessions
+    Player(-1, args, lock, 0).rerun()
+    started = time.monotonic()
+    deadline = started + args.duration
+    with MemorySampler() as memory:
+        players = [Player(number, args, lock, deadline) for number in range(args.users)]
+
+        def play(player):
+            try:
+                player.play()
+            except Exception as e:
+                errors.append(repr(e))
+
+        threads = [threading.Thread(target=play, args=(player,), name=f"player-{number}")
+                   for number, player in enumerate(players)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.monotonic() - started
+
+    for player in players:
+        for screen, values in player.latencies.items():
+            latencies.setdefault(screen, []).extend(values)
+    every = [value for values in latencies.values() for value in values]
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key != "out"},
+        "elapsed_s": elapsed,
+        "reruns_per_s": len(every) / elapsed,
+        "quizzes": sum(player.quizzes for player in players),
+        "quizzes_per_s": sum(player.quizzes for player in players) / elapsed,
+        "latency": dict({"all": summarize_latencies(every)},
+                        **{screen: summarize_latencies(values) for screen, values in sorted(latencies.items())}),
+        "memory": {"start_bytes": memory.start, "peak_bytes": memory.peak, "end_bytes": memory.end,
+                   "growth_bytes": memory.end - memory.start},
+        "errors": errors,
+    }
+
+
+def print_report(report):
+    config = report["config"]
+    print(f"{config['users']} players, {config['duration']:.0f} s, think {config['think']} s, "
+          f"category {config['category']}, difficulty {config['difficulty']}, length {config['length']}")
+    print(f"{'screen':<9} {'reruns':>7} {'mean ms':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for screen, summary in report["latency"].items():
+        if summary["reruns"]:
+            print(f"{screen:<9} {summary['reruns']:>7} {summary['mean_ms']:>8.1f} {summary['p50_ms']:>8.1f} "
+                  f"{summary['p90_ms']:>8.1f} {summary['p99_ms']:>8.1f}")
+    memory = report["memory"]
+    print(f"throughput: {report['reruns_per_s']:.1f} reruns/s, {report['quizzes_per_s']:.2f} quizzes/s "
+          f"({report['quizzes']} quizzes)")
+    print(f"memory: start {format_bytes(memory['start_bytes'])}, peak {format_bytes(memory['peak_bytes'])}, "
+          f"end {format_bytes(memory['end_bytes'])}, growth {format_bytes(memory['growth_bytes'])}")
+    for error in report["errors"]:
+        print(f"error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent quiz players against the app.")
+    parser.add_argument("--users", type=int, default=10, help="simulated players")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds before players stop starting quizzes")
+    parser.add_argument("--think", type=float, default=0.5, help="mean think time between clicks in seconds")
+    parser.add_argument("--category", default="All", help='category to pick, or "random"')
+    parser.add_argument("--difficulty", default="All", help='difficulty to pick, or "random"')
+    parser.add_argument("--length", default="All", help="number of questions per quiz, or All")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds allowed per rerun")
+    parser.add_argument("--out", help="write the results as JSON here")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+# code_verifier.py
+"""Checks the answer key of code-output questions by running their code.
+
+Two shapes of question are recognised:
+
+- "What is the output of: print(2 ** 3)?" has the code in the prompt and
+  outputs as options. The code is run once and the options it printed are
+  the correct ones.
+- "Which of the following prints 8?" has an output in the prompt and code
+  as options. Every option is run and those printing it are correct.
+
+A lone expression is printed as print() would show it. An exception
+matches an option naming it, or any option saying "Error".
+
+Snippets run in a SandboxPool: long-lived worker processes, each forking
+a fresh child per snippet under resource limits (address space, CPU time,
+file size and process count) and killing it at a wall-clock timeout. The
+limits stop runaway or greedy snippets; they are not a security boundary,
+so only verify banks from people you trust. Fork and the limits need a
+POSIX system.
+
+Results are cached by a hash of the snippet, so re-verifying a large bank
+after a small edit only runs the changed code.
+
+    python code_verifier.py --bank bank.pqb --cache verify.db --workers 4
+"""
+import argparse
+import ast
+import hashlib
+import io
+import json
+import os
+import queue
+import re
+import select
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+# Bump when the way snippets are run or printed changes, so cached results are not reused
+RUNNER_VERSION = 1
+MAX_OUTPUT = 65536
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL
+)
+"""
+
+OUTPUT_PROMPT = re.compile(
+    r"\b(?:output|result|value|print(?:ed|s)?|return(?:ed|s)?|evaluates? to)\b[^:`]*(?::|\bof\b)\s*(?P<code>.+?)\s*\??\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+WHICH_PROMPT = re.compile(
+    r"^\s*which\b.*?\b(?:prints?|outputs?|returns?|evaluates? to|gives?)\s*:?\s*(?P<output>.+?)\s*\??\s*$",
+    re.IGNORECASE | re.DOTALL
+)
+FENCED = re.compile(r"```(?:python|py)?\s*\n?(?P<code>.*?)```|`(?P<inline>[^`]+)`", re.DOTALL)
+
+
+def as_program(code):
+    """Returns code as a program: a lone expression is wrapped in print(); None if it is not Python."""
+    code = code.strip()
+    try:
+        tree = ast.parse(code, mode="eval")
+    except SyntaxError:
+        try:
+            ast.parse(code)
+        except SyntaxError:
+            return None
+        return code
+    call = tree.body
+    if isinstance(call, ast.Call) and isinstance(call.func, ast.Name) and call.func.id == "print":
+        return code
+    return f"print({code})"
+
+
+def prompt_code(prompt):
+    """The code a prompt asks about, from a code fence, backticks or the text after "output of:"."""
+    fenced = FENCED.search(prompt)
+    if fenced:
+        return as_program(fenced.group("code") or fenced.group("inline"))
+    match = OUTPUT_PROMPT.search(prompt)
+    if match:
+        return as_program(match.group("code"))
+    return None
+
+
+def extract_checks(question):
+    """Returns ("output", program, None) or ("which", [program per option], output), or None to skip."""
+    which = WHICH_PROMPT.search(question.prompt)
+    if which:
+        programs = [as_program(option) for option in question.options]
+        if all(programs):
+            return "which", programs, which.group("output")
+    program = prompt_code(question.prompt)
+    if program is not None:
+        return "output", program, None
+    return None
+
+
+def normalize(text):
+    text = " ".join(str(text).split())
+    # Quotes around a printed string are a matter of how the option was written
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "'\"":
+        text = text[1:-1]
+    return text
+
+
+def matches(option, result):
+    """Whether an option describes a snippet result."""
+    if result["status"] == "error":
+        text = option.lower()
+        return result["error"].lower() in text or text.strip(" .") in ("error", "an error", "raises an error")
+    if result["status"] != "ok":
+        return False
+    return normalize(option) == normalize(result["stdout"])
+
+
+# Worker side: runs inside the sandbox worker processes
+
+def _limit(timeout, memory_bytes):
+    import resource
+
+    cpu = int(timeout) + 1
+    for limit, value in ((resource.RLIMIT_AS, memory_bytes), (resource.RLIMIT_CPU, cpu),
+                         (resource.RLIMIT_FSIZE, 1 << 20), (resource.RLIMIT_NPROC, 0)):
+        try:
+            resource.setrlimit(limit, (value, value))
+        except (ValueError, OSError):
+            # Some limits cannot be lowered here (RLIMIT_NPROC for root, RLIMIT_AS on macOS)
+            pass
+
+
+def _execute(code):
+    stdout = io.StringIO()
+    try:
+        with redirect_stdout(stdout):
+            exec(compile(code, "<snippet>", "exec"), {"__name__": "__snippet__"})
+    except MemoryError:
+        return {"status": "memory", "stdout": "", "error": "MemoryError"}
+    except BaseException as e:
+        return {"status": "error", "stdout": stdout.getvalue()[:MAX_OUTPUT], "error": type(e).__name__}
+    return {"status": "ok", "stdout": stdout.getvalue()[:MAX_OUTPUT], "error": ""}
+
+
+def _run_child(job):
+    """Forks a child to run one snippet under limits; the parent waits at most job["timeout"] seconds."""
+    read_fd, write_fd = os.pipe()
+    started = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            # The child must not touch the worker's protocol pipes
+            devnull = os.open(os.devnull, os.O_RDWR)
+            for fd in (0, 1, 2):
+                os.dup2(devnull, fd)
+            _limit(job["timeout"], job["memory"])
+            data = json.dumps(_execute(job["code"])).encode("utf-8")
+            while data:
+                data = data[os.write(write_fd, data):]
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    chunks = []
+    timed_out = False
+    deadline = started + job["timeout"]
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            os.kill(pid, signal.SIGKILL)
+            break
+        ready, _, _ = select.select([read_fd], [], [], remaining)
+        if ready:
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    os.close(read_fd)
+    _, status = os.waitpid(pid, 0)
+    elapsed = time.monotonic() - started
+    if timed_out or (os.WIFSIGNALED(status) and os.WTERMSIG(status) == signal.SIGXCPU):
+        return {"status": "timeout", "stdout": "", "error": "Timeout", "elapsed": elapsed}
+    try:
+        result = json.loads(b"".join(chunks))
+    except ValueError:
+        # Killed by a limit before it could report, or it wrote garbage
+        return {"status": "crashed", "stdout": "", "error": "Crashed", "elapsed": elapsed}
+    result["elapsed"] = elapsed
+    return result
+
+
+def serve_worker():
+    """Worker loop: one JSON job per stdin line, one JSON result per stdout line."""
+    for line in sys.stdin:
+        result = _run_child(json.loads(line))
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+# Parent side
+
+class SandboxPool:
+    """Worker processes that run snippets in forked, resource-limited children.
+
+    run() hands a snippet to an idle worker and blocks for its result; call
+    it from several threads (or use map()) to keep every worker busy. A
+    worker that dies is replaced.
+    """
+
+    def __init__(self, workers=None, timeout=2.0, memory_mb=256):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("SandboxPool needs a POSIX system with fork()")
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.memory_bytes = memory_mb << 20
+        self._idle = queue.Queue()
+        self._processes = []
+        self._lock = threading.Lock()
+        for _ in range(self.workers):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        # -I: no user site-packages, PYTHON* variables or script directory on sys.path
+        process = subprocess.Popen(
+            [sys.executable, "-I", os.path.abspath(__file__), "--worker"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1
+        )
+        with self._lock:
+            self._processes.append(process)
+        return process
+
+    def run(self, code):
+        """Runs one snippet; returns {"status", "stdout", "error", "elapsed"}."""
+        process = self._idle.get()
+        try:
+            job = {"code": code, "timeout": self.timeout, "memory": self.memory_bytes}
+            process.stdin.write(json.dumps(job) + "\n")
+            process.stdin.flush()
+            line = process.stdout.readline()
+            if not line:
+                raise OSError("sandbox worker exited")
+            return json.loads(line)
+        except (OSError, ValueError):
+            process.kill()
+            process.wait()
+            process = self._spawn()
+            return {"status": "crashed", "stdout": "", "error": "Crashed", "elapsed": 0.0}
+        finally:
+            self._idle.put(process)
+
+    def map(self, codes):
+        """Runs snippets in parallel across the workers; results come back in order."""
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="sandbox") as executor:
+            return list(executor.map(self.run, codes))
+
+    def close(self):
+        with self._lock:
+            for process in self._processes:
+                if process.poll() is None:
+                    process.stdin.close()
+                    process.wait()
+            self._processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def snippet_key(code):
+    return hashlib.sha256(f"{RUNNER_VERSION}\0{code}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Snippet results keyed by snippet_key(), in SQLite when given a path and in memory otherwise."""
+
+    def __init__(self, path=None):
+        # Imported here: sandbox workers run this file in isolated mode, without the repository on sys.path
+        from attempt_log import open_database
+
+        self._memory = {}
+        self._connection = open_database(path, SCHEMA) if path else None
+
+    def get_many(self, keys):
+        found = {key: self._memory[key] for key in keys if key in self._memory}
+        missing = [key for key in keys if key not in found]
+        if self._connection is not None and missing:
+            # SQLite caps the number of bound parameters, so look keys up in slices
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, result FROM results WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                )
+                found.update((key, json.loads(result)) for key, result in rows)
+        return found
+
+    def put_many(self, results):
+        # Timeouts and crashes depend on the machine's load, so only definite results are kept
+        results = {key: result for key, result in results.items() if result["status"] in ("ok", "error")}
+        self._memory.update(results)
+        if self._connection is not None and results:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO results (key, result) VALUES (?, ?)",
+                    [(key, json.dumps(result)) for key, result in results.items()]
+                )
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+
+
+class Verdict:
+    """The outcome for one question: status is verified, wrong_key, ambiguous, no_match or failed."""
+
+    def __init__(self, question_id, status, keyed, correct, detail=""):
+        self.question_id = question_id
+        self.status = status
+        self.keyed = keyed
+        # 1-based options the code showed to be right
+        self.correct = correct
+        self.detail = detail
+
+    def __repr__(self):
+        return f"Verdict({self.question_id}, {self.status!r}, keyed={self.keyed}, correct={self.correct})"
+
+
+class VerificationReport:
+    def __init__(self):
+        self.questions = 0
+        self.skipped = 0
+        self.snippets = 0
+        self.cached = 0
+        self.executed = 0
+        self.elapsed = 0.0
+        self.verdicts = []
+
+    @property
+    def problems(self):
+        return [verdict for verdict in self.verdicts if verdict.status != "verified"]
+
+    def summary(self):
+        counts = {}
+        for verdict in self.verdicts:
+            counts[verdict.status] = counts.get(verdict.status, 0) + 1
+        lines = [
+            f"questions: {self.questions}  checked: {len(self.verdicts)}  skipped: {self.skipped}",
+            f"snippets: {self.snippets}  cached: {self.cached}  executed: {self.executed}  elapsed: {self.elapsed:.2f}s",
+            "  " + "  ".join(f"{status}: {count}" for status, count in sorted(counts.items())),
+        ]
+        return "\n".join(lines)
+
+
+def _verdict(question_id, question, kind, results, output):
+    keyed = question.correct_answer
+    if kind == "output":
+        result = results[0]
+        if result["status"] not in ("ok", "error"):
+            return Verdict(question_id, "failed", keyed, [], result["error"])
+        correct = [i for i, option in enumerate(question.options, 1) if matches(option, result)]
+        shown = result["stdout"].strip() if result["status"] == "ok" else result["error"]
+    else:
+        failed = [result["error"] for result in results if result["status"] not in ("ok", "error")]
+        if failed:
+            return Verdict(question_id, "failed", keyed, [], failed[0])
+        correct = [i for i, result in enumerate(results, 1) if matches(output, result)]
+        shown = output
+    if correct == [keyed]:
+        return Verdict(question_id, "verified", keyed, correct)
+    if not correct:
+        return Verdict(question_id, "no_match", keyed, correct, f"no option matches {shown!r}")
+    if keyed in correct:
+        return Verdict(question_id, "ambiguous", keyed, correct, f"options {correct} all match {shown!r}")
+    return Verdict(question_id, "wrong_key", keyed, correct, f"code shows {shown!r}")
+
+
+def verify_bank(bank, pool, cache=None, question_ids=None):
+    """Runs every code-output question in bank (or question_ids) and returns a VerificationReport."""
+    cache = cache or ResultCache()
+    report = VerificationReport()
+    started = time.perf_counter()
+    checks = []
+    for question_id in (range(len(bank)) if question_ids is None else question_ids):
+        question = bank[question_id]
+        report.questions += 1
+        check = extract_checks(question)
+        if check is None:
+            report.skipped += 1
+            continue
+        kind, programs, output = check
+        checks.append((question_id, question, kind, [programs] if kind == "output" else programs, output))
+
+    # Each distinct snippet runs once, and only if no earlier run is cached
+    keys = {snippet_key(program): program for *_, programs, _ in checks for program in programs}
+    report.snippets = len(keys)
+    results = cache.get_many(list(keys))
+    report.cached = len(results)
+    missing = [key for key in keys if key not in results]
+    fresh = dict(zip(missing, pool.map([keys[key] for key in missing])))
+    report.executed = len(fresh)
+    cache.put_many(fresh)
+    results.update(fresh)
+
+    for question_id, question, kind, programs, output in checks:
+        outcome = [results[snippet_key(program)] for program in programs]
+        report.verdicts.append(_verdict(question_id, question, kind, outcome, output))
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify the answer key of code-output questions by running them.")
+    parser.add_argument("--bank", help="compiled bank to verify (built-in questions when omitted)")
+    parser.add_argument("--cache", help="SQLite file caching snippet results between runs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="sandbox worker processes")
+    parser.add_argument("--timeout", type=float, default=2.0, help="seconds allowed per snippet")
+    parser.add_argument("--memory", type=int, default=256, help="address space limit per snippet in MiB")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        serve_worker()
+        return 0
+
+    from bank_format import open_bank
+
+    bank = open_bank(args.bank)
+    cache = ResultCache(args.cache)
+    with SandboxPool(args.workers, args.timeout, args.memory) as pool:
+        report = verify_bank(bank, pool, cache)
+    cache.close()
+    print(report.summary())
+    for verdict in report.problems:
+        question = bank[verdict.question_id]
+        print(f"{verdict.question_id:>8}  {verdict.status:<10} keyed {verdict.keyed}, correct {verdict.correct}: "
+              f"{verdict.detail}  [{question.prompt}]")
+    return 1 if report.problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+# columnar_bank.py
+from array import array
+
+import numpy as np
+
+from question_bank import ALL, difficulty_sort_key, intern_label
+
+
+class QuestionView:
+    """Lightweight question materialised from a bank only when displayed."""
+
+    __slots__ = ("prompt", "options", "correct_answer", "explanation", "category", "difficulty")
+
+    def __init__(self, prompt, options, correct_answer, explanation, category, difficulty):
+        self.prompt = prompt
+        self.options = options
+        self.correct_answer = correct_answer
+        self.explanation = explanation
+        self.category = category
+        self.difficulty = difficulty
+
+
+class StringTable:
+    """Strings packed into one UTF-8 buffer and addressed by offsets."""
+
+    def __init__(self):
+        self._data = bytearray()
+        self._offsets = array("q", [0])
+
+    def append(self, text):
+        self._data += text.encode("utf-8")
+        self._offsets.append(len(self._data))
+        return len(self._offsets) - 2
+
+    def freeze(self):
+        self._data = bytes(self._data)
+        self._offsets = np.frombuffer(self._offsets, dtype=np.int64)
+        return self
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        return self._data[self._offsets[index]:self._offsets[index + 1]].decode("utf-8")
+
+    def nbytes(self):
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
+
+
+def group_by_code(codes, n_groups):
+    """Returns (order, starts) so ids with code c are order[starts[c]:starts[c + 1]]."""
+    order = np.argsort(codes, kind="stable").astype(np.int32)
+    starts = np.searchsorted(codes[order], np.arange(n_groups + 1)).astype(np.int64)
+    order.setflags(write=False)
+    return order, starts
+
+
+def pair_codes(category_codes, difficulty_codes, n_difficulties):
+    # Category-major pair codes keep each category's ids in one contiguous run
+    return np.asarray(category_codes, dtype=np.int64) * n_difficulties + np.asarray(difficulty_codes, dtype=np.int64)
+
+
+class CodedBank:
+    """Facet lookups shared by banks that store labels as integer codes.
+
+    Subclasses provide category_names/difficulty_names, the name-to-code
+    lookups and the grouped (order, starts) id arrays built by group_by_code.
+    """
+
+    _all_ids = None
+
+    def __iter__(self):
+        for question_id in range(len(self)):
+            yield self[question_id]
+
+    def all_ids(self):
+        if self._all_ids is None:
+            self._all_ids = np.arange(len(self), dtype=np.int32)
+            self._all_ids.setflags(write=False)
+        return self._all_ids
+
+    def categories(self):
+        return sorted(self.category_names)
+
+    def difficulties(self):
+        return sorted(self.difficulty_names, key=difficulty_sort_key)
+
+    def filter(self, category=ALL, difficulty=ALL):
+        """Returns a read-only int32 array of the ids matching the selection."""
+        n_difficulties = len(self.difficulty_names)
+        if category != ALL and category not in self._category_lookup:
+            return self._pair_order[:0]
+        if difficulty != ALL and difficulty not in self._difficulty_lookup:
+            return self._pair_order[:0]
+        if category == ALL and difficulty == ALL:
+            return self.all_ids()
+        if category == ALL:
+            code = self._difficulty_lookup[difficulty]
+            return self._difficulty_order[self._difficulty_starts[code]:self._difficulty_starts[code + 1]]
+        first = self._category_lookup[category] * n_difficulties
+        if difficulty == ALL:
+            return self._pair_order[self._pair_starts[first]:self._pair_starts[first + n_difficulties]]
+        pair = first + self._difficulty_lookup[difficulty]
+        return self._pair_order[self._pair_starts[pair]:self._pair_starts[pair + 1]]
+
+    def count(self, category=ALL, difficulty=ALL):
+        return len(self.filter(category, difficulty))
+
+    def revision(self, question_id):
+        """Content version of a question; coded banks are read-only, so always 0."""
+        return 0
+
+    def answer_key(self, ids):
+        """Returns the correct option (1-based) of each question as an int8 array."""
+        return self.correct_answers[np.asarray(ids, dtype=np.intp)].astype(np.int8)
+
+    def codes(self, ids):
+        """Returns (category codes, difficulty codes) of the questions, indexing the *_names lists."""
+        ids = np.asarray(ids, dtype=np.intp)
+        return self.category_codes[ids], self.difficulty_codes[ids]
+
+
+class ColumnarBank(CodedBank):
+    """Array-backed question bank with interned category and difficulty codes."""
+
+    def __init__(self, questions=()):
+        self.category_names = []
+        self.difficulty_names = []
+        category_lookup = {}
+        difficulty_lookup = {}
+        category_codes = array("H")
+        difficulty_codes = array("B")
+        correct_answers = array("b")
+        option_starts = array("q", [0])
+        self.prompts = StringTable()
+        self.explanations = StringTable()
+        self.options = StringTable()
+
+        # Single pass: intern labels and append text to the string tables
+        for question in questions:
+            category_codes.append(intern_label(category_lookup, self.category_names, question.category))
+            difficulty_codes.append(intern_label(difficulty_lookup, self.difficulty_names, question.difficulty))
+            correct_answers.append(question.correct_answer)
+            self.prompts.append(question.prompt)
+            self.explanations.append(question.explanation)
+            for option in question.options:
+                self.options.append(option)
+            option_starts.append(len(self.options))
+
+        self.category_codes = np.frombuffer(category_codes, dtype=np.uint16)
+        self.difficulty_codes = np.frombuffer(difficulty_codes, dtype=np.uint8)
+        self.correct_answers = np.frombuffer(correct_answers, dtype=np.int8)
+        self.option_starts = np.frombuffer(option_starts, dtype=np.int64)
+        self.prompts.freeze()
+        self.explanations.freeze()
+        self.options.freeze()
+        self._category_lookup = category_lookup
+        self._difficulty_lookup = difficulty_lookup
+
+        n_difficulties = len(self.difficulty_names)
+        self._pair_order, self._pair_starts = group_by_code(
+            pair_codes(self.category_codes, self.difficulty_codes, n_difficulties),
+            len(self.category_names) * n_difficulties
+        )
+        self._difficulty_order, self._difficulty_starts = group_by_code(self.difficulty_codes, len(self.difficulty_names))
+
+    def __len__(self):
+        return len(self.correct_answers)
+
+    def __getitem__(self, question_id):
+        start, end = self.option_starts[question_id], self.option_starts[question_id + 1]
+        return QuestionView(
+            self.prompts[question_id],
+            [self.options[i] for i in range(start, end)],
+            int(self.correct_answers[question_id]),
+            self.explanations[question_id],
+            self.category_names[self.category_codes[question_id]],
+            self.difficulty_names[self.difficulty_codes[question_id]]
+        )
+
+    def nbytes(self):
+        """Approximate size of the arrays and string tables in bytes."""
+        arrays = (self.category_codes, self.difficulty_codes, self.correct_answers, self.option_starts,
+                  self._pair_order, self._pair_starts, self._difficulty_order, self._difficulty_starts)
+        return (sum(a.nbytes for a in arrays)
+                + self.prompts.nbytes() + self.explanations.nbytes() + self.options.nbytes())
@@ -0,0 +1,202 @@
+# duplicates.py
+"""Near-duplicate question detection with MinHash signatures and LSH banding.
+
+A question's prompt and options are normalised with the search tokenizer
+(lowercased, stopwords dropped, plural "s" stripped), the options sorted so
+their order does not matter, and cut into word shingles. MinHash turns the
+shingle set into a short signature whose agreement with another estimates
+their Jaccard similarity; LSH splits signatures into bands and only compares
+questions that share a band, so finding duplicates is near-linear rather
+than pairwise.
+
+    python duplicates.py --bank bank.pqb --threshold 0.6
+"""
+import argparse
+import zlib
+from array import array
+
+import numpy as np
+
+from search_index import tokenize
+
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_PERMUTATIONS = 128
+# Questions per chunk when hashing a whole bank; the (permutations x shingles) uint64
+# matrix for 2,000 questions of ~40 shingles is about 80 MB
+CHUNK_SIZE = 2000
+
+
+def shingles(question):
+    """Word unigrams and bigrams of the prompt and each option, never spanning two fields."""
+    fields = [tokenize(question.prompt)] + sorted(tokenize(option) for option in question.options)
+    result = set()
+    for tokens in fields:
+        result.update(tokens)
+        result.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+    return result
+
+
+def shingle_hashes(question):
+    # crc32 rather than hash() so signatures agree between processes
+    return [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(question)] or [0]
+
+
+def lsh_bands(threshold, permutations):
+    """Picks (bands, rows) so LSH's false positive and false negative areas around threshold are smallest."""
+    # Midpoints of a fine grid over similarity; the mean over them approximates each integral
+    x = (np.arange(1000) + 0.5) / 1000
+    below = x < threshold
+    best = None
+    for bands in range(1, permutations + 1):
+        rows = permutations // bands
+        probability = 1 - (1 - x ** rows) ** bands
+        error = np.where(below, probability, 1 - probability).mean()
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class DuplicateIndex:
+    """MinHash signatures and LSH buckets for questions added one at a time.
+
+    add() returns the earlier questions whose estimated similarity reaches
+    threshold, then indexes the new one, so an import can flag candidates
+    as it streams. Each question is identified by the key it was added
+    with, or by its position when none is given.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, permutations=DEFAULT_PERMUTATIONS, seed=1):
+        self.threshold = threshold
+        self.permutations = permutations
+        self.bands, self.rows = lsh_bands(threshold, permutations)
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: the top 32 bits of a * x + b, with a odd, over uint64 wraparound
+        self._a = rng.integers(1, 2 ** 63, size=permutations, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=permutations, dtype=np.uint64)
+        self._band_weights = rng.integers(1, 2 ** 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self._signatures = array("I")
+        self._buckets = [{} for _ in range(self.bands)]
+        self._keys = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    @classmethod
+    def build(cls, bank, **kwargs):
+        """Indexes every question in bank, in id order."""
+        index = cls(**kwargs)
+        for question in bank:
+            index.add(question)
+        return index
+
+    def signatures(self, hash_lists):
+        """MinHash signatures, one uint32 row per list of shingle hashes."""
+        lengths = np.fromiter(map(len, hash_lists), dtype=np.int64, count=len(hash_lists))
+        hashes = np.fromiter((h for hashes in hash_lists for h in hashes), dtype=np.uint64, count=int(lengths.sum()))
+        with np.errstate(over="ignore"):
+            permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        return np.minimum.reduceat(permuted, starts, axis=1).T.astype(np.uint32)
+
+    def band_keys(self, signatures):
+        """One 64-bit key per (signature, band); equal bands give equal keys."""
+        banded = signatures[:, :self.bands * self.rows].reshape(len(signatures), self.bands, self.rows)
+        with np.errstate(over="ignore"):
+            return (banded.astype(np.uint64) * self._band_weights).sum(axis=2, dtype=np.uint64)
+
+    def candidates(self, question):
+        """[(key, estimated similarity)] of indexed questions at or above threshold, most similar first."""
+        signature = self.signatures([shingle_hashes(question)])
+        return self._matches(signature[0], self.band_keys(signature)[0])
+
+    def _matches(self, signature, keys):
+        found = set()
+        for band, key in enumerate(keys.tolist()):
+            found.update(self._buckets[band].get(key, ()))
+        if not found:
+            return []
+        found = np.fromiter(found, dtype=np.int64, count=len(found))
+        stored = np.frombuffer(self._signatures, dtype=np.uint32).reshape(-1, self.permutations)
+        similarity = (stored[found] == signature).mean(axis=1)
+        keep = similarity >= self.threshold
+        matches = sorted(zip(similarity[keep].tolist(), found[keep].tolist()), key=lambda match: (-match[0], match[1]))
+        return [(self._keys[position], score) for score, position in matches]
+
+    def add(self, question, key=None):
+        """Indexes question and returns its candidates among those added before it."""
+        signature = self.signatures([shingle_hashes(question)])
+        keys = self.band_keys(signature)[0]
+        matches = self._matches(signature[0], keys)
+        position = len(self._keys)
+        self._keys.append(position if key is None else key)
+        self._signatures.frombytes(signature[0].tobytes())
+        for band, band_key in enumerate(keys.tolist()):
+            self._buckets[band].setdefault(band_key, []).append(position)
+        return matches
+
+
+def find_duplicates(bank, threshold=DEFAULT_THRESHOLD, permutations=DEFAULT_PERMUTATIONS, seed=1,
+                    max_bucket=1000):
+    """Returns [(id, id, estimated similarity)] for every candidate pair in bank, most similar first.
+
+    Signatures are computed in chunks with numpy and each band's buckets are
+    found by sorting its keys, so the cost grows with the bank plus the
+    candidate pairs. Buckets holding more than max_bucket questions (text
+    shared by a large part of the bank) are skipped rather than expanded
+    pairwise.
+    """
+    index = DuplicateIndex(threshold, permutations, seed)
+    n = len(bank)
+    if n < 2:
+        return []
+    signatures = np.empty((n, permutations), dtype=np.uint32)
+    for start in range(0, n, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, n)
+        signatures[start:stop] = index.signatures([shingle_hashes(bank[i]) for i in range(start, stop)])
+    keys = index.band_keys(signatures)
+
+    pairs = []
+    for band in range(index.bands):
+        order = np.argsort(keys[:, band], kind="stable")
+        sorted_keys = keys[order, band]
+        # Runs of equal keys are the band's buckets
+        bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+        starts = np.concatenate(([0], bounds))
+        sizes = np.diff(np.concatenate((starts, [n])))
+        for start, size in zip(starts[(sizes > 1) & (sizes <= max_bucket)].tolist(),
+                               sizes[(sizes > 1) & (sizes <= max_bucket)].tolist()):
+            members = np.sort(order[start:start + size])
+            first, second = np.triu_indices(size, 1)
+            pairs.append(members[first] * n + members[second])
+    if not pairs:
+        return []
+
+    pairs = np.unique(np.concatenate(pairs))
+    first, second = pairs // n, pairs % n
+    similarity = (signatures[first] == signatures[second]).mean(axis=1)
+    keep = similarity >= threshold
+    first, second, similarity = first[keep], second[keep], similarity[keep]
+    order = np.lexsort((second, first, -similarity))
+    return list(zip(first[order].tolist(), second[order].tolist(), similarity[order].tolist()))
+
+
+def main():
+    from bank_format import open_bank
+
+    parser = argparse.ArgumentParser(description="Report near-duplicate questions in a bank.")
+    parser.add_argument("--bank", help="compiled bank to check (built-in questions when omitted)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="estimated Jaccard similarity of prompt and option shingles to report")
+    parser.add_argument("--limit", type=int, default=100, help="pairs to print")
+    args = parser.parse_args()
+
+    bank = open_bank(args.bank)
+    pairs = find_duplicates(bank, args.threshold)
+    print(f"{len(pairs)} candidate pairs at similarity >= {args.threshold} in {len(bank):,} questions")
+    for first, second, similarity in pairs[:args.limit]:
+        print(f"{similarity:5.2f}  {first:>8}  {bank[first].prompt}")
+        print(f"{'':5}  {second:>8}  {bank[second].prompt}")
+
+
+if __name__ == "__main__":
+    main()
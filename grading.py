@@ -0,0 +1,149 @@
+# grading.py
+"""Batch grading of answer sheets against the bank's answer key.
+
+A sheet CSV has a sheet_id column followed by one column per question id;
+each cell holds the chosen option (1-based) and blank means unanswered:
+
+    sheet_id,0,3,7,12
+    alice,2,3,1,4
+    bob,2,,1,1
+
+    python grading.py sheets.csv --bank bank.pqb --out scores.csv
+"""
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+from bank_format import open_bank
+from question_bank import difficulty_sort_key
+
+
+class GradeReport:
+    """Scores, item statistics and label breakdowns for a batch of answer sheets."""
+
+    def __init__(self, question_ids, correct, category_names, by_category, difficulty_names, by_difficulty):
+        self.question_ids = question_ids
+        self.correct = correct
+        self.scores = correct.sum(axis=1)
+        self.percentages = self.scores * 100.0 / max(correct.shape[1], 1)
+        # Classical item p-value: the share of sheets answering each question correctly
+        self.p_values = correct.mean(axis=0) if len(correct) else np.zeros(correct.shape[1])
+        self.category_names = category_names
+        self.by_category = by_category
+        self.difficulty_names = difficulty_names
+        self.by_difficulty = by_difficulty
+
+    def rows(self, sheet_ids):
+        """Yields one output row per sheet: id, score, total, percentage and breakdowns."""
+        total = self.correct.shape[1]
+        for i, sheet_id in enumerate(sheet_ids):
+            yield ([sheet_id, int(self.scores[i]), total, round(float(self.percentages[i]), 1)]
+                   + [round(float(v), 1) for v in self.by_category[i]]
+                   + [round(float(v), 1) for v in self.by_difficulty[i]])
+
+    def header(self):
+        return (["sheet_id", "score", "total", "percentage"]
+                + [f"category:{name}" for name in self.category_names]
+                + [f"difficulty:{name}" for name in self.difficulty_names])
+
+
+def _breakdown(correct, codes, names, sort_key):
+    # One-hot (questions x labels) matrix; a single matmul gives hits per sheet and label
+    present = np.unique(codes)
+    present = np.array(sorted(present, key=lambda c: sort_key(names[c])), dtype=np.intp)
+    one_hot = (codes[:, None] == present[None, :]).astype(np.float64)
+    hits = correct.astype(np.float64) @ one_hot
+    return [names[c] for c in present], hits * 100.0 / one_hot.sum(axis=0)
+
+
+def grade_sheets(bank, question_ids, answers):
+    """Grades an (n_sheets x n_questions) matrix of chosen options in one comparison."""
+    question_ids = np.asarray(question_ids, dtype=np.intp)
+    answers = np.asarray(answers)
+    if answers.ndim != 2 or answers.shape[1] != len(question_ids):
+        raise ValueError(f"answers must be (n_sheets x {len(question_ids)}), got {answers.shape}")
+    unknown = question_ids[(question_ids < 0) | (question_ids >= len(bank))]
+    if len(unknown):
+        raise ValueError(f"question ids not in the bank of {len(bank)}: {', '.join(map(str, unknown[:10]))}")
+    correct = answers == bank.answer_key(question_ids)[None, :]
+    category_codes, difficulty_codes = bank.codes(question_ids)
+    category_names, by_category = _breakdown(correct, category_codes, bank.category_names, str)
+    difficulty_names, by_difficulty = _breakdown(correct, difficulty_codes, bank.difficulty_names, difficulty_sort_key)
+    return GradeReport(question_ids, correct, category_names, by_category, difficulty_names, by_difficulty)
+
+
+def _option(cell, line_number):
+    cell = cell.strip()
+    if not cell:
+        return 0
+    if not cell.isdigit() or int(cell) > np.iinfo(np.int8).max:
+        raise ValueError(f"line {line_number}: {cell!r} is not an option number")
+    return int(cell)
+
+
+def read_sheets(path):
+    """Returns (sheet ids, question ids, answer matrix) from a sheet CSV.
+
+    Rows that stop early leave the remaining questions unanswered; bad
+    input raises ValueError naming the line.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            raise ValueError(f"{path} is empty")
+        try:
+            question_ids = [int(column) for column in header[1:]]
+        except ValueError:
+            raise ValueError("line 1: question columns must be integer question ids")
+        sheet_ids = []
+        rows = []
+        for row in reader:
+            if not row:
+                continue
+            if len(row) - 1 > len(question_ids):
+                raise ValueError(f"line {reader.line_num}: {len(row) - 1} answers for {len(question_ids)} questions")
+            sheet_ids.append(row[0])
+            answers = [_option(cell, reader.line_num) for cell in row[1:]]
+            rows.append(answers + [0] * (len(question_ids) - len(answers)))
+    answers = np.array(rows, dtype=np.int8).reshape(len(rows), len(question_ids))
+    return sheet_ids, question_ids, answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grade a CSV of answer sheets against the question bank.")
+    parser.add_argument("sheets", help="CSV with a sheet_id column and one column per question id")
+    parser.add_argument("--bank", help="compiled bank to grade against (built-in questions when omitted)")
+    parser.add_argument("--out", help="write per-sheet scores here instead of stdout")
+    args = parser.parse_args()
+
+    bank = open_bank(args.bank)
+    try:
+        sheet_ids, question_ids, answers = read_sheets(args.sheets)
+        report = grade_sheets(bank, question_ids, answers)
+    except (OSError, ValueError) as e:
+        print(f"Cannot grade {args.sheets}: {e}", file=sys.stderr)
+        return 1
+
+    out = open(args.out, "w", encoding="utf-8", newline="") if args.out else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(report.header())
+        writer.writerows(report.rows(sheet_ids))
+    finally:
+        if args.out:
+            out.close()
+
+    if not sheet_ids:
+        print("No sheets to grade", file=sys.stderr)
+        return 0
+    print(f"Graded {len(sheet_ids)} sheets; mean score {report.percentages.mean():.1f}%", file=sys.stderr)
+    for question_id, p_value in zip(question_ids, report.p_values):
+        print(f"  question {question_id}: p = {p_value:.2f}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
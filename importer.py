@@ -0,0 +1,255 @@
+# importer.py
+"""Streaming bulk import of questions from JSONL or CSV files.
+
+Records are read one at a time, validated and appended to any sink with an
+add(question) method (QuestionBank or bank_format.BankWriter), so memory use
+does not grow with the size of the input file.
+
+JSONL lines and CSV rows use the Question fields: prompt, options,
+correct_answer (1-based), explanation, category and difficulty. In CSV the
+options are either a JSON list in an "options" column or separate
+option_1, option_2, ... columns.
+
+    python importer.py questions.jsonl more.csv --out bank.pqb
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+from bank_format import BankWriter
+from duplicates import DEFAULT_THRESHOLD, DuplicateIndex
+from question_bank import CATEGORIES, DIFFICULTY_COLORS, Question
+
+FIELDS = ("prompt", "options", "correct_answer", "explanation", "category", "difficulty")
+
+# Files are decoded with surrogateescape, which turns bytes that are not UTF-8 into these
+UNDECODABLE = re.compile("[\udc80-\udcff]")
+
+
+def read_jsonl(path):
+    """Yields (line number, record) pairs; unparsable lines yield the error instead."""
+    with open(path, encoding="utf-8", errors="surrogateescape") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            if UNDECODABLE.search(line):
+                yield line_number, ValueError("not valid UTF-8")
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, ValueError(f"invalid JSON: {e.msg}")
+
+
+def read_csv(path):
+    """Yields (line number, record) pairs with options gathered into a list.
+
+    Short rows leave their missing cells as None, which validation rejects.
+    """
+    with open(path, encoding="utf-8", errors="surrogateescape", newline="") as f:
+        reader = csv.DictReader(f)
+        option_columns = sorted(
+            (c for c in reader.fieldnames or () if c.startswith("option_")),
+            key=lambda c: int(c.rsplit("_", 1)[1]) if c.rsplit("_", 1)[1].isdigit() else 0
+        )
+        for row in reader:
+            if any(isinstance(value, str) and UNDECODABLE.search(value) for value in row.values()):
+                yield reader.line_num, ValueError("not valid UTF-8")
+                continue
+            if row.get("options") is not None:
+                try:
+                    row["options"] = json.loads(row["options"])
+                except json.JSONDecodeError as e:
+                    yield reader.line_num, ValueError(f"invalid options JSON: {e.msg}")
+                    continue
+            elif "options" not in row:
+                options = [row.pop(c) or "" for c in option_columns]
+                while options and not options[-1].strip():
+                    options.pop()
+                # A blank between answers would shift every later option's number
+                if not all(option.strip() for option in options):
+                    yield reader.line_num, ValueError("blank option between answers")
+                    continue
+                row["options"] = options
+            yield reader.line_num, row
+
+
+def read_records(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return read_jsonl(path)
+    if extension == ".csv":
+        return read_csv(path)
+    raise ValueError(f"Unsupported file type: {path} (expected .jsonl or .csv)")
+
+
+def parse_answer(value):
+    """Returns correct_answer as an int; 2, 2.0 and "2" are accepted, 1.9, "1e400" and true are not."""
+    if isinstance(value, bool):
+        raise ValueError("correct_answer is not an integer")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and re.fullmatch(r"\s*[+-]?[0-9]+\s*", value):
+        return int(value)
+    raise ValueError("correct_answer is not an integer")
+
+
+def validate_record(record, categories=CATEGORIES):
+    """Returns a Question built from the record, or raises ValueError with the reason."""
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+    missing = [field for field in FIELDS if record.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    options = record["options"]
+    if not isinstance(options, list) or len(options) < 2:
+        raise ValueError("options must be a list of at least two answers")
+    if not all(isinstance(option, str) and option.strip() for option in options):
+        raise ValueError("options must be non-empty strings")
+
+    correct_answer = parse_answer(record["correct_answer"])
+    if not 1 <= correct_answer <= len(options):
+        raise ValueError(f"correct_answer {correct_answer} is outside options 1-{len(options)}")
+
+    # Lists and objects are unhashable, so check the type before looking the labels up
+    if not isinstance(record["difficulty"], str) or record["difficulty"] not in DIFFICULTY_COLORS:
+        raise ValueError(f"unknown difficulty {record['difficulty']!r}")
+    if not isinstance(record["category"], str) or record["category"] not in categories:
+        raise ValueError(f"unknown category {record['category']!r}")
+
+    return Question(
+        str(record["prompt"]),
+        options,
+        correct_answer,
+        str(record["explanation"]),
+        record["category"],
+        record["difficulty"]
+    )
+
+
+class ImportReport:
+    """Counts, throughput and bounded samples of rejected and possibly duplicate rows."""
+
+    def __init__(self, max_samples=20, max_reasons=50):
+        self.rows = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.reasons = Counter()
+        self.samples = []
+        self.duplicate_samples = []
+        self.max_samples = max_samples
+        self.max_reasons = max_reasons
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def reject(self, source, line_number, reason):
+        self.rejected += 1
+        # Keep the tally bounded on files with many distinct errors
+        if reason in self.reasons or len(self.reasons) < self.max_reasons:
+            self.reasons[reason] += 1
+        else:
+            self.reasons["other"] += 1
+        if len(self.samples) < self.max_samples:
+            self.samples.append((source, line_number, reason))
+
+    def flag_duplicate(self, source, line_number, matches):
+        """Records an accepted row whose text is close to earlier questions; it is still imported."""
+        self.duplicates += 1
+        if len(self.duplicate_samples) < self.max_samples:
+            self.duplicate_samples.append((source, line_number, matches))
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        lines = [
+            f"rows: {self.rows}  accepted: {self.accepted}  rejected: {self.rejected}",
+            f"elapsed: {self.elapsed:.2f}s  throughput: {self.rows_per_second:,.0f} rows/s"
+        ]
+        for reason, count in self.reasons.most_common():
+            lines.append(f"  {count:>8}  {reason}")
+        for source, line_number, reason in self.samples:
+            lines.append(f"  {source}:{line_number}: {reason}")
+        if self.duplicates:
+            lines.append(f"possible duplicates: {self.duplicates}")
+            for source, line_number, matches in self.duplicate_samples:
+                similar = ", ".join(f"{key} ({similarity:.2f})" for key, similarity in matches[:3])
+                lines.append(f"  {source}:{line_number}: similar to {similar}")
+        return "\n".join(lines)
+
+
+def import_questions(paths, sink=None, categories=CATEGORIES, report=None, progress=None, progress_every=100000,
+                     index=None, duplicates=None):
+    """Streams, validates and appends records from each path into sink.
+
+    With no sink the files are only validated. index, a
+    search_index.SearchIndex over the questions already in sink, is kept
+    in step by indexing each accepted question as it is appended.
+    duplicates, a duplicates.DuplicateIndex, flags accepted rows close to
+    a question seen before them in the report. progress, if given, is
+    called with the report every progress_every rows.
+    """
+    report = report or ImportReport()
+    for path in paths:
+        for line_number, record in read_records(path):
+            report.rows += 1
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                question = validate_record(record, categories)
+            except ValueError as e:
+                report.reject(path, line_number, str(e))
+            else:
+                if sink is not None:
+                    sink.add(question)
+                if index is not None:
+                    index.add(question)
+                if duplicates is not None:
+                    matches = duplicates.add(question, f"{path}:{line_number}")
+                    if matches:
+                        report.flag_duplicate(path, line_number, matches)
+                report.accepted += 1
+            if progress and report.rows % progress_every == 0:
+                report.elapsed = time.perf_counter() - report.started
+                progress(report)
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate and import JSONL/CSV question files.")
+    parser.add_argument("paths", nargs="+", help="input .jsonl or .csv files")
+    parser.add_argument("--out", help="compiled bank to write (validate only when omitted)")
+    parser.add_argument("--category", action="append", default=[], help="extra category to accept")
+    parser.add_argument("--duplicates", nargs="?", type=float, const=DEFAULT_THRESHOLD, metavar="THRESHOLD",
+                        help=f"flag near-duplicate rows at this similarity (default {DEFAULT_THRESHOLD})")
+    args = parser.parse_args()
+
+    def show_progress(report):
+        print(f"{report.rows:,} rows ({report.rows_per_second:,.0f} rows/s)", file=sys.stderr)
+
+    categories = set(CATEGORIES) | set(args.category)
+    duplicates = DuplicateIndex(args.duplicates) if args.duplicates is not None else None
+    if args.out:
+        with BankWriter(args.out) as writer:
+            report = import_questions(args.paths, writer, categories, progress=show_progress, duplicates=duplicates)
+    else:
+        report = import_questions(args.paths, None, categories, progress=show_progress, duplicates=duplicates)
+    print(report.summary())
+    if args.out:
+        print(f"Wrote {report.accepted} questions to {args.out}")
+    return 1 if report.rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
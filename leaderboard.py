@@ -0,0 +1,137 @@
+# leaderboard.py
+import heapq
+import math
+import random
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from question_bank import ALL
+
+
+class KLLSketch:
+    """Streaming quantile sketch (Karnin, Lang and Liberty).
+
+    Keeps O(k log(n / k)) items however many values are added; ranks are
+    accurate to about 1.7 / k of n with high probability.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.compactors = [[]]
+        self._size = 0
+        self._capacity_total = self._capacities_sum()
+        self._rng = random.Random(seed)
+        self._sorted = None
+
+    def __len__(self):
+        return self.n
+
+    def _capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _capacities_sum(self):
+        return sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.n += 1
+        self._size += 1
+        self._sorted = None
+        if self._size >= self._capacity_total:
+            self._compress()
+
+    def _compress(self):
+        for height, items in enumerate(self.compactors):
+            if len(items) < self._capacity(height):
+                continue
+            if height + 1 == len(self.compactors):
+                self.compactors.append([])
+            # Promote every other sorted item with double weight; an odd one stays behind
+            items.sort()
+            leftover = items[-1:] if len(items) % 2 else []
+            promoted = items[self._rng.random() < 0.5:len(items) - len(leftover):2]
+            self.compactors[height + 1].extend(promoted)
+            self._size += len(promoted) + len(leftover) - len(items)
+            items[:] = leftover
+            self._capacity_total = self._capacities_sum()
+            return
+
+    def _cdf(self):
+        if self._sorted is None:
+            weighted = sorted((value, 1 << height) for height, items in enumerate(self.compactors) for value in items)
+            self._sorted = ([value for value, _ in weighted], list(accumulate(weight for _, weight in weighted)))
+        return self._sorted
+
+    def rank(self, value, inclusive=False):
+        """Returns the estimated fraction of values below (or at, if inclusive) value."""
+        if not self.n:
+            return 0.0
+        values, cumulative = self._cdf()
+        position = (bisect_right if inclusive else bisect_left)(values, value)
+        return cumulative[position - 1] / cumulative[-1] if position else 0.0
+
+    def quantile(self, fraction):
+        if not self.n:
+            return None
+        values, cumulative = self._cdf()
+        return values[min(bisect_left(cumulative, fraction * cumulative[-1]), len(values) - 1)]
+
+
+class Leaderboard:
+    """Top-k boards and percentile sketches per (category, difficulty).
+
+    Every finished quiz updates its own selection and the overall
+    (All, All) board. Both structures have a fixed size, so submitting a
+    result and looking up a rank cost the same after a million quizzes as
+    after ten. The board lives in the process and is shared by sessions.
+    """
+
+    def __init__(self, size=10, sketch_k=200):
+        self.size = size
+        self.sketch_k = sketch_k
+        self._boards = {}
+        self._sketches = {}
+        self._lock = threading.Lock()
+
+    def _keys(self, category, difficulty):
+        return {(category, difficulty), (ALL, ALL)}
+
+    def submit(self, name, score, total, category=ALL, difficulty=ALL, finished_at=None):
+        """Records a finished quiz; returns the fraction of earlier players it beat."""
+        percentage = score / total * 100 if total else 0.0
+        finished_at = time.time() if finished_at is None else finished_at
+        # Ties keep the earlier result, so the latest one is evicted first
+        entry = (percentage, score, -finished_at, name)
+        with self._lock:
+            beaten = self._beat_fraction(percentage, category, difficulty)
+            for key in self._keys(category, difficulty):
+                board = self._boards.setdefault(key, [])
+                if len(board) < self.size:
+                    heapq.heappush(board, entry)
+                elif entry > board[0]:
+                    heapq.heapreplace(board, entry)
+                self._sketches.setdefault(key, KLLSketch(self.sketch_k)).update(percentage)
+        return beaten
+
+    def _beat_fraction(self, percentage, category, difficulty):
+        sketch = self._sketches.get((category, difficulty))
+        return sketch.rank(percentage) if sketch else 0.0
+
+    def beat_fraction(self, percentage, category=ALL, difficulty=ALL):
+        """Returns the estimated fraction of results strictly below percentage."""
+        with self._lock:
+            return self._beat_fraction(percentage, category, difficulty)
+
+    def players(self, category=ALL, difficulty=ALL):
+        sketch = self._sketches.get((category, difficulty))
+        return len(sketch) if sketch else 0
+
+    def top(self, category=ALL, difficulty=ALL):
+        """Returns [(name, score, percentage)] best first."""
+        with self._lock:
+            board = sorted(self._boards.get((category, difficulty), []), reverse=True)
+        return [(name, score, percentage) for percentage, score, _, name in board]
@@ -0,0 +1,633 @@
+# live_bank.py
+"""A question bank that follows a directory of question files while the app runs.
+
+BankWatcher polls the directory and re-reads only files whose size or
+modification time changed. It diffs their questions against what it
+loaded before, by key: the record's "id" field, or its prompt when there
+is none. The differences become one delta of adds, edits and removals for
+the LiveBank. Question ids are never reused. An edit keeps its id, and a
+removal keeps its slot but leaves the category/difficulty indexes, so
+attempt logs, review schedules and calibration keyed by id stay valid.
+
+With an IdStore (watch_directory keeps one in .bank_ids.db inside the
+directory) the key -> id map and the bank versions survive restarts and
+are shared by every worker following the directory: a question keeps its
+id whatever order the files are loaded in, and the same file contents
+always get the same version, so a quiz saved by one worker resumes on
+another.
+
+Every delta builds a new BankGeneration copy-on-write. Columns are stored
+in chunks and only the chunks that change are copied. Only the facet id
+arrays that gained or lost ids are rebuilt. The current generation is
+swapped in with one assignment, so readers never lock. A quiz keeps
+reading the generation it started on, so its question pool and answer key
+cannot shift under it. Later quizzes see the new questions.
+
+Files should be replaced atomically (written elsewhere, then renamed into
+the directory): a half-written file reads as removals until its next
+change, although keys that come back get their old ids back.
+
+    bank = watch_directory("questions/")
+"""
+import copy
+import hashlib
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+from attempt_log import open_database
+from bank_format import MappedBank
+from importer import read_records, validate_record
+from question_bank import ALL, CATEGORIES, Question, difficulty_sort_key, intern_label
+
+logger = logging.getLogger(__name__)
+
+CHUNK_BITS = 10
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+EXTENSIONS = (".jsonl", ".ndjson", ".csv", ".pqb")
+
+EMPTY_IDS = np.zeros(0, dtype=np.int32)
+EMPTY_IDS.setflags(write=False)
+
+# Held by ids another process assigned to questions this one has not seen
+PLACEHOLDER = Question("", [], 0, "", "", "")
+
+ID_SCHEMA = """
+CREATE TABLE IF NOT EXISTS question_ids (
+    file TEXT NOT NULL,
+    key TEXT NOT NULL,
+    question_id INTEGER NOT NULL,
+    PRIMARY KEY (file, key)
+);
+CREATE TABLE IF NOT EXISTS versions (
+    digest TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+
+class ChunkedColumn:
+    """A growable column in fixed-size chunks; copies share chunks until one of them is written."""
+
+    def __init__(self, typecode=None):
+        # None keeps Python objects in lists, otherwise an array of that typecode
+        self.typecode = typecode
+        self._chunks = []
+        self._length = 0
+        self._owned = set()
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        return self._chunks[index >> CHUNK_BITS][index & CHUNK_MASK]
+
+    def copy(self):
+        column = copy.copy(self)
+        column._chunks = list(self._chunks)
+        # Every chunk is now shared, so neither side may write one in place
+        column._owned = set()
+        self._owned = set()
+        return column
+
+    def _writable(self, chunk):
+        if chunk not in self._owned:
+            self._chunks[chunk] = self._chunks[chunk][:]
+            self._owned.add(chunk)
+        return self._chunks[chunk]
+
+    def __setitem__(self, index, value):
+        self._writable(index >> CHUNK_BITS)[index & CHUNK_MASK] = value
+
+    def append(self, value):
+        chunk = self._length >> CHUNK_BITS
+        if chunk == len(self._chunks):
+            self._chunks.append([] if self.typecode is None else array(self.typecode))
+            self._owned.add(chunk)
+        self._writable(chunk).append(value)
+        self._length += 1
+
+    def take(self, ids, dtype):
+        """Returns the values at ids as a numpy array of dtype."""
+        ids = np.asarray(ids, dtype=np.intp).tolist()
+        return np.fromiter((self[i] for i in ids), dtype=dtype, count=len(ids))
+
+
+def _facets(category, difficulty):
+    # Every question is listed under its pair, its category, its difficulty and ALL
+    return ((category, difficulty), (category, ALL), (ALL, difficulty), (ALL, ALL))
+
+
+def _merge(ids, leaving, joining):
+    """ids (sorted int32) without leaving and with joining, as a new read-only array."""
+    if leaving:
+        ids = np.delete(ids, np.searchsorted(ids, np.sort(np.array(leaving, dtype=np.int32))))
+    if joining:
+        joining = np.sort(np.array(joining, dtype=np.int32))
+        if not len(ids) or joining[0] > ids[-1]:
+            # New questions take the highest ids, so the common case is an append
+            ids = np.concatenate([ids, joining])
+        else:
+            ids = np.insert(ids, np.searchsorted(ids, joining), joining)
+    ids = np.ascontiguousarray(ids, dtype=np.int32)
+    ids.setflags(write=False)
+    return ids
+
+
+def same_question(a, b):
+    return (a.prompt == b.prompt and list(a.options) == list(b.options) and a.correct_answer == b.correct_answer
+            and a.explanation == b.explanation and a.category == b.category and a.difficulty == b.difficulty)
+
+
+class BankGeneration:
+    """One immutable version of a live bank, with the QuestionBank interface.
+
+    len() and iteration cover every id ever assigned, removed ones
+    included; filter() and count() only see live questions.
+    """
+
+    def __init__(self):
+        self.version = 0
+        # Generations published before this one in this process; versions repeat when contents do
+        self.serial = 0
+        self.category_names = []
+        self.difficulty_names = []
+        self._category_lookup = {}
+        self._difficulty_lookup = {}
+        self._questions = ChunkedColumn()
+        self._category_codes = ChunkedColumn("H")
+        self._difficulty_codes = ChunkedColumn("B")
+        self._answers = ChunkedColumn("b")
+        self._live = ChunkedColumn("B")
+        # Version that last set each question, so caches can tell an edited question from its old text
+        self._revisions = ChunkedColumn("I")
+        # (category, difficulty) with ALL wildcards -> sorted read-only int32 ids of live questions
+        self._facets = {}
+
+    def __len__(self):
+        return len(self._questions)
+
+    def __getitem__(self, question_id):
+        return self._questions[question_id]
+
+    def __iter__(self):
+        for question_id in range(len(self)):
+            yield self[question_id]
+
+    def is_live(self, question_id):
+        return 0 <= question_id < len(self) and bool(self._live[question_id])
+
+    def revision(self, question_id):
+        return self._revisions[question_id]
+
+    def categories(self):
+        return sorted(category for (category, difficulty), ids in self._facets.items()
+                      if difficulty == ALL and category != ALL and len(ids))
+
+    def difficulties(self):
+        return sorted((difficulty for (category, difficulty), ids in self._facets.items()
+                       if category == ALL and difficulty != ALL and len(ids)), key=difficulty_sort_key)
+
+    def filter(self, category=ALL, difficulty=ALL):
+        """Returns a read-only int32 array of the live ids matching the selection."""
+        return self._facets.get((category, difficulty), EMPTY_IDS)
+
+    def count(self, category=ALL, difficulty=ALL):
+        return len(self.filter(category, difficulty))
+
+    def answer_key(self, ids):
+        """Returns the correct option (1-based) of each question as an int8 array."""
+        return self._answers.take(ids, np.int8)
+
+    def codes(self, ids):
+        """Returns (category codes, difficulty codes) of the questions, indexing the *_names lists."""
+        return self._category_codes.take(ids, np.uint16), self._difficulty_codes.take(ids, np.uint8)
+
+    def _set(self, question_id, question):
+        self._questions[question_id] = question
+        self._category_codes[question_id] = intern_label(self._category_lookup, self.category_names, question.category)
+        self._difficulty_codes[question_id] = intern_label(
+            self._difficulty_lookup, self.difficulty_names, question.difficulty
+        )
+        self._answers[question_id] = question.correct_answer
+        self._revisions[question_id] = self.version
+
+    def _grow(self, length):
+        # New slots hold a placeholder that no index lists until a question is set there
+        while len(self) < length:
+            for column in (self._questions, self._category_codes, self._difficulty_codes,
+                           self._answers, self._live, self._revisions):
+                column.append(PLACEHOLDER if column.typecode is None else 0)
+
+    def apply(self, added=(), edited=None, removed=(), version=None):
+        """Returns (next generation, ids given to added); this generation is left as it was.
+
+        edited maps ids to their new question; an id that was removed comes
+        back, and one past the end is placed there. removed lists ids to
+        drop from the indexes. version defaults to one more than this one.
+        """
+        generation = copy.copy(self)
+        generation.version = self.version + 1 if version is None else version
+        generation.serial = self.serial + 1
+        for name in ("_questions", "_category_codes", "_difficulty_codes", "_answers", "_live", "_revisions"):
+            setattr(generation, name, getattr(self, name).copy())
+        # Label tables are tiny; copying them keeps older generations' categories() unchanged
+        generation.category_names = list(self.category_names)
+        generation.difficulty_names = list(self.difficulty_names)
+        generation._category_lookup = dict(self._category_lookup)
+        generation._difficulty_lookup = dict(self._difficulty_lookup)
+        generation._facets = dict(self._facets)
+
+        leaving = {}
+        joining = {}
+        for question_id in removed:
+            if generation.is_live(question_id):
+                question = generation[question_id]
+                for facet in _facets(question.category, question.difficulty):
+                    leaving.setdefault(facet, []).append(question_id)
+                generation._live[question_id] = 0
+        for question_id, question in (edited or {}).items():
+            generation._grow(question_id + 1)
+            if generation.is_live(question_id):
+                old = generation[question_id]
+                if (old.category, old.difficulty) == (question.category, question.difficulty):
+                    # Same facets: only the columns change
+                    generation._set(question_id, question)
+                    continue
+                for facet in _facets(old.category, old.difficulty):
+                    leaving.setdefault(facet, []).append(question_id)
+            generation._set(question_id, question)
+            generation._live[question_id] = 1
+            for facet in _facets(question.category, question.difficulty):
+                joining.setdefault(facet, []).append(question_id)
+        added_ids = []
+        for question in added:
+            question_id = len(generation)
+            generation._grow(question_id + 1)
+            generation._set(question_id, question)
+            generation._live[question_id] = 1
+            for facet in _facets(question.category, question.difficulty):
+                joining.setdefault(facet, []).append(question_id)
+            added_ids.append(question_id)
+
+        # Only facets that gained or lost ids are rebuilt; the rest are shared with this generation
+        for facet in set(leaving) | set(joining):
+            generation._facets[facet] = _merge(
+                generation._facets.get(facet, EMPTY_IDS), leaving.get(facet), joining.get(facet)
+            )
+        return generation, added_ids
+
+
+class LiveBank:
+    """The current BankGeneration, plus recent ones that in-flight quizzes still read.
+
+    Reads go to the current generation. A generation stays available to
+    snapshot() until max_generations newer ones exist or retain_seconds
+    have passed since it was replaced. Quizzes hold their generation, so
+    this only limits which versions a quiz restored from a session store
+    can find; after that snapshot() raises KeyError rather than handing
+    it a different bank. One instance is shared by all sessions.
+    """
+
+    def __init__(self, max_generations=64, retain_seconds=3600.0):
+        self.max_generations = max_generations
+        self.retain_seconds = retain_seconds
+        self.current = BankGeneration()
+        self.reloads = 0
+        self.last_reload_seconds = 0.0
+        # The BankWatcher feeding this bank, if any
+        self.watcher = None
+        # version -> (generation, monotonic time it was replaced)
+        self._previous = OrderedDict()
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.current.version
+
+    @property
+    def category_names(self):
+        return self.current.category_names
+
+    @property
+    def difficulty_names(self):
+        return self.current.difficulty_names
+
+    def __len__(self):
+        return len(self.current)
+
+    def __getitem__(self, question_id):
+        return self.current[question_id]
+
+    def __iter__(self):
+        return iter(self.current)
+
+    def is_live(self, question_id):
+        return self.current.is_live(question_id)
+
+    def revision(self, question_id):
+        return self.current.revision(question_id)
+
+    def categories(self):
+        return self.current.categories()
+
+    def difficulties(self):
+        return self.current.difficulties()
+
+    def filter(self, category=ALL, difficulty=ALL):
+        return self.current.filter(category, difficulty)
+
+    def count(self, category=ALL, difficulty=ALL):
+        return self.current.count(category, difficulty)
+
+    def answer_key(self, ids):
+        return self.current.answer_key(ids)
+
+    def codes(self, ids):
+        return self.current.codes(ids)
+
+    def keeps(self, version):
+        """Whether snapshot(version) still returns that generation rather than the current one."""
+        return version == self.current.version or version in self._previous
+
+    def snapshot(self, version=None):
+        """The generation with this version, the current one for None; raises KeyError once it is not kept."""
+        current = self.current
+        if version is None or version == current.version:
+            return current
+        entry = self._previous.get(version)
+        if entry is None:
+            raise KeyError(f"Bank version {version} is no longer kept")
+        return entry[0]
+
+    def subscribe(self, callback):
+        """Calls callback(generation, changed ids, reload seconds) after each new generation is published."""
+        self._listeners.append(callback)
+
+    def apply(self, added=(), edited=None, removed=(), started=None, version=None):
+        """Publishes the next generation; returns the ids given to added.
+
+        started is the perf_counter() time the change was first seen, so the
+        reported reload time includes reading the files. version defaults
+        to one more than the current one.
+        """
+        started = time.perf_counter() if started is None else started
+        with self._lock:
+            previous = self.current
+            generation, added_ids = previous.apply(added, edited, removed, version)
+            self.current = generation
+            now = time.monotonic()
+            # A version seen before (the files were changed back) moves to the newest end
+            self._previous.pop(previous.version, None)
+            self._previous[previous.version] = (previous, now)
+            while self._previous:
+                version, (_, replaced_at) = next(iter(self._previous.items()))
+                if len(self._previous) <= self.max_generations and now - replaced_at <= self.retain_seconds:
+                    break
+                del self._previous[version]
+            self.reloads += 1
+            self.last_reload_seconds = time.perf_counter() - started
+        changed = list(removed) + list(edited or {}) + added_ids
+        for callback in self._listeners:
+            try:
+                callback(generation, changed, self.last_reload_seconds)
+            except Exception:
+                logger.exception("Bank reload listener failed")
+        return added_ids
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IdStore:
+    """Question ids by (file, key) and bank versions by content, in a SQLite file.
+
+    Every process following a directory opens the same store, so they
+    agree on ids and versions; assigning happens in one IMMEDIATE
+    transaction, so two workers never hand out the same id.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = open_database(path, ID_SCHEMA)
+        self._lock = threading.Lock()
+
+    def assign(self, file, keys):
+        """Returns {key: question id} for keys of one file, giving keys not seen before the next free ids."""
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            known = dict(self._connection.execute(
+                "SELECT key, question_id FROM question_ids WHERE file = ?", (file,)
+            ))
+            new = [key for key in keys if key not in known]
+            if new:
+                (next_id,) = self._connection.execute(
+                    "SELECT COALESCE(MAX(question_id), -1) + 1 FROM question_ids"
+                ).fetchone()
+                rows = [(file, key, next_id + i) for i, key in enumerate(new)]
+                self._connection.executemany(
+                    "INSERT INTO question_ids (file, key, question_id) VALUES (?, ?, ?)", rows
+                )
+                known.update((key, question_id) for _, key, question_id in rows)
+        return {key: known[key] for key in keys}
+
+    def version(self, digest):
+        """Returns the version of the bank contents with this digest, numbering new contents in order."""
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            row = self._connection.execute("SELECT version FROM versions WHERE digest = ?", (digest,)).fetchone()
+            if row is not None:
+                return row[0]
+            (version,) = self._connection.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM versions").fetchone()
+            self._connection.execute("INSERT INTO versions (digest, version) VALUES (?, ?)", (digest, version))
+            return version
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class BankWatcher:
+    """Polls a directory of question files and applies what changed to a LiveBank.
+
+    .jsonl, .ndjson and .csv files go through the importer's validation
+    (invalid rows are skipped and counted in rejected); .pqb files are
+    compiled banks, keyed by position. A file that cannot be read keeps
+    its previous questions. Without an id store, ids and versions are
+    numbered in load order and only hold for this process.
+    """
+
+    def __init__(self, directory, bank=None, interval=2.0, categories=CATEGORIES, id_store=None):
+        self.directory = directory
+        self.bank = LiveBank() if bank is None else bank
+        self.interval = interval
+        self.categories = categories
+        self.ids = id_store
+        self.rejected = 0
+        self.errors = 0
+        # file name -> (signature, {key: question id}, content digest)
+        self._files = {}
+        # (file name, key) -> id of a question whose key disappeared, reused if it comes back
+        self._retired = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _read(self, path):
+        """Returns {key: question} for one file."""
+        questions = {}
+        if path.endswith(".pqb"):
+            bank = MappedBank(path)
+            try:
+                for question_id in range(len(bank)):
+                    questions[f"#{question_id}"] = bank[question_id]
+            finally:
+                bank.close()
+            return questions
+        for line_number, record in read_records(path):
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                question = validate_record(record, self.categories)
+                # An id of 0 or "" is still an id; only a missing one falls back to the prompt
+                key = str(record.get("id") if record.get("id") is not None else question.prompt)
+                if key in questions:
+                    raise ValueError(f"duplicate key {key!r}")
+            except ValueError as e:
+                self.rejected += 1
+                logger.warning("Skipping %s line %d: %s", path, line_number, e)
+                continue
+            questions[key] = question
+        return questions
+
+    def poll(self):
+        """Applies any changes since the last poll; returns the new version, or None if nothing changed."""
+        started = time.perf_counter()
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.endswith(EXTENSIONS) and not name.startswith("."))
+        changed = []
+        for name in names:
+            try:
+                signature = _file_signature(os.path.join(self.directory, name))
+            except OSError:
+                # Deleted since listdir; the next poll sees it gone
+                continue
+            if self._files.get(name, (None,))[0] != signature:
+                changed.append((name, signature))
+        gone = [name for name in self._files if name not in names]
+        if not changed and not gone:
+            return None
+
+        generation = self.bank.current
+        added, added_keys, edited, removed = [], [], {}, []
+        files = {}
+        for name in gone:
+            for key, question_id in self._files[name][1].items():
+                self._retired[(name, key)] = question_id
+                removed.append(question_id)
+        for name, signature in changed:
+            _, ids, digest = self._files.get(name, (None, {}, None))
+            path = os.path.join(self.directory, name)
+            try:
+                questions = self._read(path)
+                digest = _file_digest(path)
+            except Exception as e:
+                # Whatever goes wrong with one file, the others are still applied
+                self.errors += 1
+                logger.error("Could not read %s (%r); keeping its previous questions", name, e)
+                files[name] = (signature, ids, digest)
+                continue
+            kept = {}
+            new_keys = []
+            for key, question in questions.items():
+                question_id = ids.get(key)
+                if question_id is None:
+                    question_id = self._retired.pop((name, key), None)
+                    if question_id is None:
+                        new_keys.append(key)
+                        continue
+                    edited[question_id] = question
+                elif not same_question(generation[question_id], question):
+                    edited[question_id] = question
+                kept[key] = question_id
+            if self.ids is not None and new_keys:
+                # The store gives back the id any process gave this key before
+                for key, question_id in self.ids.assign(name, new_keys).items():
+                    edited[question_id] = questions[key]
+                    kept[key] = question_id
+            else:
+                for key in new_keys:
+                    added.append(questions[key])
+                    added_keys.append((name, key))
+            for key, question_id in ids.items():
+                if key not in questions:
+                    self._retired[(name, key)] = question_id
+                    removed.append(question_id)
+            files[name] = (signature, kept, digest)
+
+        for name in gone:
+            del self._files[name]
+        self._files.update(files)
+        if not (added or edited or removed):
+            # Touched but unchanged files
+            return None
+        version = None
+        if self.ids is not None:
+            contents = hashlib.blake2b(digest_size=16)
+            for name in sorted(self._files):
+                contents.update(f"{name}\0{self._files[name][2]}\0".encode("utf-8"))
+            version = self.ids.version(contents.hexdigest())
+        added_ids = self.bank.apply(added, edited, removed, started, version)
+        for (name, key), question_id in zip(added_keys, added_ids):
+            self._files[name][1][key] = question_id
+        logger.info("Bank version %d: %d added, %d edited, %d removed in %.1f ms", self.bank.version,
+                    len(added), len(edited), len(removed), self.bank.last_reload_seconds * 1000)
+        return self.bank.version
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Polling %s failed", self.directory)
+
+    def start(self):
+        """Polls every interval seconds on a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="bank-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def watch_directory(directory, interval=2.0, id_store=None):
+    """Loads every question file in directory and keeps following it; returns the LiveBank.
+
+    Ids and versions are kept in id_store, by default .bank_ids.db in the directory.
+    """
+    id_store = os.path.join(directory, ".bank_ids.db") if id_store is None else id_store
+    watcher = BankWatcher(directory, interval=interval, id_store=IdStore(id_store))
+    watcher.poll()
+    watcher.start()
+    watcher.bank.watcher = watcher
+    return watcher.bank
@@ -0,0 +1,207 @@
+# metrics.py
+import cProfile
+import functools
+import logging
+import os
+import pickle
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; a rerun phase of a few milliseconds is the common case
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """Fixed-bucket histogram: observe() is one bisect and two additions."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Yields (upper bound, observations at or below it), ending with +Inf."""
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            running += count
+            yield bound, running
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Opt-in rerun instrumentation exported in the Prometheus text format.
+
+    Phases are timed into per-phase histograms, sessions report the size
+    of their session_state, and gauges registered with register() are read
+    at export time. One instance is shared by all sessions; every update
+    takes a single lock for a few additions.
+    """
+
+    def __init__(self, path=None, write_interval=5.0, session_ttl=300.0, profile_dir="profiles"):
+        self.path = path
+        self.write_interval = write_interval
+        self.session_ttl = session_ttl
+        self.profile_dir = profile_dir
+        self._phases = {}
+        self._sessions = {}
+        self._gauges = []
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            histogram = self._phases.get(phase)
+            if histogram is None:
+                histogram = self._phases[phase] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def phase(self, name):
+        """Times the enclosed block into the histogram for phase name."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def register(self, name, kind, help_text, read):
+        """Adds a gauge or counter whose value read() returns at export time."""
+        self._gauges.append((name, kind, help_text, read))
+
+    def observe_session(self, session_id, session_state):
+        """Marks a session active and records the pickled size of its state."""
+        size = 0
+        for value in session_state.values():
+            try:
+                size += len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception:
+                # Widget values and other unpicklable entries are skipped
+                continue
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session_id] = (now, size)
+            stale = [key for key, (seen, _) in self._sessions.items() if now - seen > self.session_ttl]
+            for key in stale:
+                del self._sessions[key]
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        with self._lock:
+            phases = {name: (list(h.cumulative()), h.sum, h.count) for name, h in self._phases.items()}
+            now = time.monotonic()
+            sessions = {key: size for key, (seen, size) in self._sessions.items() if now - seen <= self.session_ttl}
+
+        lines = [
+            "# HELP quiz_phase_seconds Time spent in each phase of a rerun.",
+            "# TYPE quiz_phase_seconds histogram",
+        ]
+        for name in sorted(phases):
+            buckets, total, count = phases[name]
+            for bound, running in buckets:
+                lines.append(f"quiz_phase_seconds_bucket{_labels([('phase', name), ('le', _number(bound))])} {running}")
+            lines.append(f"quiz_phase_seconds_sum{_labels([('phase', name)])} {_number(total)}")
+            lines.append(f"quiz_phase_seconds_count{_labels([('phase', name)])} {count}")
+
+        lines += [
+            "# HELP quiz_active_sessions Sessions that reran within the session TTL.",
+            "# TYPE quiz_active_sessions gauge",
+            f"quiz_active_sessions {len(sessions)}",
+            "# HELP quiz_session_state_bytes Pickled size of each active session's state.",
+            "# TYPE quiz_session_state_bytes gauge",
+        ]
+        for key in sorted(sessions):
+            lines.append(f"quiz_session_state_bytes{_labels([('session', key)])} {sessions[key]}")
+
+        for name, kind, help_text, read in self._gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {_number(read())}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, force=False):
+        """Writes the metrics file atomically, at most once per write_interval unless forced."""
+        if not self.path:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_write < self.write_interval:
+                return
+            self._last_write = now
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(temporary, self.path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serves /metrics from a daemon thread; binds to localhost unless told otherwise."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        return self._server.server_address
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def profile(self, func, *args, **kwargs):
+        """Runs func under cProfile and dumps the stats; returns (result, path of the .prof file)."""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"rerun-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof")
+        profiler = cProfile.Profile()
+        try:
+            result = profiler.runcall(func, *args, **kwargs)
+        finally:
+            profiler.dump_stats(path)
+        return result, path
+
+
+def timed(phase):
+    """Decorates a method to time it into phase when its object has metrics enabled."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.metrics is None:
+                return method(self, *args, **kwargs)
+            with self.metrics.phase(phase):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
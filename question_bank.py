@@ -0,0 +1,144 @@
+# question_bank.py
+from array import array
+
+import numpy as np
+
+
+ALL = "All"
+
+# Known difficulty levels, in display order, with their badge colors
+DIFFICULTY_COLORS = {
+    "Easy": "#28a745",
+    "Medium": "#ffc107",
+    "Hard": "#dc3545"
+}
+DEFAULT_COLOR = "#6c757d"
+
+# Categories covered by the built-in questions
+CATEGORIES = ("Basics", "Operators", "Data Types", "Modules", "Data Structures", "OOP", "Error Handling", "Advanced")
+
+
+def difficulty_sort_key(difficulty):
+    order = list(DIFFICULTY_COLORS)
+    return (order.index(difficulty) if difficulty in order else len(order), difficulty)
+
+
+class Question:
+    def __init__(self, prompt, options, correct_answer, explanation, category, difficulty):
+        self.prompt = prompt
+        self.options = options
+        self.correct_answer = correct_answer
+        self.explanation = explanation
+        self.category = category
+        self.difficulty = difficulty
+
+
+def intern_label(lookup, names, name):
+    """Returns the integer code of name, assigning the next one if it is new."""
+    code = lookup.get(name)
+    if code is None:
+        code = lookup[name] = len(names)
+        names.append(name)
+    return code
+
+
+class IdView:
+    """Read-only view over an index list so lookups never copy it."""
+
+    __slots__ = ("_ids",)
+
+    def __init__(self, ids):
+        self._ids = ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, position):
+        return self._ids[position]
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self._ids, dtype=dtype or np.int32)
+
+
+class QuestionBank:
+    """In-memory question store with inverted indexes by category and difficulty."""
+
+    def __init__(self, questions=()):
+        self._questions = []
+        self.category_names = []
+        self.difficulty_names = []
+        self._category_lookup = {}
+        self._difficulty_lookup = {}
+        self._category_codes = array("H")
+        self._difficulty_codes = array("B")
+        self._by_category = {}
+        self._by_difficulty = {}
+        self._by_pair = {}
+        for question in questions:
+            self.add(question)
+
+    def __len__(self):
+        return len(self._questions)
+
+    def __getitem__(self, question_id):
+        return self._questions[question_id]
+
+    def __iter__(self):
+        return iter(self._questions)
+
+    def add(self, question):
+        """Appends a question and updates every index; returns its id."""
+        question_id = len(self._questions)
+        self._questions.append(question)
+        self._category_codes.append(intern_label(self._category_lookup, self.category_names, question.category))
+        self._difficulty_codes.append(intern_label(self._difficulty_lookup, self.difficulty_names, question.difficulty))
+        self._by_category.setdefault(question.category, []).append(question_id)
+        self._by_difficulty.setdefault(question.difficulty, []).append(question_id)
+        self._by_pair.setdefault((question.category, question.difficulty), []).append(question_id)
+        return question_id
+
+    def categories(self):
+        return sorted(self._by_category)
+
+    def difficulties(self):
+        return sorted(self._by_difficulty, key=difficulty_sort_key)
+
+    def _ids(self, category, difficulty):
+        # Pick the narrowest index for the selection without copying it
+        if category == ALL and difficulty == ALL:
+            return None
+        if category == ALL:
+            return self._by_difficulty.get(difficulty, [])
+        if difficulty == ALL:
+            return self._by_category.get(category, [])
+        return self._by_pair.get((category, difficulty), [])
+
+    def filter(self, category=ALL, difficulty=ALL):
+        """Returns a read-only sequence of the ids matching the selection."""
+        ids = self._ids(category, difficulty)
+        if ids is None:
+            return range(len(self._questions))
+        return IdView(ids)
+
+    def count(self, category=ALL, difficulty=ALL):
+        ids = self._ids(category, difficulty)
+        if ids is None:
+            return len(self._questions)
+        return len(ids)
+
+    def revision(self, question_id):
+        """Content version of a question; questions here never change, so always 0."""
+        return 0
+
+    def answer_key(self, ids):
+        """Returns the correct option (1-based) of each question as an int8 array."""
+        return np.fromiter((self._questions[i].correct_answer for i in ids), dtype=np.int8, count=len(ids))
+
+    def codes(self, ids):
+        """Returns (category codes, difficulty codes) of the questions, indexing the *_names lists."""
+        ids = np.asarray(ids, dtype=np.intp)
+        return (np.frombuffer(self._category_codes, dtype=np.uint16)[ids],
+                np.frombuffer(self._difficulty_codes, dtype=np.uint8)[ids])
@@ -0,0 +1,126 @@
+# question_data.py
+from question_bank import Question
+
+# Create expanded questions with categories and difficulty levels
+questions = [
+    Question(
+        "What is the correct way to create a function in Python?",
+        ["function myFunc():", "def myFunc():", "create myFunc():", "func myFunc():"],
+        2,
+        "In Python, functions are defined using the 'def' keyword followed by the function name and parentheses.",
+        "Basics",
+        "Easy"
+    ),
+    Question(
+        "Which of the following is NOT a valid variable name in Python?",
+        ["my_var", "myVar", "2myVar", "_myVar"],
+        3,
+        "Variable names cannot start with a number in Python.",
+        "Basics",
+        "Easy"
+    ),
+    Question(
+        "What does the 'len()' function do in Python?",
+        ["Calculates the length of a string", "Returns the largest item in a list", "Counts the number of items in a list, tuple, or string", "None of the above"],
+        3,
+        "The len() function returns the number of items in an object like strings, lists, tuples, etc.",
+        "Basics",
+        "Easy"
+    ),
+    Question(
+        "What is the output of: print(2 ** 3)?",
+        ["6", "8", "5", "Error"],
+        2,
+        "The ** operator in Python represents exponentiation. 2 raised to the power of 3 equals 8.",
+        "Operators",
+        "Easy"
+    ),
+    Question(
+        "Which data type is mutable in Python?",
+        ["String", "Tuple", "List", "Integer"],
+        3,
+        "Lists are mutable, meaning they can be changed after creation. Strings, tuples, and integers are immutable.",
+        "Data Types",
+        "Medium"
+    ),
+    Question(
+        "What is the correct way to import a module named 'mymodule' in Python?",
+        ["import mymodule", "include mymodule", "using mymodule", "#include <mymodule>"],
+        1,
+        "In Python, modules are imported using the 'import' keyword followed by the module name.",
+        "Modules",
+        "Easy"
+    ),
+    Question(
+        "Which of the following is a correct way to create a list comprehension in Python?",
+        ["[x * 2 for x in range(10)]", "list(x * 2 for x in range(10))", "array[x * 2 for x in range(10)]", "All of the above"],
+        1,
+        "List comprehensions use square brackets and follow the pattern [expression for item in iterable].",
+        "Data Structures",
+        "Medium"
+    ),
+    Question(
+        "What is the purpose of the '__init__' method in Python classes?",
+        ["To initialize class attributes", "To create new instances", "To define class methods", "To delete objects"],
+        1,
+        "The '__init__' method is called when an object is created and is used to initialize attributes of the class.",
+        "OOP",
+        "Medium"
+    ),
+    Question(
+        "What is the correct way to catch all exceptions in Python?",
+        ["catch(Exception e) { }", "except Exception as e:", "try(Exception e) { }", "catch Exception as e:"],
+        2,
+        "In Python, 'except Exception as e:' is used to catch all exceptions and store the exception object in variable e.",
+        "Error Handling",
+        "Medium"
+    ),
+    Question(
+        "What is a decorator in Python?",
+        ["A function that takes a function and returns a function", "A class inheritance mechanism", "A type of loop", "A way to format output"],
+        1,
+        "A decorator is a function that takes another function as an argument, extends its behavior, and returns it.",
+        "Advanced",
+        "Hard"
+    ),
+    Question(
+        "What is the purpose of 'self' in Python class methods?",
+        ["To reference the class itself", "To reference the current instance of the class", "To make the method private", "To reference the parent class"],
+        2,
+        "In Python class methods, 'self' is a reference to the instance of the class. It's used to access variables and methods belonging to the instance.",
+        "OOP",
+        "Medium"
+    ),
+    Question(
+        "What is the difference between '==' and 'is' in Python?",
+        ["'==' checks for equality of value, 'is' checks for identity", "They are identical in functionality", "'==' is for numbers, 'is' is for strings", "'is' checks for equality of value, '==' checks for identity"],
+        1,
+        "'==' checks if two objects have the same value, while 'is' checks if two references refer to the same object in memory.",
+        "Operators",
+        "Medium"
+    ),
+    Question(
+        "What is a generator in Python?",
+        ["A function that returns a list", "A function that yields values one at a time", "A class that generates random numbers", "A tool for generating Python code"],
+        2,
+        "A generator is a function that returns an iterator that yields items one at a time, rather than returning them all at once.",
+        "Advanced",
+        "Hard"
+    ),
+    Question(
+        "Which of the following is a valid way to create a set in Python?",
+        ["{1, 2, 3}", "set([1, 2, 3])", "Both A and B", "Neither A nor B"],
+        3,
+        "In Python, sets can be created using curly braces {1, 2, 3} or the set() constructor with an iterable.",
+        "Data Structures",
+        "Medium"
+    ),
+    Question(
+        "What does the 'yield' keyword do in Python?",
+        ["Returns a value from a function", "Pauses a function and returns a value", "Ends a function execution", "Creates a new object"],
+        2,
+        "The 'yield' keyword pauses a function's execution and returns a value, allowing the function to resume from where it left off when called again.",
+        "Advanced",
+        "Hard"
+    )
+]
@@ -0,0 +1,137 @@
+# question_render.py
+import threading
+from collections import OrderedDict
+
+from question_bank import DEFAULT_COLOR, DIFFICULTY_COLORS
+
+# Answer state of a question that has not been answered yet
+UNANSWERED = 0
+
+CORRECT_STYLE = "background-color: #d4edda; border-color: #c3e6cb;"
+INCORRECT_STYLE = "background-color: #f8d7da; border-color: #f5c6cb;"
+
+
+def difficulty_color(difficulty):
+    return DIFFICULTY_COLORS.get(difficulty, DEFAULT_COLOR)
+
+
+def render_header(question, position, length):
+    """Badges and progress bar; they depend on the quiz position, so they are not cached."""
+    return f"""
+    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
+        <span class="badge" style="background-color: #6c757d;">Question {position + 1}/{length}</span>
+        <span class="badge" style="background-color: {difficulty_color(question.difficulty)};">{question.difficulty}</span>
+        <span class="badge">{question.category}</span>
+    </div>
+    <div class="progress-bar-bg">
+        <div class="progress-bar-fill" style="width: {position / length * 100}%;"></div>
+    </div>
+    """
+
+
+def render_card(question):
+    return f"""
+    <div class="question-card">
+        <h2 style="color: #2C3E50; margin-bottom: 20px;">{question.prompt}</h2>
+    </div>
+    """
+
+
+def render_feedback(question, selected_option):
+    """The options coloured by the chosen answer, followed by the feedback panel."""
+    is_correct = selected_option == question.correct_answer
+    parts = []
+    for i, option in enumerate(question.options, 1):
+        button_style = ""
+        if i == selected_option:
+            button_style = CORRECT_STYLE if is_correct else INCORRECT_STYLE
+        elif i == question.correct_answer and not is_correct:
+            button_style = CORRECT_STYLE
+        parts.append(f"""
+    <div class="option-button" style="{button_style}">
+        {i}. {option}
+    </div>""")
+
+    if is_correct:
+        parts.append(f"""
+    <div class="feedback-correct">
+        <strong>✓ Correct!</strong> Well done!
+        <p>{question.explanation}</p>
+    </div>
+    """)
+    else:
+        parts.append(f"""
+    <div class="feedback-incorrect">
+        <strong>✗ Incorrect.</strong> The correct answer was: {question.correct_answer}. {question.options[question.correct_answer-1]}
+        <p>{question.explanation}</p>
+    </div>
+    """)
+    return "".join(parts)
+
+
+class RenderCache:
+    """LRU cache of question HTML keyed by (question id, revision, answer state).
+
+    State UNANSWERED holds the question card and state k the options and
+    feedback after choosing option k; both are fixed for a given revision
+    of a question, so repeat renders are a dictionary lookup. Pass the bank
+    a quiz reads from when it can differ from the cache's own (an older
+    generation of a live bank); an edited question then gets a new entry.
+    prerender() fills the cache for the whole bank up front. One instance
+    is shared by all sessions.
+    """
+
+    def __init__(self, bank, size=4096):
+        self.bank = bank
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _render(self, bank, question_id, state):
+        question = bank[question_id]
+        return render_card(question) if state == UNANSWERED else render_feedback(question, state)
+
+    def get(self, question_id, state=UNANSWERED, bank=None):
+        bank = self.bank if bank is None else bank
+        question_id = int(question_id)
+        key = (question_id, bank.revision(question_id), int(state))
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+        # Render outside the lock; two sessions racing on one key store equal strings
+        html = self._render(bank, question_id, state)
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return html
+
+    def card(self, question_id, bank=None):
+        return self.get(question_id, UNANSWERED, bank)
+
+    def feedback(self, question_id, selected_option, bank=None):
+        return self.get(question_id, selected_option, bank)
+
+    def prerender(self):
+        """Renders every question in every answer state, growing the cache to fit."""
+        entries = OrderedDict()
+        for question_id in range(len(self.bank)):
+            question = self.bank[question_id]
+            revision = self.bank.revision(question_id)
+            entries[(question_id, revision, UNANSWERED)] = render_card(question)
+            for choice in range(1, len(question.options) + 1):
+                entries[(question_id, revision, choice)] = render_feedback(question, choice)
+        with self._lock:
+            self.size = max(self.size, len(entries))
+            self._entries = entries
+        return len(entries)
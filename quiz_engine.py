@@ -0,0 +1,280 @@
+# quiz_engine.py
+import random
+import threading
+import time
+
+import numpy as np
+
+from analytics import summarize_quiz
+from adaptive import update_ability
+from live_bank import LiveBank
+from question_bank import ALL
+from sampling import SeededPermutation, sample_id_array
+from spaced_repetition import answer_quality
+
+# Latencies are stored as uint32 milliseconds (about 49 days)
+MAX_LATENCY_MS = np.iinfo(np.uint32).max
+
+# The name answers are recorded under when the player gave none; it gets no review schedule
+ANONYMOUS = "Player"
+
+
+class QuizState:
+    """Progress of one quiz: the selection, seed, cursor and answers so far.
+
+    Holds only plain values and small arrays, so it can live in any session
+    store. Questions themselves stay in the shared bank.
+    """
+
+    def __init__(self, category=ALL, difficulty=ALL, length=0, seed=0, adaptive=False, review_ids=None,
+                 generation=None):
+        self.category = category
+        self.difficulty = difficulty
+        self.length = length
+        self.seed = seed
+        self.adaptive = adaptive
+        self.cursor = 0
+        self.score = 0
+        self.completed = length == 0
+        # Chosen option per question (1-based), 0 while unanswered
+        self.answers = np.zeros(length, dtype=np.int8)
+        # Milliseconds from first showing each question to its answer
+        self.latencies_ms = np.zeros(length, dtype=np.uint32)
+        # perf_counter_ns() when the current question was first shown, 0 until then
+        self.shown_at_ns = 0
+        self.started_at = time.time()
+        # Adaptive quizzes record their ids as they are chosen
+        self.ability = 0.0
+        self.adaptive_ids = np.full(length if adaptive else 0, -1, dtype=np.int32)
+        # Review quizzes ask the due questions they were started with
+        self.review = review_ids is not None
+        self.review_ids = np.asarray(review_ids if self.review else [], dtype=np.int32)
+        # Version of the live bank generation the quiz reads from; None reads the current one
+        self.generation = generation
+        # That generation itself, so it outlives the LiveBank's retention while this state does;
+        # not pickled, and looked up again by version after a session store restores the state
+        self.bank_snapshot = None
+        # Fraction of players the finished quiz beat, once it is on the leaderboard
+        self.rank = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["bank_snapshot"] = None
+        return state
+
+    @property
+    def answered(self):
+        return self.cursor < self.length and self.answers[self.cursor] != 0
+
+    @property
+    def selected_option(self):
+        return int(self.answers[self.cursor]) if self.answered else None
+
+
+class QuizEngine:
+    """Quiz rules independent of any UI: filtering, progression, grading and results.
+
+    The engine is shared and stateless between calls; every method takes
+    the QuizState it works on. With a LiveBank, each quiz reads the bank
+    generation it started on, so reloads never change a quiz in progress.
+    """
+
+    def __init__(self, bank, calibration=None, attempt_log=None, leaderboard=None, scheduler=None):
+        self.bank = bank
+        # An ItemCalibration, or a function that builds one the first time an adaptive quiz needs it
+        self._calibration = calibration
+        self._calibration_lock = threading.Lock()
+        self.attempt_log = attempt_log
+        self.leaderboard = leaderboard
+        self.scheduler = scheduler
+
+    @property
+    def adaptive_available(self):
+        return self._calibration is not None
+
+    @property
+    def calibration(self):
+        if callable(self._calibration):
+            with self._calibration_lock:
+                if callable(self._calibration):
+                    self._calibration = self._calibration()
+        return self._calibration
+
+    def snapshot(self, state=None):
+        """The bank state reads from: its generation of a live bank, the current one without a state.
+
+        Raises KeyError for a restored state whose generation is no longer kept; see resumable().
+        """
+        if not isinstance(self.bank, LiveBank):
+            return self.bank
+        if state is None:
+            return self.bank.current
+        if state.bank_snapshot is None:
+            state.bank_snapshot = self.bank.snapshot(state.generation)
+        return state.bank_snapshot
+
+    def resumable(self, state):
+        """Whether state's bank generation can still be read, so resuming it asks the same questions."""
+        if not isinstance(self.bank, LiveBank) or state.generation is None or state.bank_snapshot is not None:
+            return True
+        return self.bank.keeps(state.generation)
+
+    def categories(self):
+        return self.bank.categories()
+
+    def difficulties(self):
+        return self.bank.difficulties()
+
+    def pool(self, category=ALL, difficulty=ALL):
+        return self.bank.filter(category, difficulty)
+
+    def pool_size(self, category=ALL, difficulty=ALL):
+        return self.bank.count(category, difficulty)
+
+    def start(self, category=ALL, difficulty=ALL, length=ALL, seed=None, adaptive=False):
+        """Returns a new quiz over the selection; length ALL asks the whole pool."""
+        if adaptive:
+            if not self.adaptive_available:
+                raise ValueError("Adaptive quizzes need an ItemCalibration")
+            # Adaptive mode chooses the difficulty itself
+            difficulty = ALL
+        bank = self.snapshot()
+        pool_size = bank.count(category, difficulty)
+        length = pool_size if length == ALL else min(length, pool_size)
+        seed = random.getrandbits(32) if seed is None else seed
+        generation = bank.version if isinstance(self.bank, LiveBank) else None
+        state = QuizState(category, difficulty, length, seed, adaptive, generation=generation)
+        if generation is not None:
+            state.bank_snapshot = bank
+        if adaptive and length:
+            question_id = self.calibration.next_question(state.ability, set(), category, len(bank))
+            if question_id is None:
+                self._end_early(state)
+            else:
+                state.adaptive_ids[0] = question_id
+        return state
+
+    def start_review(self, user, length=ALL, limit=50, now=None):
+        """Returns a quiz over user's most overdue questions, at most limit (or length) of them."""
+        if self.scheduler is None:
+            raise ValueError("Review quizzes need a ReviewScheduler")
+        limit = limit if length == ALL else min(length, limit)
+        question_ids = self.scheduler.due(user, limit, now)
+        if not isinstance(self.bank, LiveBank):
+            # Schedules outlive a switch to a smaller bank; ids past its end are not asked
+            question_ids = [question_id for question_id in question_ids if question_id < len(self.bank)]
+            return QuizState(length=len(question_ids), review_ids=question_ids)
+        # Questions removed from a live bank keep their schedules but are not asked
+        bank = self.snapshot()
+        question_ids = [question_id for question_id in question_ids if bank.is_live(question_id)]
+        state = QuizState(length=len(question_ids), review_ids=question_ids, generation=bank.version)
+        state.bank_snapshot = bank
+        return state
+
+    def due_reviews(self, user, limit=50, now=None):
+        """How many of user's questions are due, counting up to limit."""
+        if self.scheduler is None or user == ANONYMOUS:
+            return 0
+        return len(self.scheduler.due(user, limit, now))
+
+    def question_id(self, state, position=None):
+        position = state.cursor if position is None else position
+        if state.adaptive:
+            return int(state.adaptive_ids[position])
+        if state.review:
+            return int(state.review_ids[position])
+        pool = self.snapshot(state).filter(state.category, state.difficulty)
+        return int(pool[SeededPermutation(len(pool), state.seed)[position]])
+
+    def question_ids(self, state):
+        """Returns the ids of every question in the quiz, in order."""
+        if state.adaptive:
+            return state.adaptive_ids.copy()
+        if state.review:
+            return state.review_ids.copy()
+        return sample_id_array(self.snapshot(state).filter(state.category, state.difficulty), state.length, state.seed)
+
+    def question(self, state):
+        """Returns the current question, decoding only that one from the bank."""
+        return self.snapshot(state)[self.question_id(state)]
+
+    def show(self, state):
+        """Marks the current question as shown; only the first call per question counts."""
+        if not state.shown_at_ns and not state.completed:
+            state.shown_at_ns = time.perf_counter_ns()
+
+    def answer(self, state, choice, latency_ms=None, user=ANONYMOUS):
+        """Grades the chosen option (1-based) for the current question; returns whether it was correct.
+
+        The latency defaults to the time since show() was first called for
+        this question, or 0 if it never was.
+        """
+        if state.completed:
+            raise ValueError("The quiz is already complete")
+        if state.answered:
+            raise ValueError("The current question was already answered")
+        if latency_ms is None:
+            latency_ms = (time.perf_counter_ns() - state.shown_at_ns) // 1_000_000 if state.shown_at_ns else 0
+        latency_ms = min(max(int(latency_ms), 0), MAX_LATENCY_MS)
+        question_id = self.question_id(state)
+        is_correct = choice == int(self.snapshot(state).answer_key([question_id])[0])
+        state.answers[state.cursor] = choice
+        state.latencies_ms[state.cursor] = latency_ms
+        if is_correct:
+            state.score += 1
+
+        # Update the player's ability and the question's calibrated difficulty
+        if state.adaptive:
+            rating = self.calibration.ratings[question_id]
+            self.calibration.record(question_id, state.ability, is_correct)
+            state.ability = update_ability(state.ability, rating, is_correct, state.cursor)
+
+        # Every answer by a named player schedules that question's next review
+        if self.scheduler is not None and user != ANONYMOUS:
+            self.scheduler.review(user, question_id, answer_quality(is_correct, latency_ms))
+
+        # Queue the answer for the background log writer
+        if self.attempt_log is not None:
+            self.attempt_log.record(user, question_id, choice, is_correct, latency_ms)
+        return is_correct
+
+    def advance(self, state):
+        """Moves to the next question; returns False once the quiz is complete."""
+        state.cursor += 1
+        state.shown_at_ns = 0
+        if state.cursor >= state.length:
+            state.completed = True
+            return False
+        if state.adaptive:
+            # Pick the most informative unseen question for the new ability estimate
+            question_id = self.calibration.next_question(
+                state.ability, set(state.adaptive_ids[:state.cursor].tolist()), state.category,
+                len(self.snapshot(state))
+            )
+            if question_id is None:
+                self._end_early(state)
+                return False
+            state.adaptive_ids[state.cursor] = question_id
+        return True
+
+    def _end_early(self, state):
+        # Questions removed from a live bank can leave an adaptive quiz with nothing unseen to ask;
+        # it ends with the questions already answered
+        state.length = state.cursor
+        state.answers = state.answers[:state.cursor]
+        state.latencies_ms = state.latencies_ms[:state.cursor]
+        state.adaptive_ids = state.adaptive_ids[:state.cursor]
+        state.completed = True
+
+    def results(self, state):
+        """Returns the QuizResults breakdowns of a finished quiz."""
+        return summarize_quiz(self.snapshot(state), self.question_ids(state), state.answers, state.latencies_ms)
+
+    def submit_result(self, state, user=ANONYMOUS):
+        """Adds a finished quiz to the leaderboard once; returns the fraction of players it beat."""
+        # Review quizzes pick their own questions, so they are not comparable with other players'
+        if self.leaderboard is None or state.review:
+            return None
+        if state.rank is None:
+            state.rank = self.leaderboard.submit(user, state.score, state.length, state.category, state.difficulty)
+        return state.rank
@@ -0,0 +1,97 @@
+# sampling.py
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+
+
+def mix64(x):
+    """splitmix64 finaliser: a fast, well-distributed 64-bit hash."""
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+def mix64_array(x):
+    """Vectorised mix64 over a uint64 array (multiplication wraps modulo 2**64)."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class SeededPermutation:
+    """Seeded shuffle of range(n) evaluated one position at a time.
+
+    A small Feistel network is a bijection on the smallest even-bit domain
+    covering n; cycle-walking maps it back into range(n). Looking up a
+    position is O(1) in time and memory, so a quiz of k questions costs
+    O(k) however large the pool is, and the same seed always gives the
+    same order.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, n, seed):
+        if n < 0:
+            raise ValueError("n must be non-negative")
+        self.n = n
+        self.seed = seed
+        bits = max((n - 1).bit_length(), 2)
+        bits += bits % 2
+        self._half_bits = bits // 2
+        self._half_mask = (1 << self._half_bits) - 1
+        self._keys = [mix64((seed & MASK64) ^ mix64(round_number + 1)) for round_number in range(self.ROUNDS)]
+
+    def __len__(self):
+        return self.n
+
+    def _encrypt(self, x):
+        left, right = x >> self._half_bits, x & self._half_mask
+        for key in self._keys:
+            left, right = right, left ^ (mix64(right ^ key) & self._half_mask)
+        return (left << self._half_bits) | right
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.n:
+            raise IndexError("position out of range")
+        x = self._encrypt(position)
+        while x >= self.n:
+            x = self._encrypt(x)
+        return x
+
+    def __iter__(self):
+        for position in range(self.n):
+            yield self[position]
+
+    def _encrypt_array(self, x):
+        half_bits, half_mask = np.uint64(self._half_bits), np.uint64(self._half_mask)
+        left, right = x >> half_bits, x & half_mask
+        for key in self._keys:
+            left, right = right, left ^ (mix64_array(right ^ np.uint64(key)) & half_mask)
+        return (left << half_bits) | right
+
+    def take(self, positions):
+        """Vectorised lookup of many positions at once; returns an int64 array."""
+        positions = np.asarray(positions, dtype=np.uint64)
+        if len(positions) and int(positions.max()) >= self.n:
+            raise IndexError("position out of range")
+        x = self._encrypt_array(positions)
+        outside = x >= np.uint64(self.n)
+        while outside.any():
+            x[outside] = self._encrypt_array(x[outside])
+            outside = x >= np.uint64(self.n)
+        return x.astype(np.int64)
+
+
+def sample_ids(pool, k, seed):
+    """Yields the first k ids of pool in seeded shuffled order, lazily."""
+    permutation = SeededPermutation(len(pool), seed)
+    for position in range(min(k, len(pool))):
+        yield pool[permutation[position]]
+
+
+def sample_id_array(pool, k, seed):
+    """Returns the first k ids of pool in seeded shuffled order as an int32 array."""
+    positions = SeededPermutation(len(pool), seed).take(np.arange(min(k, len(pool))))
+    if isinstance(pool, np.ndarray):
+        return pool[positions].astype(np.int32)
+    return np.fromiter((pool[int(p)] for p in positions), dtype=np.int32, count=len(positions))
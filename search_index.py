@@ -0,0 +1,244 @@
+# search_index.py
+"""Inverted index with BM25 ranking over question prompts, options and explanations.
+
+    python search_index.py "generators yield" --bank bank.pqb --limit 10
+"""
+import argparse
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+import numpy as np
+
+TOKEN = re.compile(r"[a-z0-9_]+")
+
+# Words too common in questions to help ranking; they are not indexed
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how in is it of on or that the this to "
+    "was what when which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    """Lowercased word tokens, identifiers kept whole, with a plural "s" stripped."""
+    tokens = []
+    for token in TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        # "generators" finds "generator"; short words and "-ss" endings are left alone
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def question_text(question):
+    return " ".join([question.prompt, *question.options, question.explanation])
+
+
+class SearchIndex:
+    """BM25 over an incrementally updated inverted index, one document per question id.
+
+    Each term keeps its postings as growable arrays of question ids and
+    term frequencies, in id order, appended to as questions are added, so
+    indexing an import costs only the new questions. A question removed
+    from a live bank, or edited there, is taken out of the postings of its
+    own terms and indexed again under the same id. Queries score with
+    numpy: each term's BM25 impacts are computed once, ranked and cached
+    until the next change, so a single-term query is a slice; longer queries sum
+    impacts into a per-thread accumulator and, with MaxScore pruning, rank
+    only the postings of terms that can still place a question in the top,
+    so their cost follows the postings rather than the bank.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, max_cached_terms=4096):
+        self.k1 = k1
+        self.b = b
+        self.max_cached_terms = max_cached_terms
+        self._postings = {}
+        self._lengths = array("I")
+        self._total_length = 0
+        # Ids with no document: removed, or skipped over by add()
+        self._removed = set()
+        # term -> (ids, impacts, best-first order) for the current documents; cleared by add() and remove()
+        self._impacts = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    @classmethod
+    def build(cls, bank, **kwargs):
+        """Indexes every question in bank, in id order."""
+        index = cls(**kwargs)
+        for question in bank:
+            index.add(question)
+        return index
+
+    def add(self, question, question_id=None):
+        """Indexes question under question_id, by default the next id; returns the id it was given.
+
+        An id that is already indexed must be removed first.
+        """
+        counts = Counter(tokenize(question_text(question)))
+        with self._lock:
+            if question_id is None:
+                question_id = len(self._lengths)
+            if question_id >= len(self._lengths):
+                self._removed.update(range(len(self._lengths), question_id))
+                self._lengths.extend([0] * (question_id + 1 - len(self._lengths)))
+            for term, count in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("I"), array("H"))
+                if postings[0] and postings[0][-1] > question_id:
+                    # Re-indexing an earlier id keeps the postings in id order
+                    position = bisect_left(postings[0], question_id)
+                    postings[0].insert(position, question_id)
+                    postings[1].insert(position, min(count, 0xFFFF))
+                else:
+                    postings[0].append(question_id)
+                    postings[1].append(min(count, 0xFFFF))
+            length = sum(counts.values())
+            self._lengths[question_id] = length
+            self._total_length += length
+            self._removed.discard(question_id)
+            # Document count and average length changed, so every impact did
+            self._impacts.clear()
+        return question_id
+
+    def remove(self, question_id, question):
+        """Takes question, as it was indexed under question_id, out of the index."""
+        counts = Counter(tokenize(question_text(question)))
+        with self._lock:
+            if question_id >= len(self._lengths) or question_id in self._removed:
+                return
+            for term in counts:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                position = bisect_left(postings[0], question_id)
+                if position < len(postings[0]) and postings[0][position] == question_id:
+                    del postings[0][position]
+                    del postings[1][position]
+                    if not postings[0]:
+                        del self._postings[term]
+            self._total_length -= self._lengths[question_id]
+            self._lengths[question_id] = 0
+            self._removed.add(question_id)
+            self._impacts.clear()
+
+    def update(self, previous, generation, question_ids):
+        """Re-indexes question_ids as they changed between two live bank generations."""
+        for question_id in question_ids:
+            if previous.is_live(question_id):
+                self.remove(question_id, previous[question_id])
+            if generation.is_live(question_id):
+                self.add(generation[question_id], question_id)
+
+    def document_frequency(self, term):
+        postings = self._postings.get(term)
+        return len(postings[0]) if postings else 0
+
+    def _term_impacts(self, term):
+        # Caller holds the lock
+        cached = self._impacts.get(term)
+        if cached is not None:
+            return cached
+        postings = self._postings.get(term)
+        if postings is None:
+            return None
+        n = len(self._lengths) - len(self._removed)
+        # Copies, so later appends to the postings can resize them freely
+        ids = np.array(postings[0], dtype=np.int64)
+        frequencies = np.array(postings[1], dtype=np.float32)
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32)[ids]
+        idf = np.log1p((n - len(ids) + 0.5) / (len(ids) + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * lengths / np.float32(self._total_length / n))
+        impacts = (np.float32(idf) * frequencies * (self.k1 + 1) / (frequencies + norm)).astype(np.float32)
+        # Postings stay in id order, which argpartition and the accumulator both want;
+        # the best-first order makes a single-term query a slice
+        best = np.argsort(-impacts, kind="stable")
+        if len(self._impacts) >= self.max_cached_terms:
+            self._impacts.clear()
+        self._impacts[term] = cached = (ids, impacts, best)
+        return cached
+
+    def _accumulator(self, n):
+        # One zeroed score array per thread, reset after each query, so a query costs its postings
+        accumulator = getattr(self._local, "scores", None)
+        if accumulator is None or len(accumulator) < n:
+            accumulator = self._local.scores = np.zeros(n, dtype=np.float32)
+        return accumulator
+
+    def search(self, query, limit=10):
+        """Returns [(question id, score)] best first for the query's terms."""
+        if limit <= 0:
+            return []
+        with self._lock:
+            n = len(self._lengths)
+            matches = [m for m in map(self._term_impacts, set(tokenize(query))) if m is not None]
+        if not matches:
+            return []
+        if len(matches) == 1:
+            ids, scores, best = matches[0]
+            top = best[:limit]
+            return [(int(question_id), float(score)) for question_id, score in zip(ids[top], scores[top])]
+
+        accumulator = self._accumulator(n)
+        for ids, impacts, _ in matches:
+            # Ids are unique within a term's postings, so fancy-index addition is safe
+            accumulator[ids] += impacts
+        try:
+            # MaxScore: each term's best postings give exact scores whose limit-th best
+            # is a floor for the final ranking
+            seeds = np.unique(np.concatenate([ids[best[:limit]] for ids, _, best in matches]))
+            threshold = 0.0
+            if len(seeds) >= limit:
+                threshold = float(np.partition(accumulator[seeds], len(seeds) - limit)[len(seeds) - limit])
+            # A question found only in terms whose best impacts sum below the floor cannot
+            # rank, so only the other terms' postings are candidates
+            essential = []
+            bound = 0.0
+            for ids, impacts, best in sorted(matches, key=lambda match: match[1][match[2][0]]):
+                bound += float(impacts[best[0]])
+                if bound * (1 + 1e-6) >= threshold:
+                    essential.append(ids)
+            candidates = np.concatenate(essential)
+            scores = accumulator[candidates]
+        finally:
+            for ids, _, _ in matches:
+                accumulator[ids] = 0
+        # Filtering first also keeps argpartition off long runs of equal scores, where it is slow
+        above = scores >= threshold
+        candidates, scores = candidates[above], scores[above]
+        # A question matching m terms appears m times, so keep limit * m slots and drop repeats
+        keep = min(limit * len(essential), len(candidates))
+        top = np.argpartition(scores, len(scores) - keep)[len(scores) - keep:]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        _, first = np.unique(candidates[top], return_index=True)
+        top = top[np.sort(first)[:limit]]
+        return [(int(question_id), float(score)) for question_id, score in zip(candidates[top], scores[top])]
+
+
+def main():
+    from bank_format import open_bank
+
+    parser = argparse.ArgumentParser(description="Search the question bank.")
+    parser.add_argument("query")
+    parser.add_argument("--bank", help="compiled bank to search (built-in questions when omitted)")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    bank = open_bank(args.bank)
+    index = SearchIndex.build(bank)
+    for question_id, score in index.search(args.query, args.limit):
+        question = bank[question_id]
+        print(f"{question_id:>8}  {score:6.2f}  [{question.category} / {question.difficulty}] {question.prompt}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# session_store.py
+"""Quiz progress kept outside the Streamlit process, so any worker can resume a quiz.
+
+A QuizState is encoded into a compact binary record: a fixed header, the
+category, difficulty and seed, then the answer, latency, adaptive and
+review id arrays as raw bytes. A ten-question quiz is about 100 bytes. Stores map a
+session key to (state, user):
+
+- SQLiteSessionStore shares one WAL-mode database between the worker
+  processes on a host.
+- MemorySessionStore keeps records in this process, for tests and for
+  comparison.
+
+Any object with the same load/save/delete methods can stand in for them.
+"""
+import math
+import struct
+import threading
+import time
+
+import numpy as np
+
+from attempt_log import open_database
+from quiz_engine import QuizState
+
+FORMAT_VERSION = 4
+# version, adaptive, review, completed, length, cursor, score, started_at, ability,
+# shown_at (epoch ns, 0 if not shown), live bank generation (-1 for none), rank (NaN until submitted)
+HEADER = struct.Struct("<B???IIIddqqd")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_key TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    state BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at);
+"""
+
+
+def _pack_text(text):
+    data = text.encode("utf-8")
+    return struct.pack("<H", len(data)) + data
+
+
+def _unpack_text(data, offset):
+    (size,) = struct.unpack_from("<H", data, offset)
+    offset += 2
+    return data[offset:offset + size].decode("utf-8"), offset + size
+
+
+def encode_state(state):
+    """Returns the compact binary record of a QuizState.
+
+    shown_at_ns is a perf_counter reading that only means something in this
+    process, so it is stored as the wall-clock time the question was shown.
+    """
+    shown_at = 0
+    if state.shown_at_ns:
+        shown_at = time.time_ns() - (time.perf_counter_ns() - state.shown_at_ns)
+    seed = int(state.seed)
+    seed_bytes = seed.to_bytes(max(1, (seed.bit_length() + 8) // 8), "little", signed=True)
+    return b"".join([
+        HEADER.pack(FORMAT_VERSION, bool(state.adaptive), bool(state.review), bool(state.completed), state.length,
+                    state.cursor, state.score, state.started_at, state.ability, shown_at,
+                    -1 if state.generation is None else state.generation,
+                    math.nan if state.rank is None else state.rank),
+        _pack_text(state.category),
+        _pack_text(state.difficulty),
+        struct.pack("<B", len(seed_bytes)),
+        seed_bytes,
+        state.answers.astype(np.int8, copy=False).tobytes(),
+        state.latencies_ms.astype(np.uint32, copy=False).tobytes(),
+        state.adaptive_ids.astype(np.int32, copy=False).tobytes(),
+        state.review_ids.astype(np.int32, copy=False).tobytes(),
+    ])
+
+
+def decode_state(data):
+    """Rebuilds the QuizState encoded by encode_state; raises ValueError for an unknown record."""
+    if not data or data[0] != FORMAT_VERSION:
+        raise ValueError(f"Unknown session record version {data[0] if data else None}")
+    (_, adaptive, review, completed, length, cursor, score, started_at, ability, shown_at,
+     generation, rank) = HEADER.unpack_from(data)
+    offset = HEADER.size
+    category, offset = _unpack_text(data, offset)
+    difficulty, offset = _unpack_text(data, offset)
+    seed_size = data[offset]
+    seed = int.from_bytes(data[offset + 1:offset + 1 + seed_size], "little", signed=True)
+    offset += 1 + seed_size
+
+    review_ids = None
+    if review:
+        review_offset = offset + 5 * length + (4 * length if adaptive else 0)
+        review_ids = np.frombuffer(data, dtype=np.int32, count=length, offset=review_offset).copy()
+    state = QuizState(category, difficulty, length, seed, adaptive, review_ids,
+                      None if generation < 0 else generation)
+    state.cursor = cursor
+    state.score = score
+    state.completed = completed
+    state.started_at = started_at
+    state.ability = ability
+    state.rank = None if math.isnan(rank) else rank
+    # Copies, so the state owns writable arrays rather than views of the record
+    state.answers = np.frombuffer(data, dtype=np.int8, count=length, offset=offset).copy()
+    offset += length
+    state.latencies_ms = np.frombuffer(data, dtype=np.uint32, count=length, offset=offset).copy()
+    offset += 4 * length
+    if adaptive:
+        state.adaptive_ids = np.frombuffer(data, dtype=np.int32, count=length, offset=offset).copy()
+    if shown_at:
+        # Back onto this process's perf_counter; a question shown "in the future" counts from now
+        state.shown_at_ns = max(time.perf_counter_ns() - max(time.time_ns() - shown_at, 0), 1)
+    return state
+
+
+class MemorySessionStore:
+    """Session records in a dictionary; only this process can resume them."""
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_key):
+        with self._lock:
+            record = self._records.get(session_key)
+        if record is None:
+            return None
+        user, data = record
+        return decode_state(data), user
+
+    def save(self, session_key, state, user=""):
+        data = encode_state(state)
+        with self._lock:
+            self._records[session_key] = (user, data)
+
+    def delete(self, session_key):
+        with self._lock:
+            self._records.pop(session_key, None)
+
+    def close(self):
+        pass
+
+
+class SQLiteSessionStore:
+    """Session records in a WAL-mode SQLite database shared by every worker on the host.
+
+    Each save is one small upsert committed without an fsync (synchronous is
+    NORMAL), so it costs tens of microseconds; a power loss can lose the
+    last few saves, never corrupt the file. Records idle for longer than
+    ttl seconds are deleted at most once per expire_interval.
+    """
+
+    def __init__(self, path, ttl=86400.0, expire_interval=300.0):
+        self.path = path
+        self.ttl = ttl
+        self.expire_interval = expire_interval
+        self._connection = open_database(path, SCHEMA)
+        # One connection shared by the script threads of this process
+        self._lock = threading.Lock()
+        self._next_expiry = 0.0
+
+    def load(self, session_key):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT user, state FROM sessions WHERE session_key = ? AND updated_at >= ?",
+                (session_key, time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return decode_state(row[1]), row[0]
+        except (ValueError, struct.error):
+            # A record from an incompatible version starts the player afresh
+            return None
+
+    def save(self, session_key, state, user=""):
+        data = encode_state(state)
+        now = time.time()
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO sessions (session_key, user, state, updated_at) VALUES (?, ?, ?, ?)",
+                    (session_key, user, data, now)
+                )
+                if now >= self._next_expiry:
+                    self._next_expiry = now + self.expire_interval
+                    self._connection.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+
+    def delete(self, session_key):
+        with self._lock:
+            with self._connection:
+                self._connection.execute("DELETE FROM sessions WHERE session_key = ?", (session_key,))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def open_session_store(location):
+    """Returns the store for location: None when empty, in-process for "memory", else a SQLite path."""
+    if not location:
+        return None
+    if location == "memory":
+        return MemorySessionStore()
+    return SQLiteSessionStore(location)
@@ -0,0 +1,349 @@
+# spaced_repetition.py
+"""SM-2 spaced-repetition scheduling per (user, question), with a heap of due reviews.
+
+Every graded answer updates that user's card for the question: its ease,
+interval and next due time. A user's deck keeps a min-heap of (due, question
+id) beside the cards, so the k most overdue questions come from k heap pops
+(O(k log n)) rather than a scan over every card the user has seen. Updated
+cards push a fresh heap entry and the old one is skipped when it surfaces.
+
+Cards persist in a WAL-mode SQLite table. review() updates the deck in
+memory and queues the answer; a background thread applies queued answers
+to the stored cards in batched transactions, re-reading each card first,
+so workers sharing the database never overwrite each other's reviews. A
+user's deck is loaded and heapified the first time it is needed, and
+read again once it is max_age seconds old to pick up other workers'
+answers.
+"""
+import atexit
+import heapq
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from attempt_log import open_database
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400.0
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    user TEXT NOT NULL,
+    question_id INTEGER NOT NULL,
+    ease REAL NOT NULL,
+    interval_days REAL NOT NULL,
+    repetitions INTEGER NOT NULL,
+    lapses INTEGER NOT NULL,
+    due REAL NOT NULL,
+    PRIMARY KEY (user, question_id)
+)
+"""
+UPSERT = ("INSERT OR REPLACE INTO cards (user, question_id, ease, interval_days, repetitions, lapses, due) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?)")
+SELECT_CARD = "SELECT ease, interval_days, repetitions, lapses FROM cards WHERE user = ? AND question_id = ?"
+
+_STOP = object()
+
+
+def answer_quality(correct, latency_ms=None):
+    """SM-2 quality (0-5) of a quiz answer: wrong is 1, right is 5, 4 or 3 as it took longer."""
+    if not correct:
+        return 1
+    if latency_ms is None or latency_ms <= 10000:
+        return 5
+    return 4 if latency_ms <= 30000 else 3
+
+
+def sm2(ease, interval_days, repetitions, quality):
+    """One SM-2 step; returns the new (ease, interval in days, repetitions)."""
+    if quality < 3:
+        # A lapse starts the card over but keeps its (lowered) ease
+        repetitions = 0
+        interval_days = 1.0
+    else:
+        repetitions += 1
+        interval_days = 1.0 if repetitions == 1 else 6.0 if repetitions == 2 else interval_days * ease
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ease, interval_days, repetitions
+
+
+def next_card(card, quality, now):
+    """The (ease, interval_days, repetitions, lapses, due) of a card, None for a new one, after a review."""
+    ease, interval_days, repetitions, lapses = (INITIAL_EASE, 0.0, 0, 0) if card is None else card
+    ease, interval_days, repetitions = sm2(ease, interval_days, repetitions, quality)
+    return ease, interval_days, repetitions, lapses + (quality < 3), now + interval_days * DAY
+
+
+class Deck:
+    """One user's cards in parallel arrays, indexed by a heap of due times."""
+
+    def __init__(self):
+        self.rows = {}
+        self.question_ids = array("i")
+        self.ease = array("d")
+        self.interval_days = array("d")
+        self.repetitions = array("I")
+        self.lapses = array("I")
+        self.due = array("d")
+        self.heap = []
+        # Heap entries superseded by a later review of the same card
+        self.stale = 0
+        # monotonic() time the cards were read from the database
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def set(self, question_id, ease, interval_days, repetitions, lapses, due):
+        row = self.rows.get(question_id)
+        if row is None:
+            row = self.rows[question_id] = len(self.question_ids)
+            self.question_ids.append(question_id)
+            for column in (self.ease, self.interval_days, self.due):
+                column.append(0.0)
+            self.repetitions.append(0)
+            self.lapses.append(0)
+        else:
+            self.stale += 1
+        self.ease[row] = ease
+        self.interval_days[row] = interval_days
+        self.repetitions[row] = repetitions
+        self.lapses[row] = lapses
+        self.due[row] = due
+        heapq.heappush(self.heap, (due, question_id))
+        # Rebuild once stale entries outnumber live ones, so the heap stays O(cards)
+        if self.stale > len(self.rows):
+            self.rebuild()
+
+    def card(self, question_id):
+        """(ease, interval_days, repetitions, lapses) of a card, or None if the user has not seen it."""
+        row = self.rows.get(question_id)
+        if row is None:
+            return None
+        return self.ease[row], self.interval_days[row], self.repetitions[row], self.lapses[row]
+
+    def load(self, cards):
+        """Appends stored (question_id, ease, interval_days, repetitions, lapses, due) cards, then indexes them."""
+        for question_id, ease, interval_days, repetitions, lapses, due in cards:
+            self.rows[question_id] = len(self.question_ids)
+            self.question_ids.append(question_id)
+            self.ease.append(ease)
+            self.interval_days.append(interval_days)
+            self.repetitions.append(repetitions)
+            self.lapses.append(lapses)
+            self.due.append(due)
+        self.rebuild()
+
+    def rebuild(self):
+        self.heap = list(zip(self.due, self.question_ids))
+        heapq.heapify(self.heap)
+        self.stale = 0
+
+    def take_due(self, limit, now):
+        """The ids of up to limit cards due by now, most overdue first; the heap is left as it was."""
+        taken = []
+        result = []
+        seen = set()
+        while self.heap and len(result) < limit and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            due, question_id = entry
+            # An outdated entry, or a repeat of one already taken, is dropped for good
+            if self.due[self.rows[question_id]] != due or question_id in seen:
+                self.stale -= 1
+                continue
+            taken.append(entry)
+            result.append(question_id)
+            seen.add(question_id)
+        for entry in taken:
+            heapq.heappush(self.heap, entry)
+        return result
+
+    def next_due(self):
+        """The earliest due time of any card, or None for an empty deck."""
+        while self.heap:
+            due, question_id = self.heap[0]
+            if self.due[self.rows[question_id]] == due:
+                return due
+            heapq.heappop(self.heap)
+            self.stale -= 1
+        return None
+
+
+class ReviewScheduler:
+    """SM-2 review schedules for every user, persisted to SQLite when given a path.
+
+    Decks of recently active users stay in memory, up to max_users; others
+    are reloaded from the database when they return. With a path, answers
+    are written by a background thread like AttemptLog's: review() never
+    waits on the disk, and an answer that cannot be queued within
+    put_timeout, or whose batch still fails after max_retries attempts, is
+    dropped and counted in dropped. One instance is shared by all sessions.
+    """
+
+    def __init__(self, path=None, max_users=1000, max_age=60.0, flush_interval=1.0, batch_size=500,
+                 max_queue=10000, put_timeout=0.05, max_retries=3, close_timeout=5.0):
+        self.path = path
+        self.max_users = max_users
+        self.max_age = max_age
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.close_timeout = close_timeout
+        self.written = 0
+        self.dropped = 0
+        self._decks = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._closed = False
+        if path:
+            # Decks are read on the calling thread; the writer has its own connection
+            self._connection = open_database(path, SCHEMA)
+            self._writer_connection = open_database(path, SCHEMA)
+            self._queue = queue.Queue(maxsize=max_queue)
+            self._writer = threading.Thread(target=self._run, name="review-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+
+    def _deck(self, user):
+        # Caller holds the lock
+        deck = self._decks.get(user)
+        if deck is not None and (self._connection is None or time.monotonic() - deck.loaded_at < self.max_age):
+            self._decks.move_to_end(user)
+            return deck
+        deck = Deck()
+        if self._connection is not None:
+            deck.load(self._connection.execute(
+                "SELECT question_id, ease, interval_days, repetitions, lapses, due FROM cards WHERE user = ?", (user,)
+            ))
+        self._decks[user] = deck
+        self._decks.move_to_end(user)
+        while len(self._decks) > self.max_users:
+            self._decks.popitem(last=False)
+        return deck
+
+    def review(self, user, question_id, quality, now=None):
+        """Applies an answer of the given SM-2 quality; returns when the card is next due."""
+        now = time.time() if now is None else now
+        question_id = int(question_id)
+        with self._lock:
+            deck = self._deck(user)
+            card = next_card(deck.card(question_id), quality, now)
+            deck.set(question_id, *card)
+        if self._connection is not None:
+            try:
+                self._queue.put((user, question_id, quality, now), timeout=self.put_timeout)
+            except queue.Full:
+                self.dropped += 1
+        return card[-1]
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._connection is not None else 0
+
+    def _apply(self, batch):
+        # Each answer is applied to the card as stored, which may hold other workers' answers
+        cards = []
+        with self._writer_connection:
+            self._writer_connection.execute("BEGIN IMMEDIATE")
+            for user, question_id, quality, now in batch:
+                stored = self._writer_connection.execute(SELECT_CARD, (user, question_id)).fetchone()
+                card = next_card(stored, quality, now)
+                self._writer_connection.execute(UPSERT, (user, question_id, *card))
+                cards.append((user, question_id, card))
+        return cards
+
+    def _write(self, batch):
+        # A locked database is transient, so retry a few times; anything else drops the batch
+        delay = 0.05
+        cards = None
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                cards = self._apply(batch)
+                break
+            except sqlite3.OperationalError as e:
+                if attempt == self.max_retries:
+                    error = e
+                    break
+                logger.warning("Review write failed (%s); retrying", e)
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+            except sqlite3.Error as e:
+                error = e
+                break
+        if cards is None:
+            self.dropped += len(batch)
+            logger.error("Dropping %d reviews that could not be written to %s: %s", len(batch), self.path, error)
+            return
+        self.written += len(batch)
+        # Cached decks take the stored result, which differs when another worker reviewed the card too
+        with self._lock:
+            for user, question_id, card in cards:
+                deck = self._decks.get(user)
+                if deck is not None and deck.card(question_id) != card[:4]:
+                    deck.set(question_id, *card)
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            if batch and (stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                for _ in batch:
+                    self._queue.task_done()
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        self._queue.task_done()
+
+    def flush(self):
+        """Blocks until every queued review has been committed."""
+        if self._connection is not None:
+            self._queue.join()
+
+    def due(self, user, limit, now=None):
+        """Up to limit question ids due for user by now, most overdue first."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._deck(user).take_due(limit, now)
+
+    def next_due(self, user):
+        with self._lock:
+            return self._deck(user).next_due()
+
+    def cards(self, user):
+        with self._lock:
+            return len(self._deck(user))
+
+    def close(self):
+        if self._connection is None or self._closed:
+            return
+        self._closed = True
+        # Never block shutdown on a writer that cannot keep up or has died
+        try:
+            self._queue.put(_STOP, timeout=self.close_timeout)
+        except queue.Full:
+            logger.error("Review queue still full on close; %d queued reviews are lost", self.pending)
+            return
+        self._writer.join(self.close_timeout)
+        if not self._writer.is_alive():
+            self._writer_connection.close()
+        with self._lock:
+            self._connection.close()
+            self._connection = None
@@ -1,5 +1,8 @@
 # styles.py
+from functools import lru_cache
 
+
+@lru_cache(maxsize=1)
 def get_styles():
     """Returns the CSS styles as a string."""
     return """